@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+File d'envoi des alertes email
+
+· `enqueue()` écrit le message dans un spool sur disque (un fichier JSON par
+  message, écriture atomique) et rend la main immédiatement : les
+  vérifications ne bloquent plus sur SMTP, et un crash ne perd rien (le
+  spool est relu au démarrage).
+· Un thread d'envoi regroupe les messages arrivés pendant `batch_seconds`
+  et les envoie sur une seule connexion SMTP authentifiée, conservée entre
+  deux lots tant qu'elle reste utilisée (`idle_seconds`).
+· Débit limité (`rate_per_minute`, seau à jetons) ; au-delà de `max_batch`
+  messages prêts, le surplus part en un seul email récapitulatif.
+· Échec temporaire : nouvel essai avec attente exponentielle ; erreur
+  permanente (5xx) ou trop d'essais : message déplacé dans failed/.
+· Plusieurs processus (démon, --once en cron, --crawl) partagent le spool :
+  chaque file travaille dans son dossier inflight/<pid>_<jeton>/, verrouillé
+  (fcntl) tant qu'elle existe. Un message n'est envoyé qu'après avoir été
+  réclamé par renommage atomique dans ce dossier ; au démarrage, une file
+  réclame les messages à la racine du spool et ceux des dossiers dont le
+  verrou est libre (processus terminé).
+"""
+
+import json
+import os
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de reprise des messages d'un autre processus
+    fcntl = None
+
+
+class SMTPSettings:
+    def __init__(self, host: str, port: int = 587, user: Optional[str] = None, password: Optional[str] = None,
+                 sender: Optional[str] = None, recipient: Optional[str] = None, starttls: bool = True,
+                 timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender or user
+        self.recipient = recipient
+        self.starttls = starttls
+        self.timeout = timeout
+
+
+class AlertQueue:
+    def __init__(self, spool_dir: Path, settings: SMTPSettings, rate_per_minute: int = 20,
+                 batch_seconds: float = 5.0, max_batch: int = 10, max_retries: int = 6,
+                 backoff_seconds: float = 30, idle_seconds: float = 60,
+                 log: Optional[Callable[[str, str], None]] = None):
+        self.spool_dir = Path(spool_dir)
+        self.failed_dir = self.spool_dir / "failed"
+        self.failed_dir.mkdir(parents=True, exist_ok=True)
+        self.inflight_root = self.spool_dir / "inflight"
+        self.inflight_dir = self.inflight_root / f"{os.getpid()}_{os.urandom(4).hex()}"
+        self.inflight_dir.mkdir(parents=True)
+        self._lock_file = open(self.inflight_dir / ".lock", 'w')
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self.settings = settings
+        self.rate_per_minute = rate_per_minute
+        self.batch_seconds = batch_seconds
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.idle_seconds = idle_seconds
+        self.log = log or (lambda message, level="INFO": None)
+
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._pending: Dict[str, Dict] = {}
+        self._tokens = float(rate_per_minute)
+        self._refill_at = time.monotonic()
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._sending = False
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._load_spool()
+
+    # --- Spool ---
+    def _claim(self, path: Path) -> bool:
+        """Réclame un message par renommage atomique ; False si un autre processus l'a pris"""
+        try:
+            os.rename(path, self.inflight_dir / path.name)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _orphans(self) -> List[Path]:
+        """Messages des dossiers inflight/ de processus terminés (verrou libre)"""
+        paths = []
+        if fcntl is None:
+            return paths
+        for directory in self.inflight_root.iterdir():
+            lock_path = directory / ".lock"
+            if directory == self.inflight_dir or not lock_path.exists():
+                continue  # dossier en cours de création
+            try:
+                lock = open(lock_path, 'a')
+            except OSError:
+                continue  # dossier repris entre-temps par une autre file
+            with lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # processus vivant
+                paths += [self.inflight_dir / path.name for path in sorted(directory.glob("*.json"))
+                          if self._claim(path)]
+                try:
+                    for leftover in directory.glob("*.tmp"):
+                        leftover.unlink()
+                    lock_path.unlink()
+                    directory.rmdir()
+                except OSError:
+                    pass
+        return paths
+
+    def _load_spool(self):
+        claimed = [self.inflight_dir / path.name for path in sorted(self.spool_dir.glob("*.json"))
+                   if self._claim(path)]
+        for path in sorted(claimed + self._orphans()):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._pending[path.name] = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                path.rename(self.failed_dir / path.name)
+
+    def _write(self, name: str, message: Dict):
+        tmp = self.inflight_dir / (name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(message, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.inflight_dir / name)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def enqueue(self, subject: str, body: str, html: bool = False, kind: str = "general") -> str:
+        """Ajoute un message au spool et réveille le thread d'envoi ; renvoie son identifiant"""
+        with self._cond:
+            self._seq += 1
+            name = f"{time.time_ns()}_{self._seq:06d}.json"
+            message = {"subject": subject, "body": body, "html": html, "kind": kind,
+                       "created": time.time(), "attempts": 0, "next_attempt": 0}
+            self._write(name, message)
+            self._pending[name] = message
+            self._cond.notify()
+        self.start()
+        return name
+
+    # --- Thread d'envoi ---
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="alert-sender", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: float = 60) -> bool:
+        """Attend que les messages prêts soient envoyés (ou reportés) ; True si le spool est vide"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            for message in self._pending.values():
+                message["flush"] = True  # pas d'attente de regroupement
+            self._cond.notify_all()
+            while time.monotonic() < deadline:
+                ready = [m for m in self._pending.values() if m["next_attempt"] <= time.time()]
+                if not ready and not self._sending:
+                    break
+                self._cond.wait(min(0.1, max(0.0, deadline - time.monotonic())))
+            return not self._pending
+
+    def close(self, timeout: float = 30):
+        """Vide la file (dans la limite de `timeout`) puis arrête le thread ; le reste attend sur disque"""
+        self.flush(timeout)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._disconnect()
+        # Dossier vide : supprimé ; sinon laissé (verrou relâché) à la prochaine file
+        if not self._lock_file.closed:
+            try:
+                if not any(self.inflight_dir.glob("*.json")):
+                    (self.inflight_dir / ".lock").unlink()
+                    self.inflight_dir.rmdir()
+            except OSError:
+                pass
+            self._lock_file.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._next_batch()
+                if batch is None:
+                    if self._stop:
+                        return
+                    idle = self._smtp is not None and time.monotonic() - self._last_used >= self.idle_seconds
+                    if not idle:
+                        self._cond.wait(self._wait_time())
+                        continue
+                else:
+                    self._sending = True
+            if batch is None:
+                self._disconnect()  # connexion inutilisée depuis idle_seconds
+                continue
+            try:
+                self._send_batch(batch)
+            finally:
+                with self._cond:
+                    self._sending = False
+                    self._cond.notify_all()
+
+    def _wait_time(self) -> float:
+        # Appelé verrou pris : prochain message dû, fin de fenêtre de regroupement,
+        # prochain jeton ou fermeture de la connexion inutilisée
+        now = time.time()
+        waits = [3600.0]
+        if self._smtp is not None:
+            waits.append(self._last_used + self.idle_seconds - time.monotonic())
+        for message in self._pending.values():
+            waits.append(max(message["next_attempt"], message["created"] + self.batch_seconds) - now)
+        if self._tokens < 1:
+            waits.append(60.0 / self.rate_per_minute)
+        return max(0.05, min(waits))
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(float(self.rate_per_minute),
+                           self._tokens + (now - self._refill_at) * self.rate_per_minute / 60.0)
+        self._refill_at = now
+
+    def _next_batch(self) -> Optional[List[str]]:
+        """Messages à envoyer maintenant (verrou pris), None si rien n'est prêt"""
+        now = time.time()
+        ready = sorted(name for name, m in self._pending.items() if m["next_attempt"] <= now)
+        if not ready:
+            return None
+        # Regroupement : on attend la fin de la fenêtre du plus ancien message
+        oldest = min(self._pending[name]["created"] for name in ready)
+        if now < oldest + self.batch_seconds and not any(self._pending[n].get("flush") for n in ready):
+            return None
+        self._refill()
+        if self._tokens < 1:
+            return None
+        return ready
+
+    # --- SMTP ---
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except smtplib.SMTPException:
+                self._disconnect()
+        s = self.settings
+        smtp = smtplib.SMTP(s.host, s.port, timeout=s.timeout)
+        try:
+            if s.starttls:
+                smtp.starttls()
+            if s.user and s.password:
+                smtp.login(s.user, s.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        return smtp
+
+    def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+    def _mime(self, message: Dict):
+        if message.get("html"):
+            msg = MIMEMultipart("alternative")
+            msg.attach(MIMEText(message["body"], "html"))
+        else:
+            msg = MIMEText(message["body"])
+        msg['From'] = self.settings.sender
+        msg['To'] = self.settings.recipient
+        msg['Subject'] = message["subject"]
+        return msg
+
+    def _digest(self, names: List[str]) -> Dict:
+        with self._cond:
+            messages = [self._pending[n] for n in names]
+        parts = [f"=== {m['subject']} ===\n{m['body']}" for m in messages]
+        return {"subject": f"[WP Monitor] {len(messages)} alertes regroupées",
+                "body": "Plusieurs alertes ont été regroupées (limite de débit).\n\n" + "\n\n".join(parts),
+                "html": False}
+
+    def _send_batch(self, names: List[str]):
+        # Au plus `max_batch` messages individuels, le surplus en un seul récapitulatif
+        with self._cond:
+            budget = max(1, min(int(self._tokens), self.max_batch))
+        groups = [[n] for n in names[:budget]]
+        if len(names) > budget:
+            groups[-1:] = [names[budget - 1:]]
+
+        try:
+            smtp = self._connect()
+        except Exception as e:
+            self.log(f"Connexion SMTP impossible: {e}", "ERROR")
+            self._retry(names, e)
+            return
+
+        for group in groups:
+            with self._cond:
+                message = self._pending[group[0]] if len(group) == 1 else None
+            if message is None:
+                message = self._digest(group)
+            try:
+                smtp.send_message(self._mime(message))
+            except smtplib.SMTPRecipientsRefused as e:
+                self.log(f"Destinataire refusé: {e.recipients}", "ERROR")
+                self._fail(group)
+                continue
+            except smtplib.SMTPResponseException as e:
+                if 500 <= e.smtp_code < 600:
+                    self.log(f"Email rejeté ({e.smtp_code}): {message['subject']}", "ERROR")
+                    self._fail(group)
+                else:
+                    self._retry(group, e)
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                self.log(f"Erreur envoi email: {e}", "ERROR")
+                self._disconnect()
+                self._retry([n for g in groups[groups.index(group):] for n in g], e)
+                return
+            self._done(group)
+            self.log(f"Alerte email envoyée: {message['subject']}", "INFO")
+        self._last_used = time.monotonic()
+
+    def _done(self, names: List[str]):
+        with self._cond:
+            self._tokens -= 1
+            for name in names:
+                self._pending.pop(name, None)
+                (self.inflight_dir / name).unlink(missing_ok=True)
+
+    def _fail(self, names: List[str]):
+        with self._cond:
+            for name in names:
+                self._pending.pop(name, None)
+                path = self.inflight_dir / name
+                if path.exists():
+                    path.rename(self.failed_dir / name)
+
+    def _retry(self, names: List[str], error: Exception):
+        with self._cond:
+            for name in names:
+                message = self._pending.get(name)
+                if message is None:
+                    continue
+                message["attempts"] += 1
+                message["error"] = str(error)
+                message.pop("flush", None)
+                if message["attempts"] >= self.max_retries:
+                    self._write(name, message)
+                    self._pending.pop(name)
+                    (self.inflight_dir / name).rename(self.failed_dir / name)
+                    continue
+                message["next_attempt"] = time.time() + self.backoff_seconds * 2 ** (message["attempts"] - 1)
+                self._write(name, message)
@@ -1,7 +1,13 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 import requests
-from requests.auth import HTTPBasicAuth
+import json
 import os
+import threading
+from typing import Optional
+
+import metrics
+from http_client import HTTPClient
+from upstream_cache import UpstreamCache, UpstreamResponse
 
 app = Flask(__name__)
 
@@ -16,10 +22,45 @@ else:
 def wordpress_auth_tool():
     return render_template('wordpress_auth_tool.html')
 
+# Réponses WordPress gardées quelques secondes (par site, endpoint et identifiants)
+upstream_cache = UpstreamCache.from_env()
+AUTH_TIMEOUT = float(os.environ.get('AUTH_UPSTREAM_TIMEOUT', '10'))
+METRICS_SITE, METRICS_ENDPOINT = 'auth-proxy', 'test-wordpress-auth'
+SUCCESS_PREFIX = ('{"success": true, "message": %s, "data": ' % json.dumps('Connexion réussie!')).encode('utf-8')
+
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+def proxy_client() -> HTTPClient:
+    """Client du worker, créé à la première requête (après le fork), sans cookies :
+    un Set-Cookie d'un site testé ne doit pas accompagner la requête d'un autre
+    utilisateur (ni le bocal grossir avec les domaines saisis)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient.from_env(cookies=False)
+        return _client
+
+def fetch_upstream(api_url: str, username: str, app_password: str) -> UpstreamResponse:
+    # Client partagé du worker : connexions persistantes, phases dans /metrics sous
+    # des étiquettes fixes (site et endpoint viennent de l'utilisateur : ni
+    # séries illimitées, ni sites testés exposés)
+    response = proxy_client().get(api_url, auth=(username, app_password), timeout=AUTH_TIMEOUT,
+                                site=METRICS_SITE, endpoint=METRICS_ENDPOINT)
+    return UpstreamResponse(response.status_code, response.reason or '',
+                            response.headers.get('Content-Type', ''), response.content)
+
+def json_body(upstream: UpstreamResponse) -> Optional[bytes]:
+    """Corps JSON de WordPress sans BOM (ajouté par certaines extensions), None si ce n'est pas du JSON"""
+    body = upstream.body.lstrip(b'\xef\xbb\xbf').strip()
+    if 'json' not in upstream.content_type or body[:1] not in (b'{', b'['):
+        return None
+    return body
+
 # API endpoint pour tester la connexion WordPress
 @app.route('/test-wordpress-auth', methods=['POST'])
 def test_wordpress_auth():
-    data = request.json
+    data = request.get_json(silent=True) or {}
     site_url = data.get('siteUrl')
     username = data.get('username')
     app_password = data.get('appPassword')
@@ -32,24 +73,26 @@ def test_wordpress_auth():
         # Construire l'URL complète
         api_url = site_url + endpoint
         
-        # Effectuer la requête avec l'authentification basic
-        response = requests.get(
-            api_url, 
-            auth=HTTPBasicAuth(username, app_password),
-            timeout=10
-        )
+        # Effectuer la requête avec l'authentification basic (ou réutiliser
+        # la réponse récente d'une requête identique)
+        key = upstream_cache.key(site_url, endpoint, username, app_password)
+        upstream, cached = upstream_cache.get_or_fetch(key, lambda: fetch_upstream(api_url, username, app_password))
         
-        if response.status_code == 200:
-            return jsonify({
-                'success': True,
-                'data': response.json(),
-                'message': 'Connexion réussie!'
+        if upstream.status != 200:
+            response = jsonify({
+                'success': False,
+                'message': f'Erreur HTTP: {upstream.status} - {upstream.reason}'
             })
-        else:
-            return jsonify({
+        elif (body := json_body(upstream)) is None:
+            response = jsonify({
                 'success': False,
-                'message': f'Erreur HTTP: {response.status_code} - {response.reason}'
+                'message': f'Réponse non JSON ({upstream.content_type or "type inconnu"})'
             })
+        else:
+            # Corps inséré tel quel dans la réponse (ni décodé ni réencodé)
+            response = Response(SUCCESS_PREFIX + body + b'}', content_type='application/json')
+        response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+        return response
             
     except requests.exceptions.RequestException as e:
         return jsonify({
@@ -57,6 +100,11 @@ def test_wordpress_auth():
             'message': f'Erreur de connexion: {str(e)}'
         })
 
+# Latences HTTP par phase (format texte Prometheus)
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 if os.environ.get('FLASK_ENV') == 'production':
     app.config['DEBUG'] = False
 else:
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Format d'archive « pack » pour les sauvegardes de backup_script.py
+
+Un pack regroupe de nombreux snapshots dans un seul fichier :
+
+    en-tête   : b"WPPACK1\\n"
+    entrée    : b"WPE1" + longueur (4 octets) + en-tête JSON + contenu compressé
+    ...
+    index     : b"WPF1" + longueur (4 octets) + index JSON
+    trailer   : offset de l'index (8 octets) + b"WPT1"
+
+Chaque entrée est compressée séparément (zstd si le module `zstandard` est
+installé, gzip sinon) : l'index de fin (type, horodatage, hash, offset,
+longueur) permet de lire n'importe quel snapshot sans décompresser les
+autres. Un ajout écrit la nouvelle entrée à la place de l'ancien index puis
+réécrit l'index ; si le trailer est absent ou invalide (crash pendant un
+ajout), l'index est reconstruit en parcourant les entrées.
+
+Importeur : `import_legacy()` range les fichiers .html / .gz + .meta.json de
+backups_old/ dans des packs.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PACK_MAGIC = b"WPPACK1\n"
+ENTRY_MAGIC = b"WPE1"
+INDEX_MAGIC = b"WPF1"
+TRAILER_MAGIC = b"WPT1"
+TRAILER = struct.Struct(">Q4s")
+LENGTH = struct.Struct(">I")
+
+
+def compress(data: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=9, mtime=0), "gzip"
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Entrée zstd : installer le module zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "none":
+        return data
+    raise ValueError(f"Codec inconnu: {codec}")
+
+
+class BackupPack:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._index: Optional[List[Dict]] = None
+        self._index_offset = len(PACK_MAGIC)
+
+    # --- Lecture ---
+    def entries(self) -> List[Dict]:
+        if self._index is None:
+            self._load_index()
+        return list(self._index)
+
+    def _load_index(self):
+        if not self.path.exists():
+            self._index, self._index_offset = [], len(PACK_MAGIC)
+            return
+        with open(self.path, 'rb') as f:
+            if f.read(len(PACK_MAGIC)) != PACK_MAGIC:
+                raise ValueError(f"{self.path} n'est pas un pack de sauvegarde")
+            size = f.seek(0, os.SEEK_END)
+            if size >= len(PACK_MAGIC) + TRAILER.size:
+                f.seek(size - TRAILER.size)
+                offset, magic = TRAILER.unpack(f.read(TRAILER.size))
+                if magic == TRAILER_MAGIC and len(PACK_MAGIC) <= offset < size:
+                    f.seek(offset)
+                    if f.read(len(INDEX_MAGIC)) == INDEX_MAGIC:
+                        (length,) = LENGTH.unpack(f.read(LENGTH.size))
+                        if offset + 8 + length + TRAILER.size == size:
+                            self._index = json.loads(f.read(length))
+                            self._index_offset = offset
+                            return
+            self._index, self._index_offset = self._scan(f)
+
+    def _scan(self, f) -> Tuple[List[Dict], int]:
+        """Reconstruit l'index en parcourant les entrées (trailer manquant)"""
+        index = []
+        pos = len(PACK_MAGIC)
+        f.seek(pos)
+        while True:
+            head = f.read(len(ENTRY_MAGIC) + LENGTH.size)
+            if len(head) < 8 or head[:4] != ENTRY_MAGIC:
+                break
+            (hlen,) = LENGTH.unpack(head[4:])
+            try:
+                entry = json.loads(f.read(hlen))
+            except ValueError:
+                break
+            payload_offset = pos + 8 + hlen
+            if f.seek(payload_offset + entry["length"]) > os.fstat(f.fileno()).st_size:
+                break  # entrée tronquée : ignorée, sera écrasée au prochain ajout
+            entry["offset"] = payload_offset
+            index.append(entry)
+            pos = payload_offset + entry["length"]
+            f.seek(pos)
+        return index, pos
+
+    def read(self, entry: Dict) -> bytes:
+        """Contenu d'une entrée (décompressé), vérifié par son sha256"""
+        with open(self.path, 'rb') as f:
+            f.seek(entry["offset"])
+            data = decompress(f.read(entry["length"]), entry["codec"])
+        if hashlib.sha256(data).hexdigest() != entry["hash"]:
+            raise ValueError(f"Hash invalide pour {entry['type']} @ {entry['timestamp']}")
+        return data
+
+    def find(self, entry_type: str, at: Optional[str] = None) -> Optional[Dict]:
+        """Dernière entrée de `entry_type` dont l'horodatage est <= `at` (ISO)"""
+        best = None
+        for entry in self.entries():
+            if entry["type"] == entry_type and (at is None or entry["timestamp"] <= at):
+                if best is None or entry["timestamp"] >= best["timestamp"]:
+                    best = entry
+        return best
+
+    # --- Écriture ---
+    def append(self, data: bytes, entry_type: str, timestamp: Optional[str] = None, **meta) -> Dict:
+        """Ajoute un snapshot et renvoie son entrée d'index"""
+        if self._index is None:
+            self._load_index()
+        payload, codec = compress(data)
+        entry = dict(meta, type=entry_type, timestamp=timestamp or datetime.now().isoformat(),
+                     hash=hashlib.sha256(data).hexdigest(), size=len(data), codec=codec,
+                     length=len(payload))
+        header = json.dumps({k: v for k, v in entry.items() if k != "offset"}, ensure_ascii=False).encode('utf-8')
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        mode = 'r+b' if self.path.exists() else 'w+b'
+        with open(self.path, mode) as f:
+            if mode == 'w+b':
+                f.write(PACK_MAGIC)
+            f.seek(self._index_offset)
+            f.truncate()
+            f.write(ENTRY_MAGIC + LENGTH.pack(len(header)) + header)
+            entry["offset"] = f.tell()
+            f.write(payload)
+            index_offset = f.tell()
+            index_data = json.dumps(self._index + [entry], ensure_ascii=False).encode('utf-8')
+            f.write(INDEX_MAGIC + LENGTH.pack(len(index_data)) + index_data)
+            f.write(TRAILER.pack(index_offset, TRAILER_MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        self._index.append(entry)
+        self._index_offset = index_offset
+        return entry
+
+
+def pack_path(packs_dir: Path, when: Optional[datetime] = None) -> Path:
+    """Un pack par mois : backup_AAAAMM.pack"""
+    return Path(packs_dir) / f"backup_{(when or datetime.now()).strftime('%Y%m')}.pack"
+
+
+LEGACY_NAME = re.compile(r"^(?P<type>[a-z_]+?)_(?P<date>\d{8})_(?P<time>\d{6})\.(?P<ext>html|gz)$")
+
+
+def import_legacy(legacy_dir: Path, packs_dir: Path) -> Dict[str, List[str]]:
+    """Range les sauvegardes à plat de `legacy_dir` dans des packs mensuels.
+
+    Les fichiers déjà importés (même type, horodatage et hash) sont ignorés ;
+    l'import peut donc être relancé. Les fichiers sources ne sont pas supprimés.
+    """
+    report = {"imported": [], "skipped": []}
+    packs: Dict[Path, BackupPack] = {}
+    seen = set()
+    for data_file in sorted(Path(legacy_dir).iterdir()):
+        match = LEGACY_NAME.match(data_file.name)
+        if not match:
+            if not data_file.name.endswith(".meta.json"):
+                report["skipped"].append(data_file.name)
+            continue
+
+        meta_file = data_file.with_name(data_file.name + ".meta.json")
+        if match["ext"] == "gz":
+            meta_file = data_file.with_suffix(".meta.json")
+        meta = {}
+        if meta_file.exists():
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+        data = data_file.read_bytes()
+        if match["ext"] == "gz":
+            data = gzip.decompress(data)
+        when = datetime.strptime(match["date"] + match["time"], "%Y%m%d%H%M%S")
+        timestamp = meta.get("date", when.isoformat())
+
+        path = pack_path(packs_dir, when)
+        if path not in packs:
+            packs[path] = BackupPack(path)
+            seen.update((path, e["type"], e["timestamp"], e["hash"]) for e in packs[path].entries())
+        pack = packs[path]
+        key = (path, match["type"], timestamp, hashlib.sha256(data).hexdigest())
+        if key in seen:
+            continue
+        seen.add(key)
+        extra = {"url": meta["url"]} if "url" in meta else {}
+        if "hash" in meta:
+            extra["legacy_hash"] = meta["hash"]
+        pack.append(data, match["type"], timestamp, source=data_file.name, **extra)
+        report["imported"].append(data_file.name)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import des anciennes sauvegardes dans des packs")
+    parser.add_argument("legacy_dir", nargs="?", default="backups_old", help="Dossier des anciennes sauvegardes")
+    parser.add_argument("--packs", default=os.path.join(os.environ.get("BACKUP_DIR", "backups"), "packs"),
+                        help="Dossier des packs (défaut: $BACKUP_DIR/packs)")
+    args = parser.parse_args()
+
+    result = import_legacy(Path(args.legacy_dir), Path(args.packs))
+    print(f"✅ {len(result['imported'])} fichier(s) importé(s)")
+    if result["skipped"]:
+        print(f"⚠️ Ignorés (nom non reconnu): {', '.join(result['skipped'])}")
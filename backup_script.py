@@ -4,20 +4,29 @@ Script de sauvegarde pour WordPress.com - Version complète
 """
 
 import os
-import requests
+import sys
+import argparse
 from datetime import datetime
 import json
 import hashlib
 
+from backup_pack import BackupPack, pack_path
+from http_client import get_client
+from rest_backup import COLLECTIONS, RestBackup
+from snapshot_catalog import SnapshotCatalog
+
 # Configuration
 SITE_URL = os.environ.get("SITE_URL", "https://oupssecuretest.wordpress.com")
 BACKUP_DIR = "backups"
+PACKS_DIR = os.path.join(BACKUP_DIR, "packs")
+REST_STATE_FILE = os.path.join(BACKUP_DIR, "rest_state.json")
+REST_BACKUP_WORKERS = int(os.environ.get("REST_BACKUP_WORKERS", "8"))
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
 def fetch_url(url):
-    """Récupère le contenu d'une URL"""
+    """Récupère le contenu d'une URL (connexion réutilisée entre les flux du site)"""
     try:
-        response = requests.get(url, timeout=30)
+        response = get_client().get(url)
         response.raise_for_status()
         return response.text
     except Exception as e:
@@ -25,31 +34,17 @@ def fetch_url(url):
         return None
 
 def save_backup(content, backup_type, extension="html"):
-    """Sauvegarde le contenu dans un fichier"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{backup_type}_{timestamp}.{extension}"
-    filepath = os.path.join(BACKUP_DIR, filename)
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    # Calcul du hash pour vérification d'intégrité
-    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    """Ajoute le contenu au pack de sauvegarde du mois (compressé, indexé)"""
+    timestamp = datetime.now().isoformat()
+    pack = BackupPack(pack_path(PACKS_DIR))
     
-    # Sauvegarde des métadonnées
-    metadata = {
-        "url": SITE_URL,
-        "date": datetime.now().isoformat(),
-        "hash": content_hash,
-        "size": len(content),
-        "type": backup_type
-    }
+    # Le hash sha256 des octets bruts est calculé et stocké dans l'index du pack
+    entry = pack.append(content.encode('utf-8'), backup_type, timestamp,
+                        url=SITE_URL, extension=extension)
     
-    with open(filepath + '.meta.json', 'w') as f:
-        json.dump(metadata, f, indent=2)
-    
-    print(f"✅ Sauvegarde {backup_type} réussie: {filename}")
-    return filepath
+    print(f"✅ Sauvegarde {backup_type} réussie: {pack.path.name} "
+          f"({entry['size']} → {entry['length']} octets, {entry['codec']})")
+    return str(pack.path)
 
 def handle_manual_export():
     """Gère l'export manuel WordPress"""
@@ -88,8 +83,46 @@ def handle_manual_export():
         print("⚠️ Aucun fichier d'export manuel trouvé")
         return False
 
+def rest_backup(full=False):
+    """Sauvegarde des articles, pages, commentaires et médias par l'API REST (objets modifiés seulement)"""
+    auth = None
+    if os.environ.get("WP_USER") and os.environ.get("WP_APP_PASSWORD"):
+        auth = (os.environ["WP_USER"], os.environ["WP_APP_PASSWORD"])
+    backup = RestBackup(SITE_URL, PACKS_DIR, REST_STATE_FILE, workers=REST_BACKUP_WORKERS, auth=auth,
+                        log=lambda message: print(f"⚠️ {message}"))
+    report = backup.run(COLLECTIONS, full=full)
+    for collection, result in report.items():
+        status = "✅" if result["complete"] else "❌"
+        print(f"{status} {collection}: {result['objects']} objets modifiés ({result['pages']} pages), "
+              f"curseur {result['cursor'] or '—'}")
+    return all(result["complete"] for result in report.values())
+
+def update_catalog():
+    """Ajoute les nouvelles entrées des packs au catalogue (backups/catalog.db)"""
+    catalog = SnapshotCatalog(BACKUP_DIR)
+    try:
+        added = catalog.sync_packs(PACKS_DIR, SITE_URL)
+        print(f"📇 Catalogue à jour: {added} nouvelle(s) entrée(s)")
+    except Exception as e:
+        print(f"⚠️ Erreur mise à jour du catalogue: {e}")
+    finally:
+        catalog.close()
+
 def main():
     """Fonction principale de sauvegarde"""
+    parser = argparse.ArgumentParser(description="Sauvegarde WordPress")
+    parser.add_argument("--rest", action="store_true",
+                        help="Sauvegarde complète par l'API REST (incrémentale, reprise si interrompue)")
+    parser.add_argument("--full", action="store_true", help="Avec --rest : tout reprendre, sans curseur")
+    args = parser.parse_args()
+    
+    if args.rest:
+        print("🔄 Démarrage de la sauvegarde REST...")
+        # Code de sortie non nul si une collection est incomplète (reprise au prochain lancement)
+        complete = rest_backup(full=args.full)
+        update_catalog()
+        sys.exit(0 if complete else 1)
+    
     print("🔄 Démarrage de la sauvegarde...")
     
     # Sauvegarde de la page d'accueil
@@ -112,6 +145,7 @@ def main():
     # Gestion de l'export manuel
     handle_manual_export()
     
+    update_catalog()
     print("✅ Sauvegarde terminée")
 
 if __name__ == "__main__":
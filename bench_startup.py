@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Temps de démarrage de monitor.py par mode
+
+Chaque mode est lancé dans un processus neuf (dossiers de données
+temporaires, SMTP désactivé, aucun accès réseau) :
+
+· durée totale du processus (médiane et minimum sur --runs exécutions),
+  interpréteur seul (`python -c pass`) en référence ;
+· temps d'import mesuré par `python -X importtime` : total, nombre de
+  modules chargés et imports de premier niveau les plus coûteux.
+
+Usage :
+    python bench_startup.py                      # tous les modes
+    python bench_startup.py --modes import report
+    python bench_startup.py --save startup_history.jsonl   # suivi dans le temps
+
+Avec --save, les résultats sont ajoutés (une ligne JSON par exécution) et
+comparés à la mesure précédente du même fichier.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent
+MONITOR = str(ROOT / "monitor.py")
+
+# mode : arguments de l'interpréteur
+MODES = {
+    "python": ["-c", "pass"],
+    "import": ["-c", "import monitor"],
+    "help": [MONITOR, "--help"],
+    "test": [MONITOR, "--test"],
+    "report": [MONITOR, "--report"],
+    "backup": [MONITOR, "--backup"],
+    "restore": [MONITOR, "--restore"],
+}
+
+
+def bench_env(workdir: Path) -> Dict[str, str]:
+    """Environnement isolé : données dans `workdir`, aucun e-mail envoyé"""
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(ROOT) + os.pathsep + env.get("PYTHONPATH", ""),
+        "MONITOR_DIR": str(workdir / "monitor_data"),
+        "BACKUP_DIR": str(workdir / "backups"),
+        "RESTORE_DIR": str(workdir / "restored"),
+        "SMTP_USER": "",
+        "SMTP_PASS": "",
+        "ALERT_EMAIL": "",
+    })
+    return env
+
+
+def run(args: List[str], env: Dict[str, str], cwd: Path) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + args, env=env, cwd=cwd, capture_output=True, text=True)
+
+
+def parse_importtime(stderr: str, top: int = 5) -> Dict:
+    """Total (ms), nombre de modules et imports de premier niveau les plus coûteux"""
+    total_us, modules, first_level = 0, 0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        total_us += int(self_us)
+        modules += 1
+        if not name[1:].startswith(" "):
+            first_level.append((int(cumulative_us), name.strip()))
+    first_level.sort(reverse=True)
+    return {"import_ms": total_us / 1000, "modules": modules,
+            "heaviest": [[name, us / 1000] for us, name in first_level[:top]]}
+
+
+def bench_mode(mode: str, runs: int, env: Dict[str, str], cwd: Path) -> Dict:
+    args = MODES[mode]
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = run(args, env, cwd)
+        durations.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{mode} : code de sortie {proc.returncode}\n{proc.stderr[-2000:]}")
+    profile = parse_importtime(run(["-X", "importtime"] + args, env, cwd).stderr)
+    return {"median_ms": statistics.median(durations), "min_ms": min(durations), **profile}
+
+
+def last_entry(history: Path) -> Optional[Dict]:
+    try:
+        lines = history.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage de monitor.py par mode")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--runs", type=int, default=5, help="Exécutions par mode (défaut : 5)")
+    parser.add_argument("--save", metavar="FICHIER", type=Path,
+                        help="Ajoute les résultats à un historique JSONL et compare à la mesure précédente")
+    args = parser.parse_args()
+
+    previous = last_entry(args.save) if args.save else None
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="wpmonitor-bench-") as tmp:
+        workdir = Path(tmp)
+        env = bench_env(workdir)
+        # Une sauvegarde à restaurer pour le mode restore
+        if "restore" in args.modes:
+            run(MODES["backup"], env, workdir)
+        for mode in args.modes:
+            results[mode] = bench_mode(mode, args.runs, env, workdir)
+
+    print(f"{'mode':<10}{'médiane':>10}{'min':>10}{'imports':>10}{'modules':>9}  imports les plus coûteux")
+    for mode, r in results.items():
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in r["heaviest"][:3])
+        delta = ""
+        before = (previous or {}).get("results", {}).get(mode)
+        if before:
+            delta = f"  ({r['median_ms'] - before['median_ms']:+.0f} ms)"
+        print(f"{mode:<10}{r['median_ms']:>8.0f}ms{r['min_ms']:>8.0f}ms{r['import_ms']:>8.0f}ms{r['modules']:>9}  "
+              f"{heaviest}{delta}")
+
+    if args.save:
+        entry = {"timestamp": datetime.now(timezone.utc).isoformat(), "python": sys.version.split()[0],
+                 "runs": args.runs, "results": results}
+        with open(args.save, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"Résultats ajoutés à {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Moteur d'exécution concurrente des vérifications WP Monitor
+
+Exécute un ensemble de vérifications (fonctions sans argument renvoyant un
+dict de résultats) sur un pool de threads borné, avec une échéance globale
+par cycle. Les vérifications qui n'ont pas terminé à l'échéance sont
+renvoyées comme timeouts, avec le même format de dict que les
+vérifications normales.
+
+En mode flotte, au plus `per_host` tâches d'un même hôte sont en cours à
+la fois. La limite est appliquée à la soumission : la tâche suivante d'un
+hôte n'entre dans le pool que lorsqu'une des siennes se termine, si bien
+que les threads du pool exécutent toujours des requêtes au lieu d'attendre
+une place sur un hôte chargé.
+
+Un thread ne peut pas être interrompu : une vérification en retard se
+termine sur son propre timeout réseau. Pour qu'elle n'enregistre pas
+d'incident après la lecture des nouveaux incidents du cycle (il ne serait
+jamais notifié), l'enregistrement passe par `in_time()`, qui refuse
+l'écriture une fois l'échéance de la tâche courante passée.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Optional
+
+CheckFn = Callable[[], Dict]
+
+_current = threading.local()
+
+
+class _Cycle:
+    """Échéance partagée par les tâches d'un appel à run()"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.expired = False
+
+
+@contextmanager
+def in_time() -> Iterator[bool]:
+    """Vrai si la tâche courante est dans les temps (toujours vrai hors CheckEngine).
+
+    Le verrou du cycle est tenu pendant le bloc : l'échéance ne peut pas
+    passer entre le test et l'écriture qu'il protège.
+    """
+    cycle = getattr(_current, "cycle", None)
+    if cycle is None:
+        yield True
+        return
+    with cycle.lock:
+        yield not cycle.expired
+
+
+def _bind(fn: CheckFn, cycle: _Cycle) -> CheckFn:
+    def run():
+        _current.cycle = cycle
+        try:
+            return fn()
+        finally:
+            _current.cycle = None
+    return run
+
+
+class CheckEngine:
+    def __init__(self, max_workers: int = 8, deadline: float = 30.0, per_host: int = 0):
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.per_host = per_host  # 0 : pas de limite par hôte
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="check")
+        return self._executor
+
+    def run(self, tasks: Dict[str, CheckFn], defaults: Optional[Dict[str, Dict]] = None,
+            deadline: Optional[float] = None, hosts: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        """Lance toutes les tâches et renvoie {nom: résultat} à l'échéance.
+
+        `defaults` fournit, par nom de tâche, le dict de résultat vide à
+        compléter en cas d'exception ou de dépassement d'échéance.
+        `hosts` ({nom: hôte}) limite à `per_host` les tâches d'un hôte en
+        cours à la fois : les suivantes attendent ici qu'une place se libère,
+        sans occuper de thread du pool.
+        """
+        defaults = defaults or {}
+        deadline = self.deadline if deadline is None else deadline
+        hosts = (hosts or {}) if self.per_host else {}
+        start = time.monotonic()
+        stop_at = start + deadline
+        cycle = _Cycle()
+        futures: Dict[Future, str] = {}
+        active: Dict[str, int] = {}
+        waiting: Dict[str, Deque[str]] = {}
+
+        def submit(name: str) -> Future:
+            host = hosts.get(name)
+            if host is not None:
+                active[host] = active.get(host, 0) + 1
+            fut = self._pool().submit(_bind(tasks[name], cycle))
+            futures[fut] = name
+            return fut
+
+        pending = set()
+        for name in tasks:
+            host = hosts.get(name)
+            if host is not None and active.get(host, 0) >= self.per_host:
+                waiting.setdefault(host, deque()).append(name)
+            else:
+                pending.add(submit(name))
+
+        results: Dict[str, Dict] = {}
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, stop_at - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break  # échéance atteinte
+            for fut in done:
+                name = futures[fut]
+                try:
+                    results[name] = fut.result()
+                except Exception as e:
+                    results[name] = dict(defaults.get(name, {}), error=str(e))
+                host = hosts.get(name)
+                if host is not None:
+                    active[host] -= 1
+                    if waiting.get(host) and time.monotonic() < stop_at:
+                        pending.add(submit(waiting[host].popleft()))
+
+        if pending or any(waiting.values()):
+            with cycle.lock:
+                cycle.expired = True
+
+        elapsed = time.monotonic() - start
+        for fut in pending:
+            # Une tâche pas encore démarrée est annulée ; une tâche en cours
+            # se termine sur son propre timeout réseau, sans plus rien
+            # enregistrer (in_time) et sans que son résultat soit attendu.
+            fut.cancel()
+        late = [futures[fut] for fut in pending] + [name for queue in waiting.values() for name in queue]
+        for name in late:
+            results[name] = dict(defaults.get(name, {}),
+                                 error=f"timeout après {elapsed:.1f} s",
+                                 timed_out=True)
+
+        return {name: results[name] for name in tasks}
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Moteur de diff pour la vérification d'intégrité
+
+1. Normalisation : les jetons volatils des pages WordPress.com (nonces,
+   cache-busters ?ver=, horodatages, identifiants de requête...) sont
+   remplacés par des marqueurs selon un jeu de règles configurable, pour
+   que deux chargements d'une page inchangée donnent le même texte.
+2. Découpage : le HTML minifié tient souvent sur quelques lignes géantes ;
+   le texte est redécoupé après chaque balise fermante '>'.
+3. Diff borné : préfixe et suffixe communs retirés en temps linéaire, puis
+   comparaison des lignes par leur hash. Le coût de SequenceMatcher est
+   borné par max_cells (produit des nombres de lignes restant à comparer,
+   pire cas quadratique) ; au-delà, on se rabat sur un diff par
+   multiensemble en O(n), sans positions, signalé par exact=False.
+
+Le résultat ne garde qu'un patch compact et des statistiques.
+"""
+
+import hashlib
+import json
+import re
+import time
+from collections import Counter
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RULES = [
+    ("nonce", r'(?i)((?:_wpnonce|nonce|_ajax_nonce)["\']?\s*[:=]\s*["\']?)[0-9a-f]{6,}', r'\1<NONCE>'),
+    ("cache_buster", r'(?i)([?&](?:ver|v|m|ts|_|cb)=)[\w.\-]+', r'\1<VER>'),
+    ("iso_datetime", r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?', '<DATETIME>'),
+    ("rfc822_date", r'(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun), \d{1,2} \w{3} \d{4} \d{2}:\d{2}:\d{2} [+-]\d{4}', '<DATE>'),
+    ("unix_timestamp", r'(?<![\w.])1[5-9]\d{8}(?:\d{3})?(?![\w.])', '<TS>'),
+    ("generation_comment", r'<!--[^>]*?(?:generated|served|cached|seconds|queries)[^>]*?-->', '<!--<GEN>-->'),
+    ("wpcom_deploy_slot", r'(mu-plugins\\?/[\w\-]+\\?/)(?:moon|sun)(?=\\?/)', r'\1<SLOT>'),
+    ("wpcom_static_bundle", r'(_static/\?\?-)[\w\-=+/]+', r'\1<BUNDLE>'),
+    ("wpcom_cdn_shard", r'\b([is])[0-3]\.wp\.com\b', r'\1<N>.wp.com'),
+    ("wpcom_stats_crypt", r'''([\'"]crypt[\'"]\s*:\s*[\'"])[^\'"]+''', r'\1<CRYPT>'),
+    ("request_id", r'(?i)((?:request|trace|session)[-_]?id["\']?\s*[:=]\s*["\']?)[\w\-]{8,}', r'\1<ID>'),
+]
+
+
+def load_rules(rules_file: Optional[Path] = None) -> List[Tuple[str, "re.Pattern", str]]:
+    """Règles de normalisation compilées : fichier JSON [{name, pattern, replacement}] ou défaut"""
+    rules = DEFAULT_RULES
+    if rules_file is not None and Path(rules_file).exists():
+        with open(rules_file, 'r', encoding='utf-8') as f:
+            rules = [(r["name"], r["pattern"], r.get("replacement", "")) for r in json.load(f)]
+    return [(name, re.compile(pattern), repl) for name, pattern, repl in rules]
+
+
+def normalize(content: str, rules) -> str:
+    for _name, pattern, repl in rules:
+        content = pattern.sub(repl, content)
+    return content
+
+
+def split_units(content: str) -> List[str]:
+    """Lignes, redécoupées après chaque '>' pour éclater le HTML minifié"""
+    units = []
+    for line in content.splitlines():
+        units.extend(part.strip() for part in line.replace('>', '>\n').split('\n') if part.strip())
+    return units
+
+
+def content_hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class DiffEngine:
+    def __init__(self, rules=None, max_cells: int = 250_000, max_patch_bytes: int = 1500):
+        self.rules = rules if rules is not None else load_rules()
+        self.max_cells = max_cells
+        self.max_patch_bytes = max_patch_bytes
+
+    def normalize(self, content: str) -> str:
+        return normalize(content, self.rules)
+
+    def fingerprint(self, content: str) -> str:
+        """Hash du contenu normalisé (insensible au bruit)"""
+        return content_hash(self.normalize(content))
+
+    def diff(self, old: str, new: str) -> Dict:
+        """Compare deux contenus bruts ; renvoie stats + patch compact"""
+        start = time.monotonic()
+        a = split_units(self.normalize(old))
+        b = split_units(self.normalize(new))
+
+        # Préfixe / suffixe communs : O(n)
+        lo = 0
+        while lo < len(a) and lo < len(b) and a[lo] == b[lo]:
+            lo += 1
+        hi_a, hi_b = len(a), len(b)
+        while hi_a > lo and hi_b > lo and a[hi_a - 1] == b[hi_b - 1]:
+            hi_a -= 1
+            hi_b -= 1
+        mid_a, mid_b = a[lo:hi_a], b[lo:hi_b]
+
+        result = {"changed": bool(mid_a or mid_b), "added": 0, "removed": 0, "exact": True,
+                  "units": len(b), "patch": ""}
+        if not result["changed"]:
+            return result
+
+        hunks: List[str] = []
+        # SequenceMatcher ne peut pas être interrompu : seule la taille le borne
+        if len(mid_a) * len(mid_b) <= self.max_cells:
+            # Les lignes sont remplacées par des entiers : comparaisons en O(1)
+            ids: Dict[str, int] = {}
+            ha = [ids.setdefault(u, len(ids)) for u in mid_a]
+            hb = [ids.setdefault(u, len(ids)) for u in mid_b]
+            for tag, i1, i2, j1, j2 in SequenceMatcher(None, ha, hb, autojunk=False).get_opcodes():
+                if tag == 'equal':
+                    continue
+                result["removed"] += i2 - i1
+                result["added"] += j2 - j1
+                hunks.append(f"@@ -{lo + i1 + 1},{i2 - i1} +{lo + j1 + 1},{j2 - j1} @@")
+                hunks.extend("-" + u for u in mid_a[i1:i2])
+                hunks.extend("+" + u for u in mid_b[j1:j2])
+        else:
+            result["exact"] = False
+            removed = Counter(mid_a) - Counter(mid_b)
+            added = Counter(mid_b) - Counter(mid_a)
+            result["removed"] = sum(removed.values())
+            result["added"] = sum(added.values())
+            hunks.append(f"@@ ~{lo + 1} (diff approximatif) @@")
+            # Chaque unité autant de fois que comptée : patch et statistiques concordent
+            # (_compact borne la taille du patch)
+            hunks.extend("-" + u for u in removed.elements())
+            hunks.extend("+" + u for u in added.elements())
+
+        result["changed"] = bool(result["added"] or result["removed"])
+        result["patch"] = self._compact(hunks)
+        result["elapsed"] = round(time.monotonic() - start, 4)
+        return result
+
+    def _compact(self, lines: List[str]) -> str:
+        out, size = [], 0
+        for line in lines:
+            if len(line) > 200:
+                line = line[:200] + "…"
+            if size + len(line) + 1 > self.max_patch_bytes:
+                out.append(f"... ({len(lines) - len(out)} lignes omises)")
+                break
+            out.append(line)
+            size += len(line) + 1
+        return "\n".join(out)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Exploration complète d'un site à partir de son sitemap
+
+· Graines : sitemap.xml (index de sitemaps suivi récursivement), flux RSS
+  et page d'accueil ; seules les URLs de même origine sont retenues.
+· Chaque page récupérée fournit ses ressources JS/CSS de même origine, qui
+  sont ajoutées à l'exploration.
+· Index persistant (SQLite) URL -> hash normalisé, ETag / Last-Modified et
+  ressources de la page : les URLs inchangées répondent 304 à la requête
+  conditionnelle et ne sont ni relues ni analysées ; une page 304 renvoie
+  ses ressources connues, qui restent vérifiées.
+· Pool de threads borné, au plus `per_host` requêtes simultanées par hôte,
+  échéance globale : les URLs non visitées le seront en priorité à
+  l'exploration suivante (ordre : jamais vérifiées, puis les plus anciennes).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import requests
+
+from fleet import HostLimiter, host_of
+from http_client import HTTPClient, Timeout, get_client
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    hash TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    status INTEGER,
+    assets TEXT,
+    checked_at REAL NOT NULL DEFAULT 0,
+    changed_at REAL
+);
+"""
+
+MAX_BODY_BYTES = 5 * 1024 * 1024
+MAX_SITEMAPS = 50
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_sitemap(xml: bytes) -> Tuple[List[str], List[str]]:
+    """(pages, sous-sitemaps) d'un sitemap ou d'un index de sitemaps"""
+    root = ET.fromstring(xml)
+    locs = [el.text.strip() for el in root.iter() if _local(el.tag) == 'loc' and el.text]
+    if _local(root.tag) == 'sitemapindex':
+        return [], locs
+    # Les sitemaps d'images/vidéos imbriquent des <loc> de médias : seules
+    # les <url><loc> directes désignent des pages
+    pages = []
+    for url_el in root:
+        for child in url_el:
+            if _local(child.tag) == 'loc' and child.text:
+                pages.append(child.text.strip())
+    return pages, []
+
+
+def parse_feed_links(xml: bytes) -> List[str]:
+    """Liens des articles d'un flux RSS/Atom"""
+    root = ET.fromstring(xml)
+    links = []
+    for el in root.iter():
+        if _local(el.tag) != 'link':
+            continue
+        href = el.get('href') or (el.text or '').strip()
+        if href:
+            links.append(href)
+    return links
+
+
+class _AssetParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.assets: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script' and attrs.get('src'):
+            self.assets.append(attrs['src'])
+        elif tag == 'link' and attrs.get('href') and 'stylesheet' in (attrs.get('rel') or '').lower().split():
+            self.assets.append(attrs['href'])
+
+
+def extract_assets(html: str, base_url: str) -> List[str]:
+    """Ressources JS/CSS de même origine référencées par une page"""
+    parser = _AssetParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass  # HTML invalide : on garde ce qui a été lu
+    origin = host_of(base_url)
+    assets = []
+    for ref in parser.assets:
+        url = urldefrag(urljoin(base_url, ref.strip()))[0]
+        if host_of(url) == origin and url not in assets:
+            assets.append(url)
+    return assets
+
+
+class CrawlIndex:
+    def __init__(self, db_file: Path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, kind, hash, etag, last_modified, status, assets, checked_at FROM urls WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        return {"url": row[0], "kind": row[1], "hash": row[2], "etag": row[3], "last_modified": row[4],
+                "status": row[5], "assets": json.loads(row[6]) if row[6] else [], "checked_at": row[7]}
+
+    def checked_at(self, urls: List[str]) -> Dict[str, float]:
+        with self._lock:
+            rows = self._conn.execute("SELECT url, checked_at FROM urls").fetchall()
+        known = dict(rows)
+        return {url: known.get(url, 0.0) for url in urls}
+
+    def record(self, url: str, kind: str, status: int, digest: Optional[str] = None,
+               etag: Optional[str] = None, last_modified: Optional[str] = None,
+               assets: Optional[List[str]] = None, changed: bool = False):
+        """Met à jour l'entrée de `url`.
+
+        Sans contenu (304, erreur HTTP), seuls le statut et la date de
+        vérification changent : le hash de référence est conservé.
+        """
+        now = time.time()
+        with self._lock:
+            if digest is None:
+                self._conn.execute(
+                    "INSERT INTO urls (url, kind, status, checked_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (url) DO UPDATE SET status = excluded.status, checked_at = excluded.checked_at",
+                    (url, kind, status, now))
+                return
+            self._conn.execute(
+                "INSERT INTO urls (url, kind, hash, etag, last_modified, status, assets, checked_at, changed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET kind = excluded.kind, hash = excluded.hash, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, status = excluded.status, assets = excluded.assets, "
+                "checked_at = excluded.checked_at, changed_at = COALESCE(excluded.changed_at, urls.changed_at)",
+                (url, kind, digest, etag, last_modified, status, json.dumps(assets) if assets is not None else None,
+                 now, now if changed else None))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Crawler:
+    """Exploration d'un site ; `fingerprint` hache un contenu, `inspect(url, kind, text)` l'analyse"""
+
+    def __init__(self, site_url: str, index: CrawlIndex, fingerprint: Callable[[str], str],
+                 inspect: Optional[Callable[[str, str, str], None]] = None, workers: int = 8,
+                 per_host: int = 4, deadline: float = 9000, max_urls: int = 5000, max_assets: int = 1000,
+                 timeout: Optional[Timeout] = None, client: Optional[HTTPClient] = None):
+        self.site_url = site_url.rstrip('/')
+        self.host = host_of(self.site_url)
+        self.index = index
+        self.fingerprint = fingerprint
+        self.inspect = inspect
+        self.workers = workers
+        self.limiter = HostLimiter(per_host)
+        self.deadline = deadline
+        self.max_urls = max_urls
+        # Budget distinct : un sitemap de max_urls pages ou plus ne doit pas priver les ressources
+        self.max_assets = max_assets
+        self.timeout = timeout
+        # Client partagé : pool de connexions par hôte (HTTP_POOL_MAXSIZE >= workers)
+        self.client = client or get_client()
+
+    def _same_origin(self, url: str) -> bool:
+        return urlsplit(url).scheme in ('http', 'https') and host_of(url) == self.host
+
+    def _get(self, url: str, headers: Optional[Dict] = None) -> requests.Response:
+        with self.limiter.slot(host_of(url)):
+            return self.client.get(url, timeout=self.timeout, headers=headers or {}, endpoint="crawl")
+
+    def seeds(self) -> List[str]:
+        """URLs de pages : sitemaps (récursifs), flux RSS et page d'accueil"""
+        pages = [self.site_url + '/']
+        pending, seen_sitemaps = deque([self.site_url + '/sitemap.xml']), set()
+        while pending and len(seen_sitemaps) < MAX_SITEMAPS:
+            sitemap = pending.popleft()
+            if sitemap in seen_sitemaps or not self._same_origin(sitemap):
+                continue
+            seen_sitemaps.add(sitemap)
+            try:
+                resp = self._get(sitemap)
+                if resp.status_code != 200:
+                    continue
+                found, children = parse_sitemap(resp.content)
+            except (requests.RequestException, ET.ParseError):
+                continue
+            pages.extend(found)
+            pending.extend(children)
+        for feed in (self.site_url + '/feed/', self.site_url + '/comments/feed/'):
+            try:
+                resp = self._get(feed)
+                if resp.status_code == 200:
+                    pages.extend(parse_feed_links(resp.content))
+            except (requests.RequestException, ET.ParseError):
+                continue
+
+        unique = []
+        seen = set()
+        for url in pages:
+            url = urldefrag(url)[0]
+            if self._same_origin(url) and url not in seen:
+                seen.add(url)
+                unique.append(url)
+        return unique
+
+    def visit(self, url: str, kind: str) -> Dict:
+        """Requête conditionnelle puis mise à jour de l'index ; renvoie le résultat de l'URL"""
+        entry = self.index.get(url)
+        headers = {}
+        if entry is not None and entry["hash"]:
+            if entry["etag"]:
+                headers['If-None-Match'] = entry["etag"]
+            if entry["last_modified"]:
+                headers['If-Modified-Since'] = entry["last_modified"]
+
+        resp = self._get(url, headers)
+        result = {"url": url, "kind": kind, "status": resp.status_code, "state": "error", "assets": []}
+        if resp.status_code == 304:
+            self.index.record(url, kind, 304)
+            result.update(state="not_modified", assets=entry["assets"])
+            return result
+        if resp.status_code != 200:
+            self.index.record(url, kind, resp.status_code)
+            return result
+        if len(resp.content) > MAX_BODY_BYTES:
+            result["state"] = "too_large"
+            return result
+
+        text = resp.text
+        digest = self.fingerprint(text)
+        assets = extract_assets(text, url) if kind == "page" else None
+        if entry is None or entry["hash"] is None:
+            state = "new"
+        elif entry["hash"] != digest:
+            state = "changed"
+        else:
+            state = "unchanged"
+        if state != "unchanged" and self.inspect is not None:
+            self.inspect(url, kind, text)
+        # L'index n'est mis à jour qu'après analyse : une analyse interrompue
+        # sera refaite à l'exploration suivante
+        self.index.record(url, kind, 200, digest, resp.headers.get('ETag'), resp.headers.get('Last-Modified'),
+                          assets, changed=(state == "changed"))
+        result.update(state=state, assets=assets or [], old_hash=entry["hash"] if entry else None, hash=digest)
+        return result
+
+    def run(self) -> Dict:
+        """Exploration complète (ou jusqu'à l'échéance) ; renvoie les statistiques"""
+        start = time.monotonic()
+        stop_at = start + self.deadline
+        report = {"started": datetime.now().isoformat(), "pages": 0, "assets": 0, "new": [], "changed": [],
+                  "not_modified": 0, "unchanged": 0, "errors": [], "pending": 0}
+
+        # Priorité aux URLs jamais vérifiées, puis aux plus anciennes
+        pages = self.seeds()
+        checked = self.index.checked_at(pages)
+        pages.sort(key=lambda u: checked[u])
+        queue: Deque[Tuple[str, str]] = deque((url, "page") for url in pages[:self.max_urls])
+        report["pending"] = max(0, len(pages) - self.max_urls)
+        seen = set(pages)
+        assets_queued = 0
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl")
+        running = {}
+        try:
+            while queue or running:
+                while queue and len(running) < self.workers * 2 and time.monotonic() < stop_at:
+                    url, kind = queue.popleft()
+                    running[pool.submit(self.visit, url, kind)] = (url, kind)
+                if not running:
+                    break
+                done, _ = wait(running, timeout=max(0.0, stop_at - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break  # échéance atteinte
+                for future in done:
+                    url, kind = running.pop(future)
+                    report["pages" if kind == "page" else "assets"] += 1
+                    try:
+                        res = future.result()
+                    except Exception as e:
+                        report["errors"].append((url, str(e)))
+                        continue
+                    if res["state"] in ("new", "changed"):
+                        report[res["state"]].append(res)
+                    elif res["state"] in ("not_modified", "unchanged"):
+                        report[res["state"]] += 1
+                    else:
+                        report["errors"].append((url, f"HTTP {res['status']}" if res["state"] == "error"
+                                                 else res["state"]))
+                    for asset in res["assets"]:
+                        if asset not in seen and assets_queued < self.max_assets:
+                            seen.add(asset)
+                            assets_queued += 1
+                            queue.append((asset, "asset"))
+        finally:
+            report["pending"] += len(queue) + len(running)
+            # Les requêtes en cours se terminent (timeout réseau) avant le retour
+            pool.shutdown(wait=True, cancel_futures=True)
+        report["elapsed"] = round(time.monotonic() - start, 2)
+        return report
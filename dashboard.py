@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Tableau de bord HTML construit par sections, avec cache
+
+· Chaque section a une clé peu coûteuse à calculer qui résume ses données
+  (révision de la base d'incidents, taille des segments de séries
+  temporelles, jour courant). Si la clé n'a pas changé depuis la dernière
+  construction, le fragment HTML en cache est réutilisé sans relire les
+  données.
+· Les sections lisent des agrégats déjà calculés : compteurs journaliers
+  d'incidents, agrégats journaliers de disponibilité, statistiques SLA.
+· Page écrite de façon atomique ; le cache ne garde que les sections de la
+  dernière construction.
+"""
+
+import html
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+from incident_store import IncidentStore
+from timeseries import TimeSeriesStore
+
+STYLE = """
+body{font-family:system-ui,sans-serif;margin:2em;color:#222}
+h1{font-size:1.4em}h2{font-size:1.15em;margin-top:2em;border-bottom:1px solid #ddd}
+table{border-collapse:collapse;margin:.5em 0}td,th{padding:.25em .6em;border:1px solid #ddd;text-align:right}
+th:first-child,td:first-child{text-align:left}.bad{background:#fdd}.warn{background:#ffe9b3}.ok{background:#dfd}
+.muted{color:#888}
+"""
+
+
+class Section:
+    def __init__(self, name: str, title: str, key: str, render: Callable[[], str]):
+        self.name = name
+        self.title = title
+        self.key = key
+        self.render = render
+
+
+class Dashboard:
+    def __init__(self, output_file: Path, cache_file: Path, title: str = "Tableau de bord WordPress"):
+        self.output_file = Path(output_file)
+        self.cache_file = Path(cache_file)
+        self.title = title
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def _write(self, path: Path, text: str):
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def build(self, sections: Iterable[Section]) -> Dict:
+        """Construit la page ; renvoie {rendered, cached, elapsed} (noms des sections)"""
+        start = time.perf_counter()
+        cache = self._load_cache()
+        fresh, rendered, cached, parts = {}, [], [], []
+        for section in sections:
+            entry = cache.get(section.name)
+            if entry is not None and entry["key"] == section.key:
+                cached.append(section.name)
+            else:
+                entry = {"key": section.key, "html": section.render()}
+                rendered.append(section.name)
+            fresh[section.name] = entry
+            parts.append(f'<section id="{html.escape(section.name)}"><h2>{html.escape(section.title)}</h2>\n'
+                         f'{entry["html"]}</section>')
+
+        generated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        page = (f'<!DOCTYPE html>\n<html lang="fr"><head><meta charset="utf-8">'
+                f'<title>{html.escape(self.title)}</title><style>{STYLE}</style></head>\n<body>'
+                f'<h1>{html.escape(self.title)}</h1><p class="muted">Généré le {generated}</p>\n'
+                + "\n".join(parts) + "\n</body></html>\n")
+        self._write(self.output_file, page)
+        if rendered or set(cache) != set(fresh):
+            self._write(self.cache_file, json.dumps(fresh, ensure_ascii=False))
+        return {"rendered": rendered, "cached": cached, "elapsed": time.perf_counter() - start}
+
+
+# --- Sections ---
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _segments_key(store: TimeSeriesStore, resolution: str, start: float) -> str:
+    return ",".join(f"{p.name}:{p.stat().st_size}" for p in store.segments(resolution, start, time.time() + 1))
+
+
+def _duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    return f"{minutes} min" if minutes < 60 else f"{minutes // 60} h {minutes % 60:02d}"
+
+
+def _ms(seconds) -> str:
+    return f"{seconds * 1000:.0f} ms" if seconds is not None else "—"
+
+
+def _uptime_class(uptime) -> str:
+    if uptime is None:
+        return "muted"
+    return "ok" if uptime >= 99.9 else "warn" if uptime >= 99 else "bad"
+
+
+def availability_section(store: TimeSeriesStore, days: int = 7) -> Section:
+    """Disponibilité, latences p50/p95/p99, pannes et MTTR par site sur `days` jours"""
+    start = time.time() - days * 86400
+
+    def render() -> str:
+        # numpy n'est chargé que si la section doit être recalculée
+        try:
+            from sla import site_sla
+        except ImportError:  # numpy absent : disponibilité calculée sur les agrégats journaliers seuls
+            return '<p class="muted">numpy non installé : statistiques détaillées indisponibles</p>'
+        stats = site_sla(store, start, time.time())
+        if not stats:
+            return '<p class="muted">Aucune mesure sur la période</p>'
+        rows = ["<table><tr><th>Site</th><th>Disponibilité</th><th>Mesures</th><th>p50</th><th>p95</th>"
+                "<th>p99</th><th>Pannes</th><th>Indisponibilité</th><th>MTTR</th></tr>"]
+        for url, s in sorted(stats.items()):
+            uptime = f"{s['uptime']:.3f} %" if s["uptime"] is not None else "—"
+            outages = f"{s['outages']}" + (f" ({s['open_outages']} en cours)" if s["open_outages"] else "")
+            rows.append(f'<tr><td>{html.escape(url)}</td><td class="{_uptime_class(s["uptime"])}">{uptime}</td>'
+                        f'<td>{s["samples"]}</td><td>{_ms(s["p50"])}</td><td>{_ms(s["p95"])}</td><td>{_ms(s["p99"])}</td>'
+                        f'<td>{outages}</td><td>{_duration(s["downtime"])}</td>'
+                        f'<td>{_duration(s["mttr"]) if s["mttr"] is not None else "—"}</td></tr>')
+        note = ""
+        detailed = max(s["detailed_from"] for s in stats.values())
+        if detailed > start:
+            note = (f'<p class="muted">Avant le {datetime.fromtimestamp(detailed).strftime("%d/%m %H:%M")} : '
+                    f'agrégats horaires / journaliers (percentiles, pannes et MTTR depuis cette date)</p>')
+        return "\n".join(rows) + "</table>" + note
+
+    return Section("availability", f"Disponibilité ({days} derniers jours)",
+                   f"{_today()}|{_segments_key(store, 'raw', start)}|{_segments_key(store, 'hour', start)}", render)
+
+
+def uptime_history_section(store: TimeSeriesStore, days: int = 30) -> Section:
+    """Disponibilité journalière par site, depuis les agrégats journaliers"""
+    start = (time.time() // 86400 - days) * 86400
+
+    def render() -> str:
+        daily = store.query(start, resolution="day", check="availability")
+        if not len(daily["ts"]):
+            return '<p class="muted">Aucun agrégat journalier pour le moment</p>'
+        table: Dict[int, Dict[int, float]] = {}
+        for ts, site_id, count, ok in zip(daily["ts"], daily["site"], daily["count"], daily["ok"]):
+            table.setdefault(site_id, {})[ts] = 100 * ok / count if count else None
+        day_list = sorted({ts for per_site in table.values() for ts in per_site})
+        head = "".join(f"<th>{datetime.fromtimestamp(d, timezone.utc).strftime('%d/%m')}</th>" for d in day_list)
+        rows = [f"<table><tr><th>Site</th>{head}</tr>"]
+        for site_id, per_site in sorted(table.items(), key=lambda item: store.site_name(item[0])):
+            cells = "".join(f'<td class="{_uptime_class(per_site.get(d))}">'
+                            f'{"" if per_site.get(d) is None else f"{per_site[d]:.1f}"}</td>' for d in day_list)
+            rows.append(f"<tr><td>{html.escape(store.site_name(site_id))}</td>{cells}</tr>")
+        return "\n".join(rows) + "</table>"
+
+    return Section("uptime_history", f"Disponibilité journalière (%, {days} jours)",
+                   f"{_today()}|{_segments_key(store, 'day', start)}", render)
+
+
+def incident_sections(label: str, store: IncidentStore, days: int = 30, recent: int = 20) -> List[Section]:
+    """Compteurs journaliers par sévérité, derniers incidents et épisodes répétés d'un site"""
+    first_day = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    key = f"{_today()}|{store.revision()}"
+    slug = "".join(c if c.isalnum() else "-" for c in label).strip("-")
+
+    def render_counts() -> str:
+        per_day: Dict[str, Dict[str, int]] = {}
+        per_type: Dict[str, int] = {}
+        for day, typ, severity, count in store.daily_counts(first_day):
+            per_day.setdefault(day, {})
+            per_day[day][severity] = per_day[day].get(severity, 0) + count
+            per_type[typ] = per_type.get(typ, 0) + count
+        if not per_day:
+            return '<p class="muted">Aucun incident sur la période</p>'
+        severities = ["critical", "high", "medium", "low", "info"]
+        rows = ["<table><tr><th>Jour</th>" + "".join(f"<th>{s}</th>" for s in severities) + "</tr>"]
+        for day in sorted(per_day, reverse=True):
+            cells = "".join(f'<td class="{"bad" if s in ("critical", "high") and per_day[day].get(s) else ""}">'
+                            f'{per_day[day].get(s, "")}</td>' for s in severities)
+            rows.append(f"<tr><td>{day}</td>{cells}</tr>")
+        rows.append("</table><table><tr><th>Type</th><th>Incidents</th></tr>")
+        for typ, count in sorted(per_type.items(), key=lambda item: -item[1]):
+            rows.append(f"<tr><td>{html.escape(typ)}</td><td>{count}</td></tr>")
+        return "\n".join(rows) + "</table>"
+
+    def render_recent() -> str:
+        rows = ["<table><tr><th>Horodatage</th><th>Sévérité</th><th>Type</th><th>Détails</th></tr>"]
+        for inc in reversed(store.tail(recent)):
+            details = inc["details"]
+            details = json.dumps(details, ensure_ascii=False) if isinstance(details, (dict, list)) else str(details)
+            rows.append(f'<tr><td>{html.escape(inc["timestamp"])}</td><td>{html.escape(inc["severity"])}</td>'
+                        f'<td>{html.escape(inc["type"])}</td><td>{html.escape(details[:300])}</td></tr>')
+        rows.append("</table>")
+        episodes = [ep for ep in store.open_episodes() if ep["count"] > 1]
+        if episodes:
+            rows.append("<p>Incidents répétés (épisodes ouverts) :</p><table><tr><th>Type</th><th>Sévérité</th>"
+                        "<th>Occurrences</th><th>Dernière</th></tr>")
+            for ep in episodes:
+                last = datetime.fromtimestamp(ep["last_ts"], timezone.utc).strftime("%Y-%m-%d %H:%M")
+                rows.append(f'<tr><td>{html.escape(ep["type"])}</td><td>{html.escape(ep["severity"])}</td>'
+                            f'<td>{ep["count"]}</td><td>{last}</td></tr>')
+            rows.append("</table>")
+        return "\n".join(rows)
+
+    return [Section(f"incidents-{slug}", f"Incidents par jour — {label} ({days} jours)", key, render_counts),
+            Section(f"recent-{slug}", f"Derniers incidents — {label}", key, render_recent)]
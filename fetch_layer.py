@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Couche de récupération HTTP partagée par cycle de surveillance
+
+· Chaque URL n'est téléchargée qu'une fois par cycle, même si plusieurs
+  vérifications la demandent en parallèle ; la même réponse (ou la même
+  exception) est rendue à chacune.
+· Les validateurs HTTP (ETag / Last-Modified) sont conservés sur disque et
+  renvoyés en If-None-Match / If-Modified-Since : une réponse 304 permet aux
+  vérifications de sauter hash, diff et recherche de patterns.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from http_client import HTTPClient, Timeout, get_client
+
+
+class FetchResult:
+    def __init__(self, url: str, status_code: int, text: str = "", headers: Optional[Dict] = None,
+                 elapsed: float = 0.0, phases: Optional[Dict[str, float]] = None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.elapsed = elapsed
+        self.phases = phases or {}
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200 or self.not_modified
+
+
+class CycleFetcher:
+    def __init__(self, validators_file: Path, timeout: Optional[Timeout] = None,
+                 client: Optional[HTTPClient] = None):
+        self.validators_file = Path(validators_file)
+        self.timeout = timeout
+        self.client = client or get_client()
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._cache: Dict[str, object] = {}
+        self._pending: Dict[str, Dict] = {}
+        self._validators = self._load_validators()
+
+    def _load_validators(self) -> Dict[str, Dict]:
+        try:
+            with open(self.validators_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def new_cycle(self):
+        """Oublie les réponses du cycle précédent et relit les validateurs"""
+        with self._lock:
+            self._cache.clear()
+            self._pending.clear()
+            self._validators = self._load_validators()
+
+    def get(self, url: str, conditional: bool = True) -> FetchResult:
+        """Renvoie la réponse du cycle pour `url`, en la téléchargeant au besoin.
+
+        Avec conditional=False, une réponse 304 en cache est ignorée et l'URL
+        est retéléchargée sans validateurs (ex. référence locale absente).
+        """
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+
+        with url_lock:
+            cached = self._cache.get(url)
+            if cached is not None and (conditional or not getattr(cached, 'not_modified', False)):
+                if isinstance(cached, Exception):
+                    raise cached
+                return cached
+
+            try:
+                result = self._fetch(url, conditional)
+            except Exception as e:
+                self._cache[url] = e
+                raise
+            self._cache[url] = result
+            return result
+
+    def _fetch(self, url: str, conditional: bool) -> FetchResult:
+        headers = {}
+        if conditional:
+            validators = self._validators.get(url, {})
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        resp = self.client.get(url, timeout=self.timeout, headers=headers)
+        result = FetchResult(url, resp.status_code, resp.text if resp.status_code != 304 else "",
+                             dict(resp.headers), resp.phases["total"], resp.phases)
+
+        if resp.status_code == 200:
+            fresh = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+            with self._lock:
+                self._pending[url] = fresh
+        return result
+
+    def commit(self, url: str):
+        """Persiste les validateurs de `url` une fois son contenu traité.
+
+        À n'appeler qu'après mise à jour des références locales : un 304 au
+        cycle suivant signifie alors « identique à la référence ».
+        """
+        with self._lock:
+            fresh = self._pending.pop(url, None)
+            if fresh is None:
+                return
+            self._validators[url] = fresh
+            self._write_validators()
+
+    def _write_validators(self):
+        # Écriture atomique : un crash ne laisse jamais un fichier tronqué
+        tmp = self.validators_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._validators, f, indent=2)
+        os.replace(tmp, self.validators_file)
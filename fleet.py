@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Outils du mode flotte (surveillance multi-sites)
+
+· Lecture de l'inventaire des sites (une URL par ligne, # pour commenter)
+· Nom de dossier d'état stable par site
+· Limitation du nombre de requêtes simultanées par hôte
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+
+def load_inventory(path: Path) -> List[str]:
+    """Renvoie les URLs de l'inventaire, sans doublons, dans l'ordre du fichier"""
+    urls = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            url = line.split('#', 1)[0].strip().rstrip('/')
+            if not url or url in seen:
+                continue
+            if not url.startswith(('http://', 'https://')):
+                raise ValueError(f"URL invalide dans l'inventaire: {url}")
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+def site_slug(url: str) -> str:
+    """Nom de dossier d'état pour un site : hôte[_port][_chemin]"""
+    parts = urlsplit(url)
+    slug = parts.netloc + parts.path.rstrip('/')
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', slug).strip('_').lower()
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class HostLimiter:
+    """Sémaphore par hôte : au plus `per_host` tâches simultanées sur un hôte"""
+
+    def __init__(self, per_host: int = 2):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    @contextmanager
+    def slot(self, host: str):
+        with self._lock:
+            sem = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with sem:
+            yield
@@ -0,0 +1,21 @@
+# Configuration gunicorn de l'outil d'authentification WordPress
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Workers gthread : chaque worker sert GUNICORN_THREADS requêtes à la fois,
+# un WordPress lent n'immobilise qu'un thread et non un worker entier.
+# C'est le mode concurrent retenu, plutôt qu'un worker asynchrone ou ASGI :
+# Flask et requests sont synchrones, et l'attente réseau libère le GIL.
+# Chaque worker a son propre client HTTP (pool de connexions persistantes,
+# créé à la première requête, donc après le fork) et son propre cache de
+# réponses (AUTH_CACHE_TTL).
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:5000")  # derrière nginx (proxy_pass :5000)
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+# Au-delà de AUTH_UPSTREAM_TIMEOUT (10 s par défaut) avec de la marge
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = False
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Client HTTP partagé (connexions persistantes)
+
+· Une seule `requests.Session` pour tous les outils : les connexions TCP/TLS
+  sont gardées ouvertes (keep-alive) et réutilisées entre la page d'accueil,
+  les flux et les endpoints d'un même hôte, au lieu d'une poignée de main
+  par requête.
+· Un pool de connexions par hôte (`pool_maxsize` connexions simultanées
+  réutilisables par hôte, `pool_connections` hôtes gardés en mémoire, pour
+  le mode flotte).
+· Délais de connexion et de lecture séparés, et User-Agent communs.
+· `cookies=False` : session qui refuse tout cookie, pour un client partagé
+  entre utilisateurs (outil d'authentification).
+· Chaque requête est chronométrée par phase (dns, connect, tls, ttfb,
+  download) par des connexions urllib3 instrumentées ; les durées sont
+  jointes à la réponse (`response.phases`) et envoyées aux histogrammes de
+  metrics.py, par site et endpoint.
+
+Réglages par variables d'environnement : HTTP_POOL_CONNECTIONS,
+HTTP_POOL_MAXSIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_USER_AGENT.
+"""
+
+import os
+import socket
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+import metrics
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; WPMonitor/1.0)"
+
+Timeout = Union[float, Tuple[float, float]]
+
+# Phases de la requête en cours, par thread (requests est synchrone : la
+# connexion urllib3 et HTTPClient.request s'exécutent dans le même thread)
+_timings = threading.local()
+
+
+def _record(phase: str, seconds: float):
+    phases = getattr(_timings, 'phases', None)
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        # Résolution chronométrée à part, puis connexion à chaque adresse
+        # obtenue dans l'ordre (même repli que create_connection)
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            return super()._new_conn()  # erreur de résolution levée par urllib3
+        resolved = time.perf_counter()
+        self._dns_seconds = resolved - start
+        _record("dns", self._dns_seconds)
+
+        host, error = self._dns_host, None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in infos):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (ConnectTimeoutError, NewConnectionError) as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+        self._tcp_seconds = time.perf_counter() - resolved
+        _record("connect", self._tcp_seconds)
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        self._dns_seconds = self._tcp_seconds = 0.0
+        super().connect()
+        if isinstance(self, HTTPSConnection):
+            _record("tls", time.perf_counter() - start - self._dns_seconds - self._tcp_seconds)
+
+    def getresponse(self, *args, **kwargs):
+        start = time.perf_counter()
+        response = super().getresponse(*args, **kwargs)
+        _timings.headers_at = time.perf_counter()
+        _record("ttfb", _timings.headers_at - start)
+        return response
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
+
+class HTTPClient:
+    def __init__(self, pool_connections: int = 64, pool_maxsize: int = 32, connect_timeout: float = 5,
+                 read_timeout: float = 20, user_agent: str = DEFAULT_USER_AGENT,
+                 registry: Optional[metrics.MetricsRegistry] = None, cookies: bool = True):
+        self.timeout = (connect_timeout, read_timeout)
+        self.metrics = registry or metrics.registry
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        if not cookies:
+            self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = _TimedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, url: str, timeout: Optional[Timeout] = None, endpoint: Optional[str] = None,
+                site: Optional[str] = None, **kwargs) -> requests.Response:
+        """Requête sur une connexion du pool ; délais (connexion, lecture) par défaut du client.
+
+        Les durées par phase (secondes) sont dans `response.phases` et dans les
+        histogrammes, étiquetés par `site` (origine de l'URL par défaut) et par
+        `endpoint` (chemin de l'URL par défaut). URL fournie par un tiers :
+        passer des étiquettes fixes, pour borner le nombre de séries.
+        """
+        parts = urlsplit(url)
+        site, endpoint = site or f"{parts.scheme}://{parts.netloc}", endpoint or parts.path or '/'
+        phases: Dict[str, float] = {}
+        _timings.phases, _timings.headers_at = phases, None
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            phases["total"] = time.perf_counter() - start
+            self.metrics.observe(site, endpoint, phases, "error")
+            raise
+        finally:
+            _timings.phases = None
+        end = time.perf_counter()
+        for phase in ("dns", "connect", "tls"):
+            phases.setdefault(phase, 0.0)  # connexion réutilisée
+        if _timings.headers_at is not None:
+            phases["download"] = end - _timings.headers_at
+        phases["total"] = end - start
+        response.phases = phases
+        self.metrics.observe(site, endpoint, phases, str(response.status_code))
+        return response
+
+    def get(self, url: str, timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        return self.request('GET', url, timeout=timeout, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "HTTPClient":
+        return cls(**kwargs, pool_connections=int(os.environ.get("HTTP_POOL_CONNECTIONS", "64")),
+                   pool_maxsize=int(os.environ.get("HTTP_POOL_MAXSIZE", "32")),
+                   connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5")),
+                   read_timeout=float(os.environ.get("HTTP_READ_TIMEOUT", "20")),
+                   user_agent=os.environ.get("HTTP_USER_AGENT", DEFAULT_USER_AGENT))
+
+
+_client: Optional[HTTPClient] = None
+_lock = threading.Lock()
+
+
+def get_client() -> HTTPClient:
+    """Client partagé du processus, créé au premier appel (réglages d'environnement)"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = HTTPClient.from_env()
+        return _client
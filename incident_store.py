@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Stockage des incidents en ajout seul (SQLite)
+
+Remplace la réécriture complète de incident_history.json à chaque incident :
+· ajout en O(1), transactionnel (journal WAL, résistant aux crashs)
+· curseur = identifiant croissant, requête « incidents depuis le curseur X »
+· `details` conservé comme donnée structurée (dict), pas comme chaîne JSON
+· migration unique depuis l'ancien fichier JSON
+· index temporel et compteurs journaliers matérialisés (type × sévérité) :
+  une requête sur une fenêtre coûte en proportion de la fenêtre
+· épisodes : un incident répété (même empreinte) pendant le délai de
+  carence incrémente le compteur de son épisode ouvert au lieu d'être
+  ajouté à nouveau ; recherche par clé primaire, en O(1). La répétition
+  reste comptée (compteurs journaliers, table `repeats`) : les décomptes
+  par fenêtre incluent toutes les occurrences
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    ts REAL NOT NULL DEFAULT 0,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    details TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, type, severity)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS episodes (
+    fingerprint TEXT PRIMARY KEY,
+    incident_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    first_ts REAL NOT NULL,
+    last_ts REAL NOT NULL,
+    count INTEGER NOT NULL,
+    open INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS repeats (
+    ts REAL NOT NULL,
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    incident_id INTEGER NOT NULL
+);
+"""
+
+SEVERITY_RANK = {"info": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_incidents_ts ON incidents (ts);
+CREATE INDEX IF NOT EXISTS idx_incidents_type_ts ON incidents (type, ts);
+CREATE INDEX IF NOT EXISTS idx_incidents_severity_ts ON incidents (severity, ts);
+CREATE INDEX IF NOT EXISTS idx_repeats_ts ON repeats (ts);
+CREATE INDEX IF NOT EXISTS idx_episodes_last_ts ON episodes (open, last_ts);
+"""
+
+COLUMNS = "id, timestamp, type, severity, details"
+
+
+def _decode_details(details):
+    # Les anciens incidents stockaient `details` sous forme de chaîne JSON
+    if isinstance(details, str):
+        try:
+            return json.loads(details)
+        except json.JSONDecodeError:
+            return {"raw": details}
+    return details if details is not None else {}
+
+
+def _epoch(timestamp: str) -> float:
+    """Horodatage ISO -> secondes epoch (horodatage naïf = heure locale)"""
+    try:
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _as_epoch(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+class IncidentStore:
+    def __init__(self, db_file: Path, legacy_json: Optional[Path] = None):
+        self.db_file = Path(db_file)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._conn.executescript(INDEXES)
+        if legacy_json is not None:
+            self.migrate_from_json(Path(legacy_json))
+
+    def _upgrade_schema(self):
+        # Bases créées avant l'index temporel : ajouter `ts` et reconstruire les compteurs
+        columns = [r[1] for r in self._conn.execute("PRAGMA table_info(incidents)")]
+        if "ts" in columns:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("ALTER TABLE incidents ADD COLUMN ts REAL NOT NULL DEFAULT 0")
+            rows = self._conn.execute("SELECT id, timestamp, type, severity FROM incidents").fetchall()
+            self._conn.executemany("UPDATE incidents SET ts = ? WHERE id = ?",
+                                   [(_epoch(r[1]), r[0]) for r in rows])
+            self._conn.execute("DELETE FROM daily_counts")
+            self._bump_counters((_epoch(r[1]), r[2], r[3]) for r in rows)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _row(self, row) -> Dict:
+        return {
+            "id": row[0],
+            "timestamp": row[1],
+            "type": row[2],
+            "severity": row[3],
+            "details": json.loads(row[4]),
+        }
+
+    def _bump_counters(self, entries: Iterable[Tuple[float, str, str]]):
+        self._conn.executemany(
+            "INSERT INTO daily_counts (day, type, severity, count) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (day, type, severity) DO UPDATE SET count = count + 1",
+            [(_day(ts), typ, sev) for ts, typ, sev in entries])
+
+    def _write(self, cur, incidents: List[Dict]) -> int:
+        # Appelé transaction ouverte : incidents + compteurs journaliers
+        rows = []
+        for inc in incidents:
+            timestamp = inc.get("timestamp", "")
+            rows.append((timestamp, _epoch(timestamp), inc.get("type", "unknown"),
+                         inc.get("severity", "medium"),
+                         json.dumps(_decode_details(inc.get("details")), ensure_ascii=False)))
+        for row in rows:
+            cur.execute("INSERT INTO incidents (timestamp, ts, type, severity, details) VALUES (?, ?, ?, ?, ?)",
+                        row)
+        self._bump_counters((r[1], r[2], r[3]) for r in rows)
+        return cur.lastrowid
+
+    def _insert(self, incidents: List[Dict], legacy_marker: Optional[str] = None) -> int:
+        # Appelé verrou pris : incidents + compteurs (+ trace de migration) en une transaction
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self._conn.cursor()
+            last_id = self._write(cur, incidents)
+            if legacy_marker is not None:
+                cur.execute("INSERT INTO meta (key, value) VALUES ('legacy_json', ?)", (legacy_marker,))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return last_id
+
+    def append(self, incident: Dict) -> int:
+        """Ajoute un incident et renvoie son identifiant (nouveau curseur)"""
+        with self._lock:
+            return self._insert([incident])
+
+    def record(self, incident: Dict, fingerprint: str, cooldown: float) -> Tuple[int, bool]:
+        """Ajoute l'incident, ou le rattache à l'épisode ouvert de même empreinte.
+
+        L'incident est rattaché (compteur +1, pas de nouvel incident) si le
+        dernier de l'épisode date de moins de `cooldown` secondes et que la
+        sévérité n'augmente pas ; l'occurrence est tout de même comptée
+        (compteurs journaliers, `repeats`). Renvoie (id de l'incident
+        d'ouverture, nouvel_épisode).
+        """
+        ts = _epoch(incident.get("timestamp", ""))
+        severity = incident.get("severity", "medium")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.cursor()
+                row = cur.execute("SELECT incident_id, severity, last_ts FROM episodes "
+                                  "WHERE fingerprint = ? AND open = 1", (fingerprint,)).fetchone()
+                if (row is not None and ts - row[2] < cooldown
+                        and SEVERITY_RANK.get(severity, 2) <= SEVERITY_RANK.get(row[1], 2)):
+                    cur.execute("UPDATE episodes SET last_ts = ?, count = count + 1 WHERE fingerprint = ?",
+                                (ts, fingerprint))
+                    typ = incident.get("type", "unknown")
+                    cur.execute("INSERT INTO repeats (ts, type, severity, incident_id) VALUES (?, ?, ?, ?)",
+                                (ts, typ, severity, row[0]))
+                    self._bump_counters([(ts, typ, severity)])
+                    self._conn.execute("COMMIT")
+                    return row[0], False
+                incident_id = self._write(cur, [incident])
+                cur.execute(
+                    "INSERT INTO episodes (fingerprint, incident_id, type, severity, first_ts, last_ts, count, open) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 1, 1) ON CONFLICT (fingerprint) DO UPDATE SET "
+                    "incident_id = excluded.incident_id, severity = excluded.severity, first_ts = excluded.first_ts, "
+                    "last_ts = excluded.last_ts, count = 1, open = 1",
+                    (fingerprint, incident_id, incident.get("type", "unknown"), severity, ts, ts))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return incident_id, True
+
+    def resolve(self, fingerprint: str) -> bool:
+        """Clôt l'épisode ouvert de cette empreinte ; True s'il y en avait un"""
+        with self._lock:
+            cur = self._conn.execute("UPDATE episodes SET open = 0 WHERE fingerprint = ? AND open = 1",
+                                     (fingerprint,))
+        return cur.rowcount > 0
+
+    def open_episodes(self) -> List[Dict]:
+        """Épisodes ouverts, du plus récent au plus ancien"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint, incident_id, type, severity, first_ts, last_ts, count FROM episodes "
+                "WHERE open = 1 ORDER BY last_ts DESC").fetchall()
+        return [{"fingerprint": r[0], "incident_id": r[1], "type": r[2], "severity": r[3],
+                 "first_ts": r[4], "last_ts": r[5], "count": r[6]} for r in rows]
+
+    def repeated_since(self, ts: float) -> List[Dict]:
+        """Épisodes ouverts avant `ts` (epoch) et répétés depuis : problèmes toujours en cours"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.fingerprint, e.incident_id, e.type, e.severity, e.first_ts, e.last_ts, e.count, "
+                "i.timestamp, i.details FROM episodes e JOIN incidents i ON i.id = e.incident_id "
+                "WHERE e.open = 1 AND e.last_ts >= ? AND e.first_ts < ? ORDER BY e.last_ts DESC",
+                (ts, ts)).fetchall()
+        return [{"fingerprint": r[0], "incident_id": r[1], "type": r[2], "severity": r[3], "first_ts": r[4],
+                 "last_ts": r[5], "count": r[6], "timestamp": r[7], "details": json.loads(r[8])} for r in rows]
+
+    def revision(self) -> str:
+        """Signature de l'état (dernier incident, épisodes ouverts) : change à chaque écriture visible"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT (SELECT COALESCE(MAX(id), 0) FROM incidents), COUNT(*), COALESCE(SUM(count), 0), "
+                "COALESCE(MAX(last_ts), 0) FROM episodes WHERE open = 1").fetchone()
+        return ":".join(str(v) for v in row)
+
+    def daily_counts(self, start_day: str, end_day: Optional[str] = None) -> List[Tuple[str, str, str, int]]:
+        """Compteurs journaliers (jour, type, sévérité, nombre) des jours ISO [start_day, end_day["""
+        sql, params = "SELECT day, type, severity, count FROM daily_counts WHERE day >= ?", [start_day]
+        if end_day is not None:
+            sql += " AND day < ?"
+            params.append(end_day)
+        with self._lock:
+            return [tuple(r) for r in self._conn.execute(sql + " ORDER BY day", params).fetchall()]
+
+    def cursor(self) -> int:
+        """Identifiant du dernier incident (0 si vide)"""
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM incidents").fetchone()
+        return row[0]
+
+    def since(self, cursor: int) -> List[Dict]:
+        """Incidents ajoutés après le curseur `cursor`, dans l'ordre d'ajout"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {COLUMNS} FROM incidents WHERE id > ? ORDER BY id", (cursor,)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def all(self) -> List[Dict]:
+        return self.since(0)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM incidents").fetchone()[0]
+
+    def tail(self, n: int) -> List[Dict]:
+        """Les `n` derniers incidents ajoutés, du plus ancien au plus récent"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {COLUMNS} FROM incidents ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+        return [self._row(r) for r in reversed(rows)]
+
+    def query(self, start=None, end=None, types: Optional[List[str]] = None,
+              severities: Optional[List[str]] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Incidents de la fenêtre [start, end[ (datetime ou epoch), filtrés par type/sévérité"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_as_epoch(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(_as_epoch(end))
+        if types:
+            clauses.append(f"type IN ({','.join('?' * len(types))})")
+            params.extend(types)
+        if severities:
+            clauses.append(f"severity IN ({','.join('?' * len(severities))})")
+            params.extend(severities)
+        sql = f"SELECT {COLUMNS} FROM incidents"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row(r) for r in rows]
+
+    def counts(self, start, end=None) -> Dict[Tuple[str, str], int]:
+        """Nombre d'occurrences (incidents et répétitions) par (type, sévérité) sur [start, end[.
+
+        Les jours complets sont lus dans les compteurs journaliers ; seuls les
+        jours partiels aux bornes de la fenêtre sont comptés sur l'index.
+        """
+        start_ts = _as_epoch(start)
+        end_ts = _as_epoch(end) if end is not None else datetime.now(timezone.utc).timestamp() + 1
+        first_full = datetime.fromtimestamp(start_ts, timezone.utc).replace(hour=0, minute=0, second=0,
+                                                                            microsecond=0)
+        if first_full.timestamp() < start_ts:
+            first_full += timedelta(days=1)
+        last_full = datetime.fromtimestamp(end_ts, timezone.utc).replace(hour=0, minute=0, second=0,
+                                                                         microsecond=0)
+
+        totals: Dict[Tuple[str, str], int] = {}
+        with self._lock:
+            if first_full < last_full:
+                rows = self._conn.execute(
+                    "SELECT type, severity, SUM(count) FROM daily_counts WHERE day >= ? AND day < ? "
+                    "GROUP BY type, severity",
+                    (first_full.strftime("%Y-%m-%d"), last_full.strftime("%Y-%m-%d"))).fetchall()
+                partial = [(start_ts, first_full.timestamp()), (last_full.timestamp(), end_ts)]
+            else:
+                rows = []
+                partial = [(start_ts, end_ts)]
+            for lo, hi in partial:
+                for table in ("incidents", "repeats"):
+                    rows += self._conn.execute(
+                        f"SELECT type, severity, COUNT(*) FROM {table} WHERE ts >= ? AND ts < ? "
+                        f"GROUP BY type, severity", (lo, hi)).fetchall()
+        for typ, sev, n in rows:
+            totals[(typ, sev)] = totals.get((typ, sev), 0) + n
+        return totals
+
+    def migrate_from_json(self, json_file: Path) -> int:
+        """Importe l'ancien historique JSON une seule fois puis le renomme.
+
+        L'import et sa trace dans `meta` sont validés dans la même transaction,
+        puis le fichier est renommé en .migrated : la migration est
+        idempotente. Renvoie le nombre d'incidents importés.
+        """
+        if not json_file.exists():
+            return 0
+        migrated = json_file.with_suffix(json_file.suffix + ".migrated")
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'legacy_json'").fetchone()
+        if done is not None:
+            # Import déjà validé, seul le renommage avait été interrompu
+            json_file.rename(migrated)
+            return 0
+
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            legacy = []
+
+        with self._lock:
+            self._insert(legacy, legacy_marker=str(json_file))
+        json_file.rename(migrated)
+        return len(legacy)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Lecture incrémentale des logs de surveillance (monitor.log et rotations)
+
+· Couvre monitor.log.N ... monitor.log.1 puis monitor.log (RotatingFileHandler)
+· Index par heure (heure -> offset du premier octet) conservé dans un fichier
+  de checkpoint, par fichier physique (inode) : la rotation renomme le
+  fichier sans le réécrire, l'index reste valable.
+· Un nouveau rapport ne parcourt que les octets ajoutés depuis le dernier
+  checkpoint pour compléter l'index, puis se positionne directement sur
+  l'heure de début de la fenêtre.
+· Lecture en binaire, décodage UTF-8 unique par ligne retenue (errors='replace').
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TS_LEN = 19  # "YYYY-MM-DD HH:MM:SS"
+HEAD_LEN = 64
+
+
+def line_timestamp(line: bytes) -> Optional[str]:
+    """Horodatage "YYYY-MM-DD HH:MM:SS" d'une ligne "[...] ...", sinon None"""
+    if len(line) <= TS_LEN or line[:1] != b'[':
+        return None
+    ts = line[1:TS_LEN + 1]
+    if not (ts[0:4].isdigit() and ts[4:5] == b'-' and ts[10:11] == b' ' and ts[17:19].isdigit()):
+        return None
+    return ts.decode('ascii')
+
+
+class LogReader:
+    def __init__(self, log_file: Path, checkpoint_file: Path, backup_count: int = 5):
+        self.log_file = Path(log_file)
+        self.checkpoint_file = Path(checkpoint_file)
+        self.backup_count = backup_count
+
+    def files(self) -> List[Path]:
+        """Fichiers de log existants, du plus ancien au plus récent"""
+        candidates = [self.log_file.with_name(f"{self.log_file.name}.{i}")
+                      for i in range(self.backup_count, 0, -1)]
+        candidates.append(self.log_file)
+        return [p for p in candidates if p.exists()]
+
+    def _load_checkpoint(self) -> Dict[str, Dict]:
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Dict]):
+        tmp = self.checkpoint_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp, self.checkpoint_file)
+
+    def _index_file(self, path: Path, entry: Optional[Dict]) -> Dict:
+        """Complète (ou construit) l'index horaire d'un fichier"""
+        size = path.stat().st_size
+        with open(path, 'rb') as f:
+            head = f.read(HEAD_LEN).hex()
+            if entry is None or entry['head'] != head[:len(entry['head'])] or size < entry['indexed_to']:
+                entry = {'head': head, 'indexed_to': 0, 'last_ts': None, 'hours': []}
+            elif len(entry['head']) < len(head):
+                entry['head'] = head
+
+            f.seek(entry['indexed_to'])
+            offset = entry['indexed_to']
+            last_hour = entry['hours'][-1][0] if entry['hours'] else None
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # ligne en cours d'écriture : reprise au prochain passage
+                ts = line_timestamp(line)
+                if ts is not None:
+                    hour = ts[:13]
+                    if hour != last_hour:
+                        entry['hours'].append([hour, offset])
+                        last_hour = hour
+                    entry['last_ts'] = ts
+                offset += len(line)
+            entry['indexed_to'] = offset
+        return entry
+
+    def read_since(self, cutoff: datetime) -> List[str]:
+        """Lignes (décodées, sans fin de ligne) horodatées à partir de `cutoff`.
+
+        Les lignes sans horodatage (suite d'un message multiligne) suivent le
+        sort de la dernière ligne horodatée qui les précède.
+        """
+        cutoff_ts = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+        cutoff_hour = cutoff_ts[:13]
+        checkpoint = self._load_checkpoint()
+        fresh: Dict[str, Dict] = {}
+        lines: List[str] = []
+
+        for path in self.files():
+            st = path.stat()
+            key = f"{st.st_dev}:{st.st_ino}"
+            entry = self._index_file(path, checkpoint.get(key))
+            fresh[key] = entry
+            if entry['last_ts'] is None or entry['last_ts'] < cutoff_ts:
+                continue
+
+            start = 0
+            for hour, offset in entry['hours']:
+                if hour > cutoff_hour:
+                    break
+                start = offset
+
+            keep = False
+            with open(path, 'rb') as f:
+                f.seek(start)
+                remaining = entry['indexed_to'] - start
+                for raw in f:
+                    if remaining <= 0:
+                        break
+                    remaining -= len(raw)
+                    ts = line_timestamp(raw)
+                    if ts is not None:
+                        keep = ts >= cutoff_ts
+                    if keep:
+                        text = raw.decode('utf-8', errors='replace').strip()
+                        if text:
+                            lines.append(text)
+
+        # Les fichiers disparus (rotation au-delà de backup_count) sortent du checkpoint
+        self._save_checkpoint(fresh)
+        return lines
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Métriques de latence HTTP (format texte Prometheus)
+
+· Chaque requête du client partagé (http_client) est découpée en phases :
+  dns, connect, tls, ttfb (requête envoyée -> en-têtes reçus) et download
+  (corps). Une connexion réutilisée (keep-alive) a dns/connect/tls à 0.
+· Un histogramme par (site, endpoint, phase), plus un compteur de requêtes
+  par statut : on voit si la lenteur vient du réseau (dns/connect/tls) ou
+  de WordPress (ttfb).
+· Les poignées de main de tls_checker (vérification des certificats) y sont
+  aussi, sous endpoint="tls" (phases dns, connect, tls, total ; statut ok
+  ou error).
+· `render()` produit l'exposition texte ; `serve(port)` la publie sur
+  /metrics dans un thread (mode démon), app.py la publie sur sa route
+  /metrics.
+"""
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+PHASES = ("dns", "connect", "tls", "ttfb", "download", "total")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_ENDPOINTS_PER_SITE = 50  # au-delà, endpoint="other" (cardinalité bornée)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._endpoints: Dict[str, set] = {}
+
+    def _endpoint(self, site: str, endpoint: str) -> str:
+        # Appelé verrou pris
+        known = self._endpoints.setdefault(site, set())
+        if endpoint not in known:
+            if len(known) >= MAX_ENDPOINTS_PER_SITE:
+                return "other"
+            known.add(endpoint)
+        return endpoint
+
+    def observe(self, site: str, endpoint: str, phases: Dict[str, float], status: str):
+        """Enregistre les phases (secondes) d'une requête terminée (status : code HTTP ou "error")"""
+        with self._lock:
+            endpoint = self._endpoint(site, endpoint)
+            key = (site, endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            for phase in PHASES:
+                if phase in phases:
+                    hist = self._histograms.get((site, endpoint, phase))
+                    if hist is None:
+                        hist = self._histograms[(site, endpoint, phase)] = Histogram(self.buckets)
+                    hist.observe(phases[phase])
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4"""
+        lines = ["# HELP wpmonitor_http_phase_seconds Durée des phases d'une requête HTTP",
+                 "# TYPE wpmonitor_http_phase_seconds histogram"]
+        with self._lock:
+            for (site, endpoint, phase), hist in sorted(self._histograms.items()):
+                base = _labels(site=site, endpoint=endpoint, phase=phase)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'wpmonitor_http_phase_seconds_bucket{{{base},le="{le}"}} {cumulative}')
+                lines.append(f"wpmonitor_http_phase_seconds_sum{{{base}}} {hist.sum:.6f}")
+                lines.append(f"wpmonitor_http_phase_seconds_count{{{base}}} {hist.count}")
+            lines += ["# HELP wpmonitor_http_requests_total Requêtes HTTP par statut",
+                      "# TYPE wpmonitor_http_requests_total counter"]
+            for (site, endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f"wpmonitor_http_requests_total{{{_labels(site=site, endpoint=endpoint, status=status)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def serve(port: int, host: str = "0.0.0.0", metrics: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """Publie /metrics sur un port dédié (thread en arrière-plan) ; renvoie le serveur"""
+    source = metrics or registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = source.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
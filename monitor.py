@@ -16,59 +16,49 @@ Fonctions principales :
 · Scheduler ou exécution unique
 """
 
+from __future__ import annotations
+
 import os
 import sys
 import time
 import json
 import shutil
 import hashlib
-import re
-import ssl
-import socket
-import difflib
 import logging
 import argparse
-import smtplib
-from logging.handlers import RotatingFileHandler
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import atexit
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-import requests
-import schedule
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Optional
+
+from fleet import load_inventory, site_slug, host_of
 
-# --- Charger variables d'environnement ---
-from dotenv import load_dotenv
-load_dotenv('.env.local')
+# Les modules du projet et leurs dépendances (requests, numpy, smtplib...)
+# sont importés à la première utilisation : chaque mode ne charge que ce
+# dont il se sert (--test ou --report n'importent pas requests)
+if TYPE_CHECKING:
+    from fetch_layer import CycleFetcher
+    from scheduler import AdaptiveScheduler
+    from snapshot_catalog import SnapshotCatalog
 
 # --- Vérification des dépendances ---
-MISSING = []
-try:
-    import requests
-except ImportError:
-    MISSING.append("requests")
-try:
-    import schedule
-except ImportError:
-    MISSING.append("schedule")
-try:
-    from dateutil import parser as dateutil_parser, tz as dateutil_tz
-except ImportError:
-    MISSING.append("python-dateutil")
-try:
-    from dotenv import load_dotenv
-except ImportError:
-    MISSING.append("python-dotenv")
-
-if MISSING:
-    print("Modules manquants :", ", ".join(MISSING))
-    print("→ Installer via: pip install " + " ".join(MISSING))
-    sys.exit(1)
+def check_dependencies():
+    """Quitte si un module requis manque (recherche sans import)"""
+    from importlib.util import find_spec
+    missing = [package for module, package in (("requests", "requests"), ("dotenv", "python-dotenv"))
+               if find_spec(module) is None]
+    if missing:
+        print("Modules manquants :", ", ".join(missing))
+        print("→ Installer via: pip install " + " ".join(missing))
+        sys.exit(1)
 
 # --- Configuration ---
 class Config:
     def __init__(self):
+        # Variables d'environnement chargées à la première lecture de la configuration
+        from dotenv import load_dotenv
+        load_dotenv('.env.local')
         self.SITE_URL = os.environ.get("SITE_URL", "https://oupssecuretest.wordpress.com")
         self.ALERT_EMAIL = os.environ.get("ALERT_EMAIL", None)
         self.SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
@@ -76,16 +66,45 @@ class Config:
         self.SMTP_USER = os.environ.get("SMTP_USER", None)
         self.SMTP_PASS = os.environ.get("SMTP_PASS", None)
         self.MONITOR_DIR = Path(os.environ.get("MONITOR_DIR", "monitor_data"))
-        self.MONITOR_DIR.mkdir(exist_ok=True, parents=True)
         self.INCIDENT_HISTORY_FILE = self.MONITOR_DIR / "incident_history.json"
+        self.INCIDENT_DB_FILE = self.MONITOR_DIR / "incidents.db"
+        self.INCIDENT_COOLDOWN_HOURS = float(os.environ.get("INCIDENT_COOLDOWN_HOURS", "24"))
         self.LOG_RETENTION_DAYS = int(os.environ.get("LOG_RETENTION_DAYS", "30"))
         self.CHECK_INTERVAL_HOURS = int(os.environ.get("CHECK_INTERVAL_HOURS", "3"))
+        self.AVAILABILITY_INTERVAL_MINUTES = float(os.environ.get("AVAILABILITY_INTERVAL_MINUTES", "15"))
+        self.SSL_INTERVAL_HOURS = float(os.environ.get("SSL_INTERVAL_HOURS", "24"))
+        self.CRAWL_INTERVAL_HOURS = float(os.environ.get("CRAWL_INTERVAL_HOURS", "0"))
+        self.SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "4"))
+        self.SCHEDULER_JITTER = float(os.environ.get("SCHEDULER_JITTER", "0.1"))
+        self.METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+        self.TIMESERIES_DIR = self.MONITOR_DIR / "timeseries"
+        self.TIMESERIES_RAW_DAYS = int(os.environ.get("TIMESERIES_RAW_DAYS", "14"))
+        self.TIMESERIES_HOURLY_DAYS = int(os.environ.get("TIMESERIES_HOURLY_DAYS", "90"))
+        self.TIMESERIES_DAILY_DAYS = int(os.environ.get("TIMESERIES_DAILY_DAYS", "1825"))
+        self.CYCLE_DEADLINE_SECONDS = float(os.environ.get("CYCLE_DEADLINE_SECONDS", "30"))
+        self.CHECK_WORKERS = int(os.environ.get("CHECK_WORKERS", "8"))
+        self.SITES_FILE = os.environ.get("SITES_FILE", None)
+        self.FLEET_WORKERS = int(os.environ.get("FLEET_WORKERS", "32"))
+        self.FLEET_PER_HOST = int(os.environ.get("FLEET_PER_HOST", "2"))
+        self.FLEET_DEADLINE_SECONDS = float(os.environ.get("FLEET_DEADLINE_SECONDS", "600"))
+        self.DIFF_RULES_FILE = os.environ.get("DIFF_RULES_FILE", None)
+        self.ALERT_SPOOL_DIR = self.MONITOR_DIR / "outbox"
+        self.ALERT_RATE_PER_MINUTE = int(os.environ.get("ALERT_RATE_PER_MINUTE", "20"))
+        self.ALERT_BATCH_SECONDS = float(os.environ.get("ALERT_BATCH_SECONDS", "5"))
+        self.TLS_CACHE_FILE = self.MONITOR_DIR / "tls_cache.json"
+        self.TLS_RECHECK_HOURS = float(os.environ.get("TLS_RECHECK_HOURS", "24"))
+        self.CRAWL_WORKERS = int(os.environ.get("CRAWL_WORKERS", "8"))
+        self.CRAWL_PER_HOST = int(os.environ.get("CRAWL_PER_HOST", "4"))
+        self.CRAWL_DEADLINE_SECONDS = float(os.environ.get("CRAWL_DEADLINE_SECONDS", "9000"))
+        self.CRAWL_MAX_URLS = int(os.environ.get("CRAWL_MAX_URLS", "5000"))
+        self.CRAWL_MAX_ASSETS = int(os.environ.get("CRAWL_MAX_ASSETS", "1000"))
+        self.SIGNATURES_FILE = Path(os.environ.get("SIGNATURES_FILE", Path(__file__).parent / "signatures.json"))
         self.USE_EMOJI = bool(os.environ.get("USE_EMOJI", "1") == "1")
         self.ANONYMIZE_SAMPLES = bool(os.environ.get("ANONYMIZE_SAMPLES", "1") == "1")
+        # Dossiers créés à la première écriture (journal, sauvegarde, restauration)
         self.BACKUP_DIR = Path(os.environ.get("BACKUP_DIR", "backups"))
-        self.BACKUP_DIR.mkdir(exist_ok=True, parents=True)
         self.RESTORE_DIR = Path(os.environ.get("RESTORE_DIR", "restored"))
-        self.RESTORE_DIR.mkdir(exist_ok=True, parents=True)
+        self.RESTORE_WORKERS = int(os.environ.get("RESTORE_WORKERS", "8"))
         self.validate()
     
     def validate(self):
@@ -93,60 +112,220 @@ class Config:
             print(f"URL invalide: {self.SITE_URL}")
             sys.exit(1)
 
-config = Config()
+class Lazy:
+    """Objet partagé construit au premier accès à l'un de ses attributs.
+
+    Remplace l'instance au niveau du module : `config.SITE_URL` ou
+    `alert_queue.enqueue(...)` s'écrivent comme avant, mais l'import du
+    module et la construction n'ont lieu que si le mode en a besoin.
+    """
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def instance(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+    
+    def __getattr__(self, name: str):
+        return getattr(self.instance(), name)
+
+config = Lazy(Config)
 
 # --- Logging ---
-logger = logging.getLogger("WPMonitor")
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(config.MONITOR_DIR / "monitor.log", maxBytes=5*1024*1024, backupCount=5)
-handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s"))
-logger.addHandler(handler)
+logger = None
+logger_lock = threading.Lock()
+
+def get_logger() -> logging.Logger:
+    """Journal rotatif MONITOR_DIR/monitor.log, ouvert au premier message"""
+    global logger
+    if logger is None:
+        with logger_lock:
+            if logger is None:
+                from logging.handlers import RotatingFileHandler
+                config.MONITOR_DIR.mkdir(exist_ok=True, parents=True)
+                handler = RotatingFileHandler(config.MONITOR_DIR / "monitor.log", maxBytes=5*1024*1024, backupCount=5)
+                handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s"))
+                wp_logger = logging.getLogger("WPMonitor")
+                wp_logger.setLevel(logging.INFO)
+                wp_logger.addHandler(handler)
+                logger = wp_logger
+    return logger
 
 def log(message: str, level="INFO"):
-    getattr(logger, level.lower())(message)
+    getattr(get_logger(), level.lower())(message)
     print(f"[{level}] {message}")
 
 # --- Gestion des incidents ---
+# Champs de `details` qui identifient un même problème (empreinte d'épisode) ;
+# pour un type absent, tous les champs scalaires
+FINGERPRINT_FIELDS = {
+    "site_unavailable": [],
+    "site_access_error": [],
+    "ssl_warning": ["hostname", "port"],
+    "ssl_rotated": ["hostname", "port", "fingerprint"],
+    "check_timeout": ["check"],
+    "content_changed": ["endpoint", "patch"],
+    "suspicious_code": ["pattern", "endpoint"],
+    "asset_changed": ["url", "new_hash"],
+    "page_changed": ["url"],
+}
+
+def incident_fingerprint(incident_type: str, details: Any, site_url: Optional[str] = None) -> str:
+    if isinstance(details, dict):
+        fields = FINGERPRINT_FIELDS.get(incident_type)
+        if fields is None:
+            fields = sorted(k for k, v in details.items() if isinstance(v, (str, int, float, bool)) or v is None)
+        key = {k: details.get(k) for k in fields}
+    else:
+        key = details
+    raw = json.dumps([incident_type, site_url or "", key], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
 class IncidentManager:
-    def __init__(self, history_file: Path):
-        self.history_file = history_file
-        self._ensure_file()
-    
-    def _ensure_file(self):
-        if not self.history_file.exists():
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+    def __init__(self, db_file: Path, site_url: Optional[str] = None, legacy_json: Optional[Path] = None,
+                 cooldown_hours: float = 24):
+        from incident_store import IncidentStore
+        self.store = IncidentStore(db_file, legacy_json=legacy_json)
+        self.site_url = site_url
+        self.cooldown = cooldown_hours * 3600
     
     def load_incidents(self) -> List[Dict]:
-        try:
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+        return self.store.all()
+    
+    def cursor(self) -> int:
+        return self.store.cursor()
+    
+    def since(self, cursor: int) -> List[Dict]:
+        return self.store.since(cursor)
     
-    def save_incidents(self, incidents: List[Dict]):
-        with open(self.history_file, 'w', encoding='utf-8') as f:
-            json.dump(incidents, f, indent=2, ensure_ascii=False)
+    def ongoing(self, since_ts: float) -> List[Dict]:
+        """Épisodes ouverts avant `since_ts` et répétés depuis (incidents toujours en cours, non renotifiés)"""
+        return self.store.repeated_since(since_ts)
     
-    def add(self, incident_type: str, details: Dict, severity: str = "medium", notify: bool = False):
-        incidents = self.load_incidents()
+    def add(self, incident_type: str, details: Dict, severity: str = "medium", notify: bool = False) -> bool:
+        """Enregistre l'incident ; renvoie False s'il répète un épisode ouvert (ni ligne ni email)"""
         incident = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "type": incident_type,
             "severity": severity,
-            "details": json.dumps(details, ensure_ascii=False)
+            "details": details
         }
-        incidents.append(incident)
-        self.save_incidents(incidents)
+        from check_engine import in_time
+        # Même problème pendant le délai de carence : compté sur l'épisode ouvert,
+        # ni nouvel incident ni nouvel email. Une vérification qui termine après
+        # l'échéance de son cycle n'enregistre plus rien : le cycle a déjà relevé
+        # ses nouveaux incidents et l'a comptée en timeout.
+        with in_time() as ok:
+            if not ok:
+                log(f"Incident {incident_type} ignoré : vérification terminée après l'échéance du cycle", "WARNING")
+                return False
+            incident_id, new_episode = self.store.record(
+                incident, incident_fingerprint(incident_type, details, self.site_url), self.cooldown)
+        if not new_episode:
+            log(f"Incident répété ({incident_type}) rattaché à l'épisode #{incident_id}", "INFO")
+            return False
+        incident["id"] = incident_id
         
         if notify:
             subject = f"[WP Monitor] Incident {severity.upper()}: {incident_type}"
+            if self.site_url:
+                subject += f" - {self.site_url}"
             body = f"Type: {incident_type}\nSeverity: {severity}\nDetails: {json.dumps(details, indent=2)}\nTime: {incident['timestamp']}"
             send_alert(subject, body, incident_type)
+        return True
+    
+    def resolve(self, incident_type: str, details: Optional[Dict] = None) -> bool:
+        """Clôt l'épisode ouvert : la prochaine occurrence sera de nouveau notifiée"""
+        return self.store.resolve(incident_fingerprint(incident_type, details or {}, self.site_url))
+
+def format_details(details: Any) -> str:
+    return json.dumps(details, ensure_ascii=False) if isinstance(details, (dict, list)) else str(details)
 
-incident_manager = IncidentManager(config.INCIDENT_HISTORY_FILE)
+def ongoing_lines(episodes: List[Dict], site_url: str = "") -> List[str]:
+    """Lignes d'email pour les incidents toujours en cours (répétés pendant le délai de carence)"""
+    prefix = f"{site_url} " if site_url else ""
+    return [f"- {prefix}[{ep['severity']}] {ep['type']} depuis {ep['timestamp']} ({ep['count']} occurrences) : "
+            f"{format_details(ep['details'])}" for ep in episodes]
+
+def make_incident_manager() -> IncidentManager:
+    config.MONITOR_DIR.mkdir(exist_ok=True, parents=True)
+    return IncidentManager(config.INCIDENT_DB_FILE, legacy_json=config.INCIDENT_HISTORY_FILE,
+                           cooldown_hours=config.INCIDENT_COOLDOWN_HOURS)
+
+incident_manager = Lazy(make_incident_manager)
+
+# --- Contexte d'un site surveillé ---
+class SiteContext:
+    """URL, dossier d'état, historique d'incidents et fetcher d'un site"""
+    def __init__(self, site_url: str, state_dir: Path, incidents: Optional[IncidentManager] = None,
+                 label: str = ""):
+        self.url = site_url
+        self.state_dir = state_dir
+        self.state_dir.mkdir(exist_ok=True, parents=True)
+        self.incidents = incidents or IncidentManager(state_dir / "incidents.db", site_url,
+                                                      legacy_json=state_dir / "incident_history.json",
+                                                      cooldown_hours=config.INCIDENT_COOLDOWN_HOURS)
+        self.label = label
+        self._fetchers: Dict[str, CycleFetcher] = {}
+        self._fetchers_lock = threading.Lock()
+    
+    def _fetcher(self, validators_file: str) -> CycleFetcher:
+        # Créé au premier usage : rapport et tableau de bord n'importent pas requests
+        with self._fetchers_lock:
+            if validators_file not in self._fetchers:
+                from fetch_layer import CycleFetcher
+                self._fetchers[validators_file] = CycleFetcher(self.state_dir / validators_file)
+            return self._fetchers[validators_file]
+    
+    @property
+    def fetcher(self) -> CycleFetcher:
+        return self._fetcher("validators.json")
+    
+    @property
+    def probe(self) -> CycleFetcher:
+        # Sondes de disponibilité du mode démon : validateurs séparés, pour ne
+        # pas interférer avec le cycle complet en cours
+        return self._fetcher("probe_validators.json")
+    
+    @property
+    def prefix(self) -> str:
+        return f"[{self.label}] " if self.label else ""
+
+default_site = Lazy(lambda: SiteContext(config.SITE_URL, config.MONITOR_DIR, incident_manager.instance()))
 
 # --- Utilitaires ---
+def make_diff_engine():
+    from content_diff import DiffEngine, load_rules
+    return DiffEngine(load_rules(Path(config.DIFF_RULES_FILE) if config.DIFF_RULES_FILE else None))
+
+def make_signature_scanner():
+    from signature_scanner import SignatureScanner
+    return SignatureScanner.from_file(config.SIGNATURES_FILE)
+
+def make_tls_checker():
+    from tls_checker import TLSChecker
+    return TLSChecker(config.TLS_CACHE_FILE, recheck_hours=config.TLS_RECHECK_HOURS, workers=config.FLEET_WORKERS)
+
+def make_timeseries():
+    from timeseries import TimeSeriesStore
+    return TimeSeriesStore(config.TIMESERIES_DIR, raw_days=config.TIMESERIES_RAW_DAYS,
+                           hourly_days=config.TIMESERIES_HOURLY_DAYS, daily_days=config.TIMESERIES_DAILY_DAYS)
+
+diff_engine = Lazy(make_diff_engine)
+signature_scanner = Lazy(make_signature_scanner)
+tls_checker = Lazy(make_tls_checker)
+timeseries = Lazy(make_timeseries)
+
+def format_phases(phases: Dict[str, float]) -> str:
+    """DNS, connexion, TLS, premier octet et téléchargement en ms"""
+    labels = (("dns", "DNS"), ("connect", "connexion"), ("tls", "TLS"), ("ttfb", "TTFB"), ("download", "corps"))
+    return ", ".join(f"{label} {phases[key] * 1000:.0f} ms" for key, label in labels if key in phases)
+
 def compute_hash(content: str) -> str:
     return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
@@ -154,328 +333,394 @@ def emoji(symbol: str) -> str:
     return symbol if config.USE_EMOJI else ""
 
 # --- Notification email ---
+def make_alert_queue():
+    from alert_queue import AlertQueue, SMTPSettings
+    queue = AlertQueue(
+        config.ALERT_SPOOL_DIR,
+        SMTPSettings(config.SMTP_SERVER, config.SMTP_PORT, config.SMTP_USER, config.SMTP_PASS,
+                     recipient=config.ALERT_EMAIL),
+        rate_per_minute=config.ALERT_RATE_PER_MINUTE,
+        batch_seconds=config.ALERT_BATCH_SECONDS,
+        log=log
+    )
+    # Les messages encore en file à la sortie sont envoyés (ou restent dans le spool)
+    atexit.register(queue.close)
+    return queue
+
+alert_queue = Lazy(make_alert_queue)
+
 def send_alert(subject: str, body: str, incident_type="general", html: bool = False) -> bool:
+    """Met l'alerte en file d'envoi (spool disque, envoi groupé en arrière-plan)"""
     if not all([config.SMTP_SERVER, config.SMTP_USER, config.SMTP_PASS, config.ALERT_EMAIL]):
         log("Configuration SMTP incomplète — e-mail non envoyé", "WARNING")
         return False
     
     try:
-        if html:
-            msg = MIMEMultipart("alternative")
-            msg.attach(MIMEText(body, "html"))
-        else:
-            msg = MIMEText(body)
-        
-        msg['From'] = config.SMTP_USER
-        msg['To'] = config.ALERT_EMAIL
-        msg['Subject'] = subject
-        
-        with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
-            server.starttls()
-            server.login(config.SMTP_USER, config.SMTP_PASS)
-            server.send_message(msg)
-        
-        log(f"Alerte email envoyée: {subject}", "INFO")
+        alert_queue.enqueue(subject, body, html=html, kind=incident_type)
+        log(f"Alerte email en file d'envoi: {subject}", "INFO")
         return True
     except Exception as e:
-        log(f"Erreur envoi email: {e}", "ERROR")
+        log(f"Erreur mise en file email: {e}", "ERROR")
         return False
 
 # --- Fonctions de surveillance ---
-def check_site_availability() -> Dict:
-    log("Vérification disponibilité...")
+def check_site_availability(site: Optional[SiteContext] = None, fetcher: Optional[CycleFetcher] = None) -> Dict:
+    site = site or default_site.instance()
+    fetcher = fetcher or site.fetcher
+    log(f"{site.prefix}Vérification disponibilité...")
     results = {'available': False, 'status_code': None, 'response_time': None, 'error': None}
     try:
-        start = time.time()
-        resp = requests.get(config.SITE_URL, timeout=15)
-        results['response_time'] = time.time() - start
+        resp = fetcher.get(site.url)
+        results['response_time'] = resp.elapsed
+        results['phases'] = resp.phases
         results['status_code'] = resp.status_code
-        results['available'] = resp.status_code == 200
+        results['available'] = resp.ok
         
+        if resp.phases:
+            log(f"{site.prefix}Temps de réponse {resp.elapsed:.2f} s ({format_phases(resp.phases)})", "INFO")
         if results['available']:
-            log(f"Site accessible {emoji('✅')}", "INFO")
+            log(f"{site.prefix}Site accessible {emoji('✅')}", "INFO")
+            # Retour à la normale : une nouvelle panne sera notifiée immédiatement
+            for incident_type in ("site_unavailable", "site_access_error"):
+                if site.incidents.resolve(incident_type):
+                    log(f"{site.prefix}Épisode {incident_type} clos", "INFO")
         else:
-            log(f"HTTP {resp.status_code} {emoji('⚠️')}", "WARNING")
-            incident_manager.add("site_unavailable", {"status_code": resp.status_code}, "high", notify=True)
+            log(f"{site.prefix}HTTP {resp.status_code} {emoji('⚠️')}", "WARNING")
+            site.incidents.add("site_unavailable", {"status_code": resp.status_code}, "high", notify=True)
     except Exception as e:
         results['error'] = str(e)
-        log(f"Erreur accès site: {e}", "ERROR")
-        incident_manager.add("site_access_error", {"error": str(e)}, "high", notify=True)
+        log(f"{site.prefix}Erreur accès site: {e}", "ERROR")
+        site.incidents.add("site_access_error", {"error": str(e)}, "high", notify=True)
     
     return results
 
-def check_content_integrity() -> Dict:
-    log("Vérification intégrité du site...")
-    results = {'changed': False, 'changes': [], 'error': None}
-    endpoints = [
-        (config.SITE_URL, "homepage"),
-        (config.SITE_URL + "/feed/", "rss"),
-        (config.SITE_URL + "/comments/feed/", "comments")
+def integrity_endpoints(site: Optional[SiteContext] = None) -> List[tuple]:
+    site = site or default_site.instance()
+    return [
+        (site.url, "homepage"),
+        (site.url + "/feed/", "rss"),
+        (site.url + "/comments/feed/", "comments")
     ]
-    
-    for url, name in endpoints:
-        try:
-            resp = requests.get(url, timeout=10)
-            if resp.status_code != 200:
-                log(f"Erreur HTTP {resp.status_code} pour {url}", "WARNING")
-                continue
-            
-            content = resp.text
-            ref_file = config.MONITOR_DIR / f"{name}.ref"
-            content_file = config.MONITOR_DIR / f"{name}_content.txt"
-            current_hash = compute_hash(content)
+
+def check_endpoint_integrity(url: str, name: str, site: Optional[SiteContext] = None) -> Dict:
+    site = site or default_site.instance()
+    results = {'changed': False, 'changes': [], 'error': None}
+    try:
+        ref_file = site.state_dir / f"{name}.ref"
+        content_file = site.state_dir / f"{name}_content.txt"
+        # Sans référence locale, un 304 serait inexploitable : requête complète
+        resp = site.fetcher.get(url, conditional=ref_file.exists())
+        if resp.not_modified:
+            log(f"{site.prefix}Aucun changement sur {name} (HTTP 304) {emoji('✅')}", "INFO")
+            return results
+        if resp.status_code != 200:
+            log(f"{site.prefix}Erreur HTTP {resp.status_code} pour {url}", "WARNING")
+            return results
+        
+        content = resp.text
+        # Hash du contenu normalisé : nonces, cache-busters et horodatages ignorés
+        current_hash = diff_engine.fingerprint(content)
+        
+        # Vérifier si le fichier de référence existe
+        if ref_file.exists():
+            old_hash = ref_file.read_text(encoding='utf-8').strip()
             
-            # Vérifier si le fichier de référence existe
-            if ref_file.exists():
-                old_hash = ref_file.read_text(encoding='utf-8').strip()
+            if old_hash != current_hash:
+                # Charger l'ancien contenu si disponible
+                old_content = ""
+                if content_file.exists():
+                    old_content = content_file.read_text(encoding='utf-8')
                 
-                if old_hash != current_hash:
+                # Diff borné sur le contenu normalisé
+                diff = diff_engine.diff(old_content, content)
+                
+                if diff['changed']:
                     results['changed'] = True
-                    log(f"Changement détecté sur {name} {emoji('⚠️')}", "WARNING")
-                    
-                    # Charger l'ancien contenu si disponible
-                    old_content = ""
-                    if content_file.exists():
-                        old_content = content_file.read_text(encoding='utf-8')
-                    
-                    # Calculer les différences
-                    diff = list(difflib.unified_diff(
-                        old_content.splitlines(keepends=True),
-                        content.splitlines(keepends=True),
-                        fromfile=f"old_{name}",
-                        tofile=f"new_{name}"
-                    ))
-                    
-                    diff_text = ''.join(diff)
+                    log(f"{site.prefix}Changement détecté sur {name} (+{diff['added']} / -{diff['removed']}) {emoji('⚠️')}", "WARNING")
+                    stats = {k: diff[k] for k in ('added', 'removed', 'exact', 'units')}
                     results['changes'].append({
                         'endpoint': name,
-                        'diff': diff_text
+                        'diff': diff['patch'],
+                        'stats': stats
                     })
                     
-                    incident_manager.add(
+                    site.incidents.add(
                         "content_changed", 
-                        {"endpoint": name, "diff": diff_text[:500] + "..." if len(diff_text) > 500 else diff_text},
+                        {"endpoint": name, "stats": stats, "patch": diff['patch']},
                         "medium",
                         notify=True
                     )
                 else:
-                    log(f"Aucun changement sur {name} {emoji('✅')}", "INFO")
+                    log(f"{site.prefix}Aucun changement significatif sur {name} (éléments volatils uniquement) {emoji('✅')}", "INFO")
             else:
-                log(f"Première vérification pour {name}, création référence", "INFO")
-            
-            # Mettre à jour les fichiers de référence
-            ref_file.write_text(current_hash, encoding='utf-8')
-            content_file.write_text(content, encoding='utf-8')
-            
-        except Exception as e:
-            results['error'] = str(e)
-            log(f"Erreur vérification intégrité {name}: {e}", "ERROR")
+                log(f"{site.prefix}Aucun changement sur {name} {emoji('✅')}", "INFO")
+        else:
+            log(f"{site.prefix}Première vérification pour {name}, création référence", "INFO")
+        
+        # Mettre à jour les fichiers de référence
+        ref_file.write_text(current_hash, encoding='utf-8')
+        content_file.write_text(content, encoding='utf-8')
+        site.fetcher.commit(url)
+        
+    except Exception as e:
+        results['error'] = str(e)
+        log(f"{site.prefix}Erreur vérification intégrité {name}: {e}", "ERROR")
     
     return results
 
-def check_for_malicious_patterns() -> Dict:
-    log("Recherche de patterns suspects...")
+def merge_integrity_results(partials: List[Dict]) -> Dict:
+    """Agrège les résultats par endpoint au format de check_content_integrity"""
+    results = {'changed': False, 'changes': [], 'error': None}
+    for part in partials:
+        results['changed'] = results['changed'] or part.get('changed', False)
+        results['changes'].extend(part.get('changes', []))
+        if part.get('error'):
+            results['error'] = part['error']
+    return results
+
+def check_content_integrity(site: Optional[SiteContext] = None) -> Dict:
+    site = site or default_site.instance()
+    log(f"{site.prefix}Vérification intégrité du site...")
+    return merge_integrity_results([check_endpoint_integrity(url, name, site)
+                                    for url, name in integrity_endpoints(site)])
+
+def check_for_malicious_patterns(site: Optional[SiteContext] = None) -> Dict:
+    site = site or default_site.instance()
+    log(f"{site.prefix}Recherche de patterns suspects...")
     results = {'suspicious_patterns': [], 'error': None}
-    patterns = [
-        (r'eval\s*\(', 'eval() potentiellement dangereux', 'high'),
-        (r'base64_decode\s*\(', 'Décodage base64 suspect', 'medium'),
-        (r'exec\s*\(', 'Appel exec()', 'high'),
-    ]
     
-    try:
-        resp = requests.get(config.SITE_URL, timeout=10)
-        if resp.status_code != 200:
-            log(f"Erreur HTTP {resp.status_code} pour {config.SITE_URL}", "WARNING")
-            return results
-        
-        content = resp.text
-        for pat, desc, sev in patterns:
-            matches = re.findall(pat, content, re.IGNORECASE)
-            if matches:
-                sample = [m[:50] + '...' if len(m) > 50 else m for m in matches[:3]]  # Limiter les exemples
-                results['suspicious_patterns'].append({
-                    'pattern': pat, 
-                    'description': desc, 
-                    'matches': sample
-                })
-                
-                incident_manager.add(
-                    "suspicious_code",
-                    {'pattern': pat, 'description': desc, 'matches': sample},
-                    sev,
-                    notify=True
-                )
-                log(f"Pattern suspect détecté: {desc} {emoji('⚠️')}", "WARNING")
+    # Corps déjà récupérés pendant le cycle (cache du fetcher) : une seule
+    # passe de l'automate de signatures par contenu
+    bodies = {}
+    for url, name in integrity_endpoints(site):
+        try:
+            resp = site.fetcher.get(url)
+            if resp.not_modified:
+                log(f"{site.prefix}{name} inchangé (HTTP 304), analyse ignorée", "INFO")
+                continue
+            if resp.status_code != 200:
+                log(f"{site.prefix}Erreur HTTP {resp.status_code} pour {url}", "WARNING")
+                continue
+            bodies[name] = resp.text
+        except Exception as e:
+            results['error'] = str(e)
+            log(f"{site.prefix}Erreur détection patterns ({name}): {e}", "ERROR")
     
+    try:
+        for hit in signature_scanner.scan_all(bodies):
+            finding = {
+                'pattern': hit['id'],
+                'description': hit['description'],
+                'endpoint': hit['endpoint'],
+                'count': hit['count'],
+                'matches': hit['matches']
+            }
+            results['suspicious_patterns'].append(finding)
+            site.incidents.add("suspicious_code", finding, hit['severity'], notify=True)
+            log(f"{site.prefix}Pattern suspect détecté ({hit['endpoint']}): {hit['description']} {emoji('⚠️')}", "WARNING")
     except Exception as e:
         results['error'] = str(e)
-        log(f"Erreur détection patterns: {e}", "ERROR")
+        log(f"{site.prefix}Erreur détection patterns: {e}", "ERROR")
     
     return results
 
-def check_ssl_cert() -> Dict:
-    log("Vérification certificat SSL...")
+def check_ssl_cert(site: Optional[SiteContext] = None) -> Dict:
+    site = site or default_site.instance()
+    log(f"{site.prefix}Vérification certificat SSL...")
     results = {'valid': False, 'days_left': None, 'error': None}
     
+    from tls_checker import tls_endpoint
+    endpoint = tls_endpoint(site.url)
+    if endpoint is None:
+        results['error'] = "Site non HTTPS"
+        log(f"{site.prefix}Site non HTTPS, vérification SSL ignorée", "WARNING")
+        return results
+    hostname, port = endpoint
+    
     try:
-        hostname = config.SITE_URL.replace("https://", "").replace("http://", "").split("/")[0]
-        ctx = ssl.create_default_context()
+        cert = tls_checker.check(hostname, port)
+        results.update(valid=cert['valid'], days_left=cert['days_left'], error=cert['error'],
+                       cached=cert['cached'], issuer=cert['issuer'])
+        if cert['error']:
+            log(f"{site.prefix}Erreur vérification SSL: {cert['error']}", "ERROR")
+            return results
+        if not cert['cached']:
+            results.update(dns_ms=cert['dns_ms'], connect_ms=cert['connect_ms'], handshake_ms=cert['handshake_ms'])
+            log(f"{site.prefix}Poignée de main TLS {hostname}:{port}: DNS {cert['dns_ms']} ms, "
+                f"connexion {cert['connect_ms']} ms, TLS {cert['handshake_ms']} ms", "INFO")
+        if cert['rotated']:
+            log(f"{site.prefix}Nouveau certificat SSL détecté ({cert['issuer']})", "INFO")
+            site.incidents.add(
+                "ssl_rotated",
+                {'hostname': hostname, 'port': port, 'issuer': cert['issuer'],
+                 'fingerprint': cert['fingerprint'], 'previous_fingerprint': cert['previous_fingerprint']},
+                "low",
+                notify=False
+            )
         
-        with ctx.wrap_socket(socket.socket(), server_hostname=hostname) as s:
-            s.settimeout(8)
-            s.connect((hostname, 443))
-            cert = s.getpeercert()
-            
-            # Extraire la date d'expiration
-            not_after = cert.get('notAfter')
-            if not_after:
-                expire_dt = dateutil_parser.parse(not_after)
-                if expire_dt.tzinfo is None:
-                    expire_dt = expire_dt.replace(tzinfo=dateutil_tz.UTC)
-                
-                now = datetime.now(timezone.utc)
-                delta = (expire_dt - now).days
-                results['valid'] = delta > 0
-                results['days_left'] = delta
-                
-                if delta <= 30:
-                    log(f"Certificat SSL expire bientôt ({delta} jours) {emoji('⚠️')}", "WARNING")
-                    incident_manager.add(
-                        "ssl_warning", 
-                        {'days_left': delta, 'hostname': hostname}, 
-                        "medium", 
-                        notify=True
-                    )
-                else:
-                    log(f"Certificat SSL valide ({delta} jours restants) {emoji('✅')}", "INFO")
-            else:
-                log("Impossible de lire 'notAfter' dans le certificat", "WARNING")
+        delta = cert['days_left']
+        if delta <= 30:
+            log(f"{site.prefix}Certificat SSL expire bientôt ({delta} jours) {emoji('⚠️')}", "WARNING")
+            site.incidents.add(
+                "ssl_warning", 
+                {'days_left': delta, 'hostname': hostname, 'port': port}, 
+                "medium", 
+                notify=True
+            )
+        else:
+            log(f"{site.prefix}Certificat SSL valide ({delta} jours restants) {emoji('✅')}", "INFO")
+            site.incidents.resolve("ssl_warning", {'hostname': hostname, 'port': port})
     
     except Exception as e:
         results['error'] = str(e)
-        log(f"Erreur vérification SSL: {e}", "ERROR")
+        log(f"{site.prefix}Erreur vérification SSL: {e}", "ERROR")
     
     return results
 
 # --- Sauvegarde ---
-def backup_wordpress_content(source_dir: Path = config.MONITOR_DIR):
+def open_catalog() -> SnapshotCatalog:
+    """Catalogue des sauvegardes (BACKUP_DIR/catalog.db), synchronisé avec les snapshots et les packs"""
+    from snapshot_catalog import SnapshotCatalog
+    from snapshot_store import SnapshotStore
+    catalog = SnapshotCatalog(config.BACKUP_DIR)
+    added = catalog.sync(SnapshotStore(config.BACKUP_DIR), config.BACKUP_DIR / "packs", config.SITE_URL)
+    if added:
+        log(f"Catalogue des sauvegardes: {added} entrée(s) ajoutée(s)", "DEBUG")
+    return catalog
+
+def backup_wordpress_content(source_dir: Optional[Path] = None):
+    from snapshot_store import SnapshotStore
+    source_dir = source_dir or config.MONITOR_DIR
     if not source_dir.exists():
         log(f"Dossier source '{source_dir}' inexistant.", "ERROR")
         return
     
-    metadata = {}
-    files_copied = 0
-    
-    # Créer un sous-dossier avec horodatage
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = config.BACKUP_DIR / f"backup_{timestamp}"
-    backup_path.mkdir(parents=True, exist_ok=True)
-    
-    for item in source_dir.iterdir():
-        if item.is_file():
-            try:
-                # Copier le fichier
-                dest_file = backup_path / item.name
-                shutil.copy2(item, dest_file)
-                
-                # Calculer le hash
-                file_content = item.read_text(encoding='utf-8')
-                metadata[item.name] = {
-                    "hash": compute_hash(file_content),
-                    "timestamp": datetime.now().isoformat(),
-                    "size": len(file_content)
-                }
-                
-                log(f"Fichier sauvegardé: {item.name}", "INFO")
-                files_copied += 1
-            except Exception as e:
-                log(f"Impossible de sauvegarder {item.name}: {e}", "ERROR")
+    # Snapshot dédupliqué : seuls les contenus nouveaux sont copiés dans objects/
+    store = SnapshotStore(config.BACKUP_DIR)
+    manifest, stats = store.snapshot(source_dir, site=config.SITE_URL)
     
-    # Sauvegarder les métadonnées
-    metadata_file = backup_path / "metadata.json"
-    with metadata_file.open("w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=4, ensure_ascii=False)
+    for name, error in stats["errors"]:
+        log(f"Impossible de sauvegarder {name}: {error}", "ERROR")
     
-    log(f"Sauvegarde terminée: {files_copied} fichiers copiés vers {backup_path}.", "INFO")
+    log(f"Sauvegarde terminée: {stats['files']} fichiers ({stats['stored']} nouveaux, "
+        f"{stats['reused']} inchangés, {stats['bytes_stored']} octets écrits) -> {manifest.name}.", "INFO")
+    try:
+        open_catalog().close()
+    except Exception as e:
+        log(f"Erreur mise à jour du catalogue: {e}", "ERROR")
 
 # --- Restauration ---
-def restore_all_files(target_dir: Path = config.RESTORE_DIR):
-    # Trouver le dernier backup
-    backups = sorted(config.BACKUP_DIR.glob("backup_*"), key=os.path.getmtime, reverse=True)
-    
-    if not backups:
-        log("Aucune sauvegarde trouvée", "ERROR")
+def restore_all_files(target_dir: Optional[Path] = None, at: Optional[str] = None):
+    """Restaure l'état sauvegardé à la date `at` (ISO, défaut : dernière sauvegarde).
+
+    Snapshot de monitor.py dans `target_dir`, contenus des packs de
+    backup_script.py (pages, flux, collections REST) dans `target_dir`/wordpress.
+    """
+    from snapshot_store import SnapshotStore
+    target_dir = target_dir or config.RESTORE_DIR
+    store = SnapshotStore(config.BACKUP_DIR)
+    try:
+        catalog = open_catalog()
+    except Exception as e:
+        log(f"Erreur lecture du catalogue des sauvegardes: {e}", "ERROR")
         return
     
-    latest_backup = backups[0]
-    metadata_file = latest_backup / "metadata.json"
+    try:
+        manifest = catalog.manifest_at(config.SITE_URL, at)
+        packs = catalog.restore_packs(config.SITE_URL, at, target_dir / "wordpress")
+    except (OSError, ValueError) as e:
+        log(f"Erreur restauration au {at}: {e}", "ERROR")
+        return
+    finally:
+        catalog.close()
+    for filename, error in packs["errors"]:
+        log(f"Erreur restauration {filename}: {error}", "ERROR")
+    if packs["restored"]:
+        log(f"Contenus des packs restaurés dans {target_dir / 'wordpress'}: {', '.join(packs['restored'])}", "INFO")
     
-    if not metadata_file.exists():
-        log("Métadonnées introuvables, restauration impossible.", "ERROR")
+    if manifest is None:
+        log(f"Aucune sauvegarde trouvée{f' au {at}' if at else ''}", "ERROR")
         return
     
+    # Copie parallèle, hachée au passage ; les fichiers déjà conformes sont ignorés
     try:
-        with metadata_file.open("r", encoding="utf-8") as f:
-            metadata = json.load(f)
+        report = store.restore(manifest, target_dir, workers=config.RESTORE_WORKERS)
     except Exception as e:
         log(f"Erreur lecture métadonnées: {e}", "ERROR")
         return
     
-    success_count = 0
-    for filename, fileinfo in metadata.items():
-        backup_file = latest_backup / filename
-        dest_file = target_dir / filename
-        
-        if not backup_file.exists():
-            log(f"Fichier de backup manquant: {filename}", "WARNING")
-            continue
-        
-        try:
-            # Copier le fichier
-            dest_file.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(backup_file, dest_file)
-            
-            # Vérifier le hash
-            current_content = dest_file.read_text(encoding='utf-8')
-            current_hash = compute_hash(current_content)
-            
-            if current_hash != fileinfo["hash"]:
-                log(f"Hash mismatch: {filename}", "ERROR")
-            else:
-                log(f"Restauration OK: {filename}", "INFO")
-                success_count += 1
-                
-        except Exception as e:
-            log(f"Erreur restauration fichier {filename}: {e}", "ERROR")
+    for filename in report["missing"]:
+        log(f"Fichier de backup manquant: {filename}", "WARNING")
+    for filename, error in report["errors"]:
+        log(f"Erreur restauration fichier {filename}: {error}", "ERROR")
     
-    log(f"=== RESTAURATION TERMINÉE: {success_count}/{len(metadata)} fichiers ===", "INFO")
+    success_count = len(report["restored"]) + len(report["skipped"])
+    total = success_count + len(report["missing"]) + len(report["errors"])
+    log(f"=== RESTAURATION TERMINÉE ({manifest.name}): {success_count}/{total} fichiers "
+        f"({len(report['skipped'])} déjà à jour) ===", "INFO")
+
+def show_history(name: str, changed_only: bool = True):
+    """Versions sauvegardées d'un fichier (snapshots) ou d'un endpoint des packs (homepage, rest_posts...)"""
+    catalog = open_catalog()
+    try:
+        rows = catalog.history(config.SITE_URL, name, changed_only=changed_only)
+        if not rows:
+            print(f"Aucune version de '{name}'. Disponibles: {', '.join(catalog.endpoints(config.SITE_URL))}")
+        for row in rows:
+            print(f"{row['timestamp']}  {row['hash'][:12]}  {row['size']:>10}  {row['kind']}:{row['location']}")
+    finally:
+        catalog.close()
 
 # --- Reporting ---
 def generate_report() -> str:
-    history = incident_manager.load_incidents()
+    store = incident_manager.store
     report_lines = [
         "WordPress Monitoring Report",
         "============================",
         f"Généré le: {datetime.now().isoformat()}",
         f"Site surveillé: {config.SITE_URL}",
-        f"Total incidents: {len(history)}",
+        f"Total incidents: {store.count()}",
         ""
     ]
     
-    for inc in history[-20:]:  # Les 20 incidents les plus récents
+    for inc in store.tail(20):  # Les 20 incidents les plus récents
         ts = inc["timestamp"]
         typ = inc["type"]
         sev = inc["severity"]
-        details = inc["details"]
+        details = format_details(inc["details"])
         report_lines.append(f"[{ts}] [{sev}] {typ} - {details}")
     
+    episodes = [ep for ep in store.open_episodes() if ep["count"] > 1]
+    if episodes:
+        report_lines += ["", "Incidents répétés (épisodes ouverts):"]
+        for ep in episodes:
+            last = datetime.fromtimestamp(ep["last_ts"], timezone.utc).isoformat()
+            report_lines.append(f"[{ep['severity']}] {ep['type']} x{ep['count']} - incident #{ep['incident_id']}, "
+                                f"dernier le {last}")
+    
     report_str = "\n".join(report_lines)
     report_file = config.MONITOR_DIR / f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
     report_file.write_text(report_str, encoding='utf-8')
     
     log(f"Rapport TXT généré -> {report_file}", "INFO")
+    build_dashboard([default_site.instance()])
     return report_str
 
+def build_dashboard(sites: List[SiteContext]) -> Dict:
+    """Tableau de bord HTML (monitor_data/logs.html) ; seules les sections dont les données ont changé sont recalculées"""
+    from dashboard import Dashboard, availability_section, incident_sections, uptime_history_section
+    sections = [availability_section(timeseries), uptime_history_section(timeseries)]
+    for site in sites:
+        sections += incident_sections(site.url, site.incidents.store)
+    try:
+        result = Dashboard(config.MONITOR_DIR / "logs.html", config.MONITOR_DIR / "dashboard_cache.json").build(sections)
+    except Exception as e:
+        log(f"Erreur génération tableau de bord HTML: {e}", "ERROR")
+        return {}
+    log(f"Rapport HTML généré -> {config.MONITOR_DIR / 'logs.html'} ({len(result['rendered'])} sections recalculées, "
+        f"{len(result['cached'])} en cache, {result['elapsed']:.2f} s)", "INFO")
+    return result
+
 # --- Nettoyage anciens logs ---
 def cleanup_old_reports():
     now = datetime.now()
@@ -490,7 +735,17 @@ def cleanup_old_reports():
             except Exception as e:
                 log(f"Erreur suppression ancien rapport {f.name}: {e}", "ERROR")
     
-    # Nettoyer les anciens backups
+    # Nettoyer les anciens snapshots et les objets qui ne sont plus référencés
+    try:
+        from snapshot_store import SnapshotStore
+        removed, orphans = SnapshotStore(config.BACKUP_DIR).prune(config.LOG_RETENTION_DAYS)
+        if removed or orphans:
+            log(f"Anciens backups supprimés: {removed} snapshot(s), {orphans} objet(s)", "INFO")
+            open_catalog().close()  # retire les snapshots supprimés du catalogue
+    except Exception as e:
+        log(f"Erreur suppression anciens backups: {e}", "ERROR")
+
+    # Dossiers backup_<horodatage>/ de l'ancien format (copies à plat)
     for f in config.BACKUP_DIR.glob("backup_*"):
         if f.is_dir():
             mtime = datetime.fromtimestamp(f.stat().st_mtime)
@@ -502,35 +757,258 @@ def cleanup_old_reports():
                     log(f"Erreur suppression ancien backup {f.name}: {e}", "ERROR")
 
 # --- Exécution principale ---
+def make_check_engine():
+    from check_engine import CheckEngine
+    return CheckEngine(max_workers=config.CHECK_WORKERS, deadline=config.CYCLE_DEADLINE_SECONDS)
+
+check_engine = Lazy(make_check_engine)
+
+def site_tasks(site: SiteContext, key_prefix: str = "") -> tuple:
+    """Tâches (et résultats par défaut) d'un cycle de vérification pour un site"""
+    tasks = {
+        'availability': lambda: check_site_availability(site),
+        'patterns': lambda: check_for_malicious_patterns(site),
+        'ssl': lambda: check_ssl_cert(site),
+    }
+    defaults = {
+        'availability': {'available': False, 'status_code': None, 'response_time': None, 'error': None},
+        'patterns': {'suspicious_patterns': [], 'error': None},
+        'ssl': {'valid': False, 'days_left': None, 'error': None},
+    }
+    for url, name in integrity_endpoints(site):
+        key = f"integrity:{name}"
+        tasks[key] = lambda url=url, name=name: check_endpoint_integrity(url, name, site)
+        defaults[key] = {'changed': False, 'changes': [], 'error': None}
+    
+    return ({key_prefix + k: fn for k, fn in tasks.items()},
+            {key_prefix + k: d for k, d in defaults.items()})
+
+def collect_site_results(site: SiteContext, results: Dict[str, Dict], deadline: float,
+                         key_prefix: str = "") -> tuple:
+    """Renvoie (disponibilité, intégrité, patterns, ssl) et trace les timeouts"""
+    for name, res in results.items():
+        if name.startswith(key_prefix) and res.get('timed_out'):
+            check = name[len(key_prefix):]
+            log(f"{site.prefix}Vérification {check} hors délai ({deadline} s) {emoji('⚠️')}", "WARNING")
+            site.incidents.add("check_timeout", {"check": check, "deadline": deadline}, "medium")
+    
+    res_integrity = merge_integrity_results([results[f"{key_prefix}integrity:{name}"]
+                                             for _, name in integrity_endpoints(site)])
+    return (results[key_prefix + 'availability'], res_integrity,
+            results[key_prefix + 'patterns'], results[key_prefix + 'ssl'])
+
+def run_checks(site: Optional[SiteContext] = None) -> tuple:
+    """Exécute les vérifications et les endpoints d'intégrité en parallèle.
+
+    Renvoie (disponibilité, intégrité, patterns, ssl) avec les mêmes dicts que
+    les fonctions check_* ; une vérification hors délai est marquée timed_out.
+    """
+    site = site or default_site.instance()
+    log(f"{site.prefix}Lancement des vérifications...")
+    tasks, defaults = site_tasks(site)
+    
+    site.fetcher.new_cycle()
+    start = time.monotonic()
+    results = check_engine.run(tasks, defaults)
+    log(f"{site.prefix}Vérifications terminées en {time.monotonic() - start:.2f} s", "INFO")
+    
+    return collect_site_results(site, results, config.CYCLE_DEADLINE_SECONDS)
+
+def cycle_records(site: SiteContext, res_avail: Dict, res_integrity: Dict, res_patterns: Dict,
+                  res_ssl: Dict) -> List[tuple]:
+    """Une mesure (site, vérification, ok, valeur, code HTTP, ts) par vérification du cycle"""
+    now = time.time()
+    return [
+        (site.url, "availability", res_avail['available'], res_avail.get('response_time'),
+         res_avail.get('status_code'), now),
+        (site.url, "integrity", not res_integrity['changed'] and not res_integrity.get('error'),
+         len(res_integrity['changes']), 0, now),
+        (site.url, "patterns", not res_patterns.get('suspicious_patterns') and not res_patterns.get('error'),
+         len(res_patterns.get('suspicious_patterns', [])), 0, now),
+        (site.url, "ssl", res_ssl['valid'], res_ssl.get('days_left'), 0, now),
+    ]
+
+def record_results(records: List[tuple]):
+    """Ajoute les mesures aux séries temporelles, puis agrégats et rétention"""
+    try:
+        timeseries.append_many(records)
+        timeseries.maintain()
+    except OSError as e:
+        log(f"Erreur écriture séries temporelles: {e}", "ERROR")
+
+# --- Mode flotte ---
+fleet_engine = None
+
+def fleet_sites(inventory: Path) -> List[SiteContext]:
+    """Un SiteContext par URL de l'inventaire, état dans MONITOR_DIR/sites/<slug>"""
+    sites = []
+    for url in load_inventory(inventory):
+        slug = site_slug(url)
+        sites.append(SiteContext(url, config.MONITOR_DIR / "sites" / slug, label=slug))
+    return sites
+
+def run_fleet(inventory: Path):
+    """Un cycle de vérification pour tous les sites de l'inventaire.
+
+    Toutes les tâches de tous les sites passent par un pool partagé borné
+    (FLEET_WORKERS), avec au plus FLEET_PER_HOST requêtes simultanées par hôte
+    et une échéance globale FLEET_DEADLINE_SECONDS.
+    """
+    from check_engine import CheckEngine
+    from tls_checker import tls_endpoint
+    global fleet_engine
+    if fleet_engine is None:
+        fleet_engine = CheckEngine(max_workers=config.FLEET_WORKERS, deadline=config.FLEET_DEADLINE_SECONDS,
+                                   per_host=config.FLEET_PER_HOST)
+    
+    sites = fleet_sites(inventory)
+    log(f"=== Début du cycle flotte ({len(sites)} sites) ===", "INFO")
+    cycle_start = time.time()
+    cursors = {}
+    per_site = []
+    for site in sites:
+        cursors[site.label] = site.incidents.cursor()
+        site.fetcher.new_cycle()
+        per_site.append(site_tasks(site, key_prefix=f"{site.label}|"))
+    
+    # Entrelacer les tâches des sites (disponibilité de tous, puis intégrité...)
+    # pour que les tâches d'un même hôte ne se suivent pas ; le moteur n'en
+    # soumet au pool que FLEET_PER_HOST à la fois par hôte
+    tasks, defaults, hosts = {}, {}, {}
+    columns = [(site, list(site_t.items()), site_d) for site, (site_t, site_d) in zip(sites, per_site)]
+    for rank in range(max((len(items) for _, items, _ in columns), default=0)):
+        for site, items, site_d in columns:
+            if rank < len(items):
+                key, fn = items[rank]
+                tasks[key] = fn
+                hosts[key] = host_of(site.url)
+                defaults[key] = site_d[key]
+    
+    # Certificats de toute la flotte en un lot parallèle (chaque hôte:port une
+    # fois) : les vérifications SSL des sites lisent ensuite le cache, qui leur
+    # transmet latences et renouvellement des poignées de main du préchauffage
+    start = time.monotonic()
+    tls_checker.check_many(ep for ep in (tls_endpoint(site.url) for site in sites) if ep)
+    log(f"Certificats TLS de la flotte vérifiés en {time.monotonic() - start:.2f} s", "INFO")
+    
+    start = time.monotonic()
+    results = fleet_engine.run(tasks, defaults, hosts=hosts)
+    log(f"Cycle flotte: {len(tasks)} vérifications en {time.monotonic() - start:.2f} s", "INFO")
+    
+    summary_lines = []
+    ongoing = []
+    records = []
+    for site in sites:
+        records += cycle_records(site, *collect_site_results(site, results, config.FLEET_DEADLINE_SECONDS,
+                                                             key_prefix=f"{site.label}|"))
+        for inc in site.incidents.since(cursors[site.label]):
+            summary_lines.append(f"- {site.url} [{inc['severity']}] {inc['type']} @ {inc['timestamp']} : {format_details(inc['details'])}")
+        ongoing += ongoing_lines(site.incidents.ongoing(cycle_start), site.url)
+    
+    if summary_lines:
+        subject = f"[ALERTE WP] {len(summary_lines)} incident(s) détecté(s) sur la flotte ({len(sites)} sites)"
+        body = "Nouveaux incidents détectés pendant ce cycle:\n\n" + "\n".join(summary_lines)
+        if ongoing:
+            body += "\n\nIncidents toujours en cours (déjà notifiés):\n\n" + "\n".join(ongoing)
+        send_alert(subject, body, incident_type="summary", html=False)
+        log(f"{len(summary_lines)} nouveaux incidents flotte notifiés par email.", "WARNING")
+    elif ongoing:
+        log(f"{len(ongoing)} incident(s) toujours en cours sur la flotte, déjà notifiés (délai de carence).",
+            "WARNING")
+    else:
+        log(f"Aucun incident détecté sur la flotte ({len(sites)} sites).", "INFO")
+    record_results(records)
+    build_dashboard(sites)
+    
+    log("=== Fin du cycle flotte ===\n", "INFO")
+
+# --- Exploration complète (sitemap) ---
+def run_crawl(site: Optional[SiteContext] = None) -> Dict:
+    """Explore toutes les pages du sitemap et leurs ressources JS/CSS.
+
+    Les contenus nouveaux ou modifiés passent par la base de signatures ;
+    une ressource JS/CSS modifiée est un incident. Un seul email récapitulatif.
+    """
+    site = site or default_site.instance()
+    log(f"{site.prefix}=== Début de l'exploration complète ===", "INFO")
+    cursor = site.incidents.cursor()
+    
+    def inspect(url: str, kind: str, text: str):
+        for hit in signature_scanner.scan(text):
+            site.incidents.add("suspicious_code", {
+                'pattern': hit['id'],
+                'description': hit['description'],
+                'endpoint': url,
+                'count': hit['count'],
+                'matches': hit['matches']
+            }, hit['severity'], notify=False)
+            log(f"{site.prefix}Pattern suspect détecté ({url}): {hit['description']} {emoji('⚠️')}", "WARNING")
+    
+    from crawler import Crawler, CrawlIndex
+    index = CrawlIndex(site.state_dir / "crawl_index.db")
+    try:
+        crawler = Crawler(site.url, index, diff_engine.fingerprint, inspect,
+                          workers=config.CRAWL_WORKERS, per_host=config.CRAWL_PER_HOST,
+                          deadline=config.CRAWL_DEADLINE_SECONDS, max_urls=config.CRAWL_MAX_URLS,
+                          max_assets=config.CRAWL_MAX_ASSETS)
+        report = crawler.run()
+    finally:
+        index.close()
+    
+    for res in report['changed']:
+        if res['kind'] == 'asset':
+            site.incidents.add("asset_changed", {'url': res['url'], 'old_hash': res['old_hash'],
+                                                 'new_hash': res['hash']}, "medium", notify=False)
+        else:
+            site.incidents.add("page_changed", {'url': res['url']}, "low", notify=False)
+    
+    log(f"{site.prefix}Exploration: {report['pages']} pages, {report['assets']} ressources en {report['elapsed']} s "
+        f"({report['not_modified']} inchangées (304), {len(report['new'])} nouvelles, "
+        f"{len(report['changed'])} modifiées, {len(report['errors'])} erreurs, {report['pending']} reportées)", "INFO")
+    
+    new_incidents = site.incidents.since(cursor)
+    if new_incidents:
+        subject = f"[ALERTE WP] {len(new_incidents)} incident(s) détecté(s) par l'exploration - {site.url}"
+        body_lines = [f"- [{inc['severity']}] {inc['type']} @ {inc['timestamp']} : {format_details(inc['details'])}"
+                     for inc in new_incidents]
+        body = "Nouveaux incidents détectés pendant l'exploration:\n\n" + "\n".join(body_lines)
+        send_alert(subject, body, incident_type="summary", html=False)
+    
+    log(f"{site.prefix}=== Fin de l'exploration complète ===\n", "INFO")
+    return report
+
 def run_all():
     log("=== Début du cycle de surveillance ===", "INFO")
-    before_incidents = incident_manager.load_incidents()
-    before_count = len(before_incidents)
+    cursor = incident_manager.cursor()
+    cycle_start = time.time()
     
-    # Exécuter toutes les vérifications
-    res_avail = check_site_availability()
-    res_integrity = check_content_integrity()
-    res_patterns = check_for_malicious_patterns()
-    res_ssl = check_ssl_cert()
+    # Exécuter toutes les vérifications en parallèle, bornées par l'échéance du cycle
+    res_avail, res_integrity, res_patterns, res_ssl = run_checks()
+    record_results(cycle_records(default_site.instance(), res_avail, res_integrity, res_patterns, res_ssl))
     
     # Nettoyer les anciens rapports
     cleanup_old_reports()
     
-    # Vérifier s'il y a de nouveaux incidents
-    after_incidents = incident_manager.load_incidents()
-    new_incidents = after_incidents[before_count:]
+    # Nouveaux incidents, et incidents déjà notifiés qui se sont répétés pendant ce cycle
+    new_incidents = incident_manager.since(cursor)
+    ongoing = ongoing_lines(incident_manager.ongoing(cycle_start))
     
     # Générer un rapport
     generate_report()
     
     # Envoyer une notification si nécessaire
-    if not new_incidents:
+    if ongoing and not new_incidents:
+        log(f"{len(ongoing)} incident(s) toujours en cours, déjà notifiés (délai de carence): "
+            f"pas d'email.", "WARNING")
+    elif not new_incidents and not res_avail['available']:
+        log("Site indisponible sans nouvel incident: pas d'email d'information.", "WARNING")
+    elif not new_incidents:
         subject = f"[WP Monitor] Site OK - {config.SITE_URL}"
         body = f"""Surveillance WordPress - Aucun problème détecté
 
 Horodatage: {datetime.now(timezone.utc).isoformat()}
 Disponibilité: {res_avail['available']} (HTTP {res_avail.get('status_code')})
-Temps de réponse: {res_avail.get('response_time', 0):.2f} s
+Temps de réponse: {res_avail.get('response_time') or 0:.2f} s ({format_phases(res_avail.get('phases') or {})})
 Intégrité: {'Changements détectés' if res_integrity['changed'] else 'OK'}
 Patterns suspects: {len(res_patterns.get('suspicious_patterns', []))}
 SSL: {res_ssl.get('days_left')} jours restants
@@ -541,52 +1019,121 @@ Rapport complet dans le dossier {config.MONITOR_DIR}
         log("Aucun incident détecté. Email d'information envoyé.", "INFO")
     else:
         subject = f"[ALERTE WP] {len(new_incidents)} incident(s) détecté(s) - {config.SITE_URL}"
-        body_lines = [f"- [{inc['severity']}] {inc['type']} @ {inc['timestamp']} : {inc['details']}" 
+        body_lines = [f"- [{inc['severity']}] {inc['type']} @ {inc['timestamp']} : {format_details(inc['details'])}" 
                      for inc in new_incidents]
         body = "Nouveaux incidents détectés pendant ce cycle:\n\n" + "\n".join(body_lines)
+        if ongoing:
+            body += "\n\nIncidents toujours en cours (déjà notifiés):\n\n" + "\n".join(ongoing)
         send_alert(subject, body, incident_type="summary", html=False)
         log(f"{len(new_incidents)} nouveaux incidents notifiés par email.", "WARNING")
     
     log("=== Fin du cycle de surveillance ===\n", "INFO")
 
+# --- Mode démon (planification par vérification) ---
+def probe_availability(site: SiteContext) -> bool:
+    """Sonde de disponibilité seule : requête conditionnelle (304 si inchangé)"""
+    site.probe.new_cycle()
+    res = check_site_availability(site, fetcher=site.probe)
+    site.probe.commit(site.url)
+    record_results([(site.url, "availability", res['available'], res['response_time'],
+                     res['status_code'], time.time())])
+    return res['available']
+
+def probe_ssl(site: SiteContext) -> bool:
+    res = check_ssl_cert(site)
+    record_results([(site.url, "ssl", res['valid'], res['days_left'], 0, time.time())])
+    return res['valid'] and (res['days_left'] or 0) > 30
+
+def build_scheduler(fleet: Optional[str] = None) -> AdaptiveScheduler:
+    """Tâches du mode démon, chacune à son rythme.
+
+    Disponibilité toutes les AVAILABILITY_INTERVAL_MINUTES (plus souvent tant
+    que le site est en panne), certificat tous les SSL_INTERVAL_HOURS, cycle
+    complet tous les CHECK_INTERVAL_HOURS, exploration tous les
+    CRAWL_INTERVAL_HOURS (0 = désactivée). En mode flotte, une sonde de
+    disponibilité par site, premières échéances étalées sur l'intervalle.
+    """
+    from scheduler import AdaptiveScheduler, Job
+    scheduler = AdaptiveScheduler(max_workers=config.SCHEDULER_WORKERS, log=log)
+    jitter = config.SCHEDULER_JITTER
+    avail = config.AVAILABILITY_INTERVAL_MINUTES * 60
+    cycle_interval = config.CHECK_INTERVAL_HOURS * 3600
+    
+    if fleet:
+        scheduler.add(Job("fleet", lambda: run_fleet(Path(fleet)), cycle_interval, priority=5,
+                          jitter=jitter, min_interval=cycle_interval, run_now=True))
+        sites = fleet_sites(Path(fleet))
+    else:
+        scheduler.add(Job("cycle", run_all, cycle_interval, priority=5, jitter=jitter,
+                          min_interval=cycle_interval, run_now=True))
+        scheduler.add(Job("ssl", lambda: probe_ssl(default_site.instance()), config.SSL_INTERVAL_HOURS * 3600,
+                          priority=1, jitter=jitter, min_interval=3600))
+        if config.CRAWL_INTERVAL_HOURS > 0:
+            crawl_interval = config.CRAWL_INTERVAL_HOURS * 3600
+            scheduler.add(Job("crawl", run_crawl, crawl_interval, priority=9, jitter=jitter,
+                              min_interval=crawl_interval))
+        sites = [default_site.instance()]
+    
+    for site in sites:
+        scheduler.add(Job(f"availability:{site.label or site.url}", lambda site=site: probe_availability(site),
+                          avail, priority=0, jitter=jitter, min_interval=min(avail, 60)))
+    return scheduler
+
 # --- CLI ---
 def main():
+    check_dependencies()
     parser = argparse.ArgumentParser(description="WP Monitoring & Backup Tool")
     parser.add_argument("--once", action="store_true", help="Exécution unique")
     parser.add_argument("--backup", action="store_true", help="Faire backup uniquement")
     parser.add_argument("--restore", action="store_true", help="Restauration depuis le dernier backup")
+    parser.add_argument("--at", metavar="DATE",
+                        help="Avec --restore : état sauvegardé à cette date (ISO, ex. 2026-03-01T08:00)")
+    parser.add_argument("--history", metavar="NOM",
+                        help="Versions sauvegardées d'un fichier ou endpoint (homepage, rest_posts...)")
     parser.add_argument("--report", action="store_true", help="Générer rapport uniquement")
     parser.add_argument("--test", action="store_true", help="Exécuter tests unitaires simples")
+    parser.add_argument("--fleet", metavar="FICHIER", default=config.SITES_FILE,
+                        help="Mode flotte : inventaire des sites (une URL par ligne)")
+    parser.add_argument("--crawl", action="store_true",
+                        help="Exploration complète du site (sitemap, pages et ressources JS/CSS)")
     args = parser.parse_args()
     
     if args.backup:
         backup_wordpress_content()
     elif args.restore:
-        restore_all_files()
+        restore_all_files(at=args.at)
+    elif args.history:
+        show_history(args.history)
     elif args.report:
         generate_report()
+    elif args.crawl:
+        run_crawl()
     elif args.test:
         # Tests simples
         print("Test de base...")
         print(f"URL: {config.SITE_URL}")
         print(f"Hash test: {compute_hash('test')}")
-    elif args.once:
-        run_all()
     else:
-        # Mode planifié
-        log(f"Démarrage du monitoring planifié (toutes les {config.CHECK_INTERVAL_HOURS} heures)", "INFO")
-        schedule.every(config.CHECK_INTERVAL_HOURS).hours.do(run_all)
-        
-        # Exécuter une première fois immédiatement
-        run_all()
+        # Mode flotte (inventaire de sites) ou site unique
+        cycle = (lambda: run_fleet(Path(args.fleet))) if args.fleet else run_all
+        if args.once:
+            cycle()
+            return
         
-        # Boucle principale
+        # Mode planifié : cycle complet lancé immédiatement, puis chaque
+        # vérification à son rythme (sommeil jusqu'à la prochaine échéance)
+        log(f"Démarrage du monitoring planifié (cycle complet toutes les {config.CHECK_INTERVAL_HOURS} heures, "
+            f"disponibilité toutes les {config.AVAILABILITY_INTERVAL_MINUTES:g} minutes)", "INFO")
+        scheduler = build_scheduler(args.fleet)
+        if config.METRICS_PORT:
+            import metrics
+            metrics.serve(config.METRICS_PORT)
+            log(f"Métriques Prometheus sur http://0.0.0.0:{config.METRICS_PORT}/metrics", "INFO")
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Vérifier toutes les minutes
+            scheduler.run_forever()
         except KeyboardInterrupt:
             log("Arrêt demandé par l'utilisateur", "INFO")
+            scheduler.stop(wait=False)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
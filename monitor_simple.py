@@ -9,6 +9,8 @@ import requests
 from datetime import datetime
 from time import sleep
 
+from http_client import get_client
+
 # ===================== CONFIGURATION =====================
 SITE_URL = os.getenv("SITE_URL", "https://oupssecuretest.wordpress.com")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "danieltiti882@gmail.com")
@@ -54,7 +56,7 @@ def check_site(url: str) -> bool:
     
     for attempt in range(1, RETRY_COUNT + 1):
         try:
-            r = requests.get(url, timeout=10, headers=headers)
+            r = get_client().get(url, timeout=(5, 10), headers=headers)
             log(f"Tentative {attempt} - HTTP {r.status_code}")
             
             if r.status_code == 200:
@@ -83,7 +85,7 @@ def check_api() -> bool:
     
     for attempt in range(1, RETRY_COUNT + 1):
         try:
-            r = requests.get(api_url, timeout=10, headers=headers)
+            r = get_client().get(api_url, timeout=(5, 10), headers=headers)
             log(f"Tentative API {attempt} - HTTP {r.status_code}")
             
             if r.status_code == 200:
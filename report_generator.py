@@ -5,10 +5,15 @@ Consolide les logs, incidents et rapports en un document unique
 """
 
 import os
-import json
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
+
+from incident_store import IncidentStore
+from log_reader import LogReader
+from sla import site_sla
+from timeseries import TimeSeriesStore
 
 # Dossiers de surveillance et rapports
 MONITOR_DIR = Path("monitor_data")
@@ -65,79 +70,69 @@ def clean_log_file():
         return False
 
 # Chargement de l'historique des incidents
-def load_incident_history() -> List[Dict]:
-    incident_file = MONITOR_DIR / "incident_history.json"
-    if incident_file.exists():
+def open_incident_store() -> IncidentStore:
+    return IncidentStore(MONITOR_DIR / "incidents.db", legacy_json=MONITOR_DIR / "incident_history.json")
+
+def load_incident_window(cutoff: datetime, sample: int = 5) -> Tuple[Dict, List[Dict]]:
+    """Compteurs (type, sévérité) depuis `cutoff` et les `sample` premiers incidents de la fenêtre"""
+    try:
+        store = open_incident_store()
         try:
-            with incident_file.open('r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            log(f"Erreur lecture incident_history.json: {e}", "ERROR")
-            return []
-    return []
+            return store.counts(cutoff), store.query(start=cutoff, limit=sample)
+        finally:
+            store.close()
+    except Exception as e:
+        log(f"Erreur lecture incidents.db: {e}", "ERROR")
+        return {}, []
 
 # Chargement des logs récents
 def load_recent_logs(days: int = 7) -> List[str]:
-    log_file = MONITOR_DIR / "monitor.log"
-    logs = []
-    if not log_file.exists():
-        return logs
-        
+    """Lignes de monitor.log (rotations comprises) des `days` derniers jours.
+
+    L'index horaire est conservé dans log_index.json : seuls les octets
+    ajoutés depuis le rapport précédent sont parcourus.
+    """
+    reader = LogReader(MONITOR_DIR / "monitor.log", MONITOR_DIR / "log_index.json")
     cutoff = datetime.now() - timedelta(days=days)
-    
-    # Essayer différents encodages
-    encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-8-sig']
-    
-    for encoding in encodings:
-        try:
-            with log_file.open('r', encoding=encoding, errors='replace') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Essayer d'extraire la date
-                    try:
-                        if line.startswith('[') and len(line) > 20:
-                            log_date_str = line[1:20]
-                            # Nettoyer la chaîne de date
-                            log_date_str = ''.join(c for c in log_date_str if c.isdigit() or c in ' -:')
-                            log_date = datetime.strptime(log_date_str, "%Y-%m-%d %H:%M:%S")
-                            if log_date >= cutoff:
-                                logs.append(line)
-                        else:
-                            logs.append(line)
-                    except (ValueError, IndexError):
-                        # Si le parsing échoue, ajouter quand même
-                        logs.append(line)
-            break  # Sortir de la boucle si la lecture réussit
-            
-        except UnicodeDecodeError:
-            logs = []  # Réinitialiser pour le prochain essai
-            continue
-            
-    return logs
+    try:
+        return reader.read_since(cutoff)
+    except OSError as e:
+        log(f"Erreur lecture des logs: {e}", "ERROR")
+        return []
+
+# Disponibilité calculée sur les mesures enregistrées par monitor.py
+def load_site_sla(cutoff: datetime) -> Dict[str, Dict]:
+    try:
+        store = TimeSeriesStore(MONITOR_DIR / "timeseries")
+        return site_sla(store, cutoff.timestamp(), time.time())
+    except Exception as e:
+        log(f"Erreur lecture des séries temporelles: {e}", "ERROR")
+        return {}
+
+def format_duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes // 60} h {minutes % 60:02d} min"
+
+def format_epoch(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
 
 # Génération d'un rapport complet
 def generate_comprehensive_report(days: int = 7) -> str:
-    incidents = load_incident_history()
     logs = load_recent_logs(days)
     cutoff = datetime.now() - timedelta(days=days)
     
-    # Filtrer les incidents récents
-    recent_incidents = []
-    for inc in incidents:
-        try:
-            incident_date = datetime.fromisoformat(inc['timestamp'].replace('Z', '+00:00'))
-            if incident_date >= cutoff:
-                recent_incidents.append(inc)
-        except (ValueError, KeyError):
-            # Si le format de date est invalide, ignorer cet incident
-            continue
+    # Une seule lecture indexée : compteurs par (type, sévérité) sur la fenêtre
+    counts, sample_incidents = load_incident_window(cutoff)
 
     incident_counts = {}
-    for inc in recent_incidents:
-        incident_counts[inc['type']] = incident_counts.get(inc['type'], 0) + 1
+    for (typ, _sev), n in counts.items():
+        incident_counts[typ] = incident_counts.get(typ, 0) + n
+    total_incidents = sum(counts.values())
+    high_severity_count = sum(n for (_typ, sev), n in counts.items() if sev == 'high')
+    ssl_incidents = any('ssl' in typ.lower() for typ in incident_counts)
+    content_incidents = any('content' in typ.lower() for typ in incident_counts)
 
     report = f"📈 RAPPORT COMPLET DE SURVEILLANCE WORDPRESS\n"
     report += f"📅 Période: {days} jours\n"
@@ -155,25 +150,34 @@ def generate_comprehensive_report(days: int = 7) -> str:
 
     # Derniers incidents détaillés
     report += "🔍 DERNIERS INCIDENTS (5 max):\n"
-    for inc in recent_incidents[:5]:
+    for inc in sample_incidents:
         report += f"   - [{inc['timestamp']}] {inc['type']} ({inc.get('severity', 'unknown')})\n"
     report += "\n"
 
-    # Disponibilité - analyse améliorée
-    availability_logs = [l for l in logs if any(keyword in l for keyword in 
-                       ["Site accessible", "Site inaccessible", "accessible", "inaccessible", "✅", "❌"])]
-    
-    up_count = len([l for l in availability_logs if any(keyword in l for keyword in 
-                   ["✅", "accessible", "SUCCES", "Site accessible"])])
-    down_count = len([l for l in availability_logs if any(keyword in l for keyword in 
-                     ["❌", "inaccessible", "ERREUR", "Site inaccessible"])])
+    # Disponibilité, latences et MTTR sur les mesures structurées
+    sla = load_site_sla(cutoff)
+    down_count = sum(stats["outages"] for stats in sla.values())
     
     report += "🌐 DISPONIBILITÉ:\n"
-    report += f"   - Disponible: {up_count} fois\n"
-    report += f"   - Indisponible: {down_count} fois\n"
-    if up_count + down_count > 0:
-        availability_rate = (up_count / (up_count + down_count)) * 100
-        report += f"   - Taux de disponibilité: {availability_rate:.2f}%\n"
+    if not sla:
+        report += "   - Aucune mesure enregistrée sur la période\n"
+    for url, stats in sla.items():
+        report += f"   - {url}\n"
+        # Fenêtre réellement couverte : mesures brutes limitées à TIMESERIES_RAW_DAYS
+        if stats["covered_from"] > cutoff.timestamp() + 86400:
+            report += f"     Données disponibles depuis le {format_epoch(stats['covered_from'])} seulement\n"
+        if stats["detailed_from"] > max(stats["covered_from"], cutoff.timestamp()):
+            report += (f"     Avant le {format_epoch(stats['detailed_from'])} : agrégats horaires / journaliers "
+                       f"(percentiles, pannes et MTTR calculés depuis cette date)\n")
+        if stats["uptime"] is not None:
+            report += f"     Taux de disponibilité: {stats['uptime']:.3f}% ({stats['samples']} mesures)\n"
+        report += f"     Pannes: {stats['outages']} (dont {stats['open_outages']} en cours), "
+        report += f"indisponibilité totale {format_duration(stats['downtime'])}\n"
+        if stats["mttr"] is not None:
+            report += f"     MTTR: {format_duration(stats['mttr'])}\n"
+        if stats["p50"] is not None:
+            report += (f"     Temps de réponse p50 / p95 / p99: {stats['p50'] * 1000:.0f} / "
+                       f"{stats['p95'] * 1000:.0f} / {stats['p99'] * 1000:.0f} ms\n")
     report += "\n"
 
     # Logs récents
@@ -188,29 +192,26 @@ def generate_comprehensive_report(days: int = 7) -> str:
     if down_count > 0:
         report += "   - 🔍 Investiguer les causes d'indisponibilité du site\n"
     
-    high_severity_incidents = [inc for inc in recent_incidents if inc.get('severity') == 'high']
-    if high_severity_incidents:
+    if high_severity_count:
         report += "   - 🚨 Traiter en priorité les incidents de sécurité (niveau high)\n"
-        report += f"     ({len(high_severity_incidents)} incident(s) critique(s))\n"
+        report += f"     ({high_severity_count} incident(s) critique(s))\n"
     
-    if len(recent_incidents) > 10:
+    if total_incidents > 10:
         report += "   - ⚙️ Réviser la configuration du site (trop d'incidents)\n"
     
-    ssl_incidents = [inc for inc in recent_incidents if 'ssl' in inc.get('type', '').lower()]
     if ssl_incidents:
         report += "   - 🔒 Vérifier le certificat SSL\n"
     
-    content_incidents = [inc for inc in recent_incidents if 'content' in inc.get('type', '').lower()]
     if content_incidents:
         report += "   - 📝 Surveiller les modifications de contenu\n"
     
-    if not any([down_count > 0, high_severity_incidents, len(recent_incidents) > 10, ssl_incidents, content_incidents]):
+    if not any([down_count > 0, high_severity_count, total_incidents > 10, ssl_incidents, content_incidents]):
         report += "   - ✅ Configuration globale satisfaisante\n"
         report += "   - 🎯 Aucune action corrective nécessaire\n"
 
     # Statistiques supplémentaires
     report += "\n📊 STATISTIQUES:\n"
-    report += f"   - Total incidents: {len(recent_incidents)}\n"
+    report += f"   - Total incidents: {total_incidents}\n"
     report += f"   - Total logs analysés: {len(logs)}\n"
     report += f"   - Période analysée: du {cutoff.strftime('%Y-%m-%d')} au {datetime.now().strftime('%Y-%m-%d')}\n"
 
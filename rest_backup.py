@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Sauvegarde complète par l'API REST WordPress (/wp-json/wp/v2/*), incrémentale
+
+· Collections : articles, pages, commentaires et métadonnées des médias.
+· Pagination : la première page (100 objets, triés par identifiant) donne
+  X-WP-Total et X-WP-TotalPages ; les pages suivantes sont récupérées en
+  parallèle (`workers` requêtes simultanées sur le client partagé).
+· Incrémental : seuls les objets modifiés depuis le curseur de la
+  collection sont demandés (`modified_after` ; `after`, date de création,
+  pour les commentaires qui n'ont pas de date de modification). Le curseur
+  est la date de modification la plus récente relevée *au début* de la
+  sauvegarde : un objet modifié pendant la sauvegarde est repris à la
+  suivante.
+· Chaque page est ajoutée telle quelle (JSON brut) au pack du mois
+  (backup_pack), type `rest_<collection>`.
+· Reprise : les pages enregistrées sont notées dans le fichier d'état après
+  chaque ajout ; une sauvegarde interrompue (erreur réseau, arrêt) reprend
+  avec le même filtre et ne redemande que les pages manquantes. Si le
+  nombre d'objets distincts reçus est inférieur à X-WP-Total (suppressions
+  pendant la sauvegarde, qui décalent les pages), le curseur n'avance pas.
+
+Un objet supprimé sur le site reste dans les sauvegardes ; une sauvegarde
+complète (`full=True`) reprend tout sans filtre.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from backup_pack import BackupPack, pack_path
+from http_client import HTTPClient, get_client
+
+API_PATH = "/wp-json/wp/v2/"
+
+# collection : (paramètre de filtre, champ de date correspondant, heure locale du site)
+COLLECTIONS = {
+    "posts": ("modified_after", "modified"),
+    "pages": ("modified_after", "modified"),
+    "media": ("modified_after", "modified"),
+    "comments": ("after", "date"),
+}
+
+# Marge sous le curseur : modifications de la même seconde que le curseur
+OVERLAP = timedelta(seconds=60)
+
+
+class RestBackup:
+    def __init__(self, site_url: str, packs_dir: Path, state_file: Path, workers: int = 8, per_page: int = 100,
+                 auth: Optional[Tuple[str, str]] = None, client: Optional[HTTPClient] = None,
+                 log: Callable[[str], None] = print):
+        self.site_url = site_url.rstrip('/')
+        self.packs_dir = Path(packs_dir)
+        self.state_file = Path(state_file)
+        self.workers = workers
+        self.per_page = per_page
+        self.auth = auth
+        self.client = client or get_client()
+        self.log = log
+        self.state = self._load_state()
+
+    # --- État (curseurs et sauvegarde en cours) ---
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    # --- Requêtes ---
+    def _get(self, collection: str, params: Dict) -> requests.Response:
+        return self.client.get(self.site_url + API_PATH + collection, params=params, auth=self.auth,
+                               endpoint=f"rest/{collection}")
+
+    def _latest(self, collection: str) -> Optional[str]:
+        """Date (champ de COLLECTIONS) de l'objet le plus récemment modifié, None si collection vide"""
+        field = COLLECTIONS[collection][1]
+        resp = self._get(collection, {"per_page": 1, "orderby": field, "order": "desc", "_fields": field})
+        resp.raise_for_status()
+        items = resp.json()
+        return items[0][field] if items else None
+
+    def _page(self, collection: str, params: Dict, page: int) -> Tuple[int, requests.Response, List[Dict]]:
+        resp = self._get(collection, dict(params, page=page))
+        if resp.status_code == 400 and page > 1:
+            return page, resp, []  # page disparue (objets supprimés entre-temps)
+        resp.raise_for_status()
+        return page, resp, resp.json()
+
+    # --- Sauvegarde ---
+    def backup_collection(self, collection: str, full: bool = False) -> Dict:
+        """Sauvegarde (reprise) d'une collection ; renvoie {objects, pages, complete, cursor}"""
+        param = COLLECTIONS[collection][0]
+        state = self.state.setdefault(collection, {})
+        run = None if full else state.get("pending")
+        if run is None:
+            run = {"since": None if full else state.get("cursor"), "next_cursor": self._latest(collection),
+                   "total": None, "total_pages": None, "done": [], "ids": []}
+            state["pending"] = run
+            self._save_state()
+        elif run["done"]:
+            self.log(f"Reprise de {collection} : {len(run['done'])}/{run['total_pages']} pages déjà enregistrées")
+
+        params = {"per_page": self.per_page, "orderby": "id", "order": "asc"}
+        if run["since"]:
+            params[param] = (datetime.fromisoformat(run["since"]) - OVERLAP).isoformat()
+        pack = BackupPack(pack_path(self.packs_dir))
+        ids = set(run["ids"])
+
+        def store(page: int, resp: requests.Response, items: List[Dict]):
+            if items:
+                pack.append(resp.content, f"rest_{collection}", url=resp.url, extension="json",
+                            page=page, count=len(items))
+            ids.update(item["id"] for item in items)
+            run["done"].append(page)
+            run["ids"] = sorted(ids)
+            self._save_state()
+
+        try:
+            if run["total_pages"] is None:
+                page, resp, items = self._page(collection, params, 1)
+                run["total"] = int(resp.headers.get("X-WP-Total", len(items)))
+                run["total_pages"] = int(resp.headers.get("X-WP-TotalPages", 1 if items else 0))
+                store(page, resp, items)
+            remaining = [p for p in range(1, run["total_pages"] + 1) if p not in run["done"]]
+            if remaining:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    futures = [pool.submit(self._page, collection, params, p) for p in remaining]
+                    try:
+                        for future in as_completed(futures):
+                            store(*future.result())
+                    except BaseException:
+                        for future in futures:
+                            future.cancel()  # pages restantes redemandées à la reprise
+                        raise
+        except (requests.RequestException, ValueError) as e:
+            self.log(f"Sauvegarde REST {collection} interrompue ({len(run['done'])}/{run['total_pages']} pages) : {e}")
+            return {"objects": len(ids), "pages": len(run["done"]), "complete": False, "cursor": state.get("cursor")}
+
+        complete = len(ids) >= run["total"]
+        if complete:
+            if run["next_cursor"] is not None:
+                state["cursor"] = run["next_cursor"]
+        else:
+            self.log(f"{collection} : {len(ids)} objets reçus sur {run['total']} annoncés (suppressions pendant "
+                     f"la sauvegarde ?), curseur inchangé")
+        state["pending"] = None
+        self._save_state()
+        return {"objects": len(ids), "pages": len(run["done"]), "complete": complete, "cursor": state.get("cursor")}
+
+    def run(self, collections: Iterable[str] = COLLECTIONS, full: bool = False) -> Dict[str, Dict]:
+        """Sauvegarde de chaque collection ; une collection en erreur n'arrête pas les suivantes"""
+        report = {}
+        for collection in collections:
+            try:
+                report[collection] = self.backup_collection(collection, full)
+            except (requests.RequestException, ValueError) as e:
+                self.log(f"Collection {collection} indisponible : {e}")
+                report[collection] = {"objects": 0, "pages": 0, "complete": False,
+                                      "cursor": self.state.get(collection, {}).get("cursor")}
+        return report
+
+
+def load_collection(packs_dir: Path, collection: str, at: Optional[str] = None) -> Dict[int, Dict]:
+    """Objets d'une collection tels que sauvegardés à la date `at` (ISO, défaut : dernière version)"""
+    entries = []
+    for path in sorted(Path(packs_dir).glob("backup_*.pack")):
+        pack = BackupPack(path)
+        entries += [(entry["timestamp"], pack, entry) for entry in pack.entries()
+                    if entry["type"] == f"rest_{collection}" and (at is None or entry["timestamp"] <= at)]
+    objects = {}
+    for _, pack, entry in sorted(entries, key=lambda item: item[0]):
+        for item in json.loads(pack.read(entry).decode('utf-8-sig')):
+            objects[item["id"]] = item
+    return objects
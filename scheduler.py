@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Planificateur adaptatif des vérifications (mode démon)
+
+· Un intervalle par tâche (disponibilité en minutes, SSL par jour...).
+· Gigue : chaque échéance est décalée aléatoirement de ±`jitter` (fraction
+  de l'intervalle) et la première est tirée dans l'intervalle, pour étaler
+  la charge d'une flotte au lieu de tout lancer à la même seconde.
+· Adaptation : une tâche qui signale un problème (résultat False) est
+  revérifiée plus vite (intervalle divisé par 2, jusqu'à `min_interval`) ;
+  une tâche qui lève une exception recule (intervalle doublé, jusqu'à
+  `max_interval`) ; un succès ramène à l'intervalle nominal.
+· Priorité : parmi les tâches dues, la plus prioritaire (valeur la plus
+  faible) part en premier.
+· Sommeil piloté par événement : le thread dort exactement jusqu'à la
+  prochaine échéance et est réveillé par `add()` / `stop()`.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class Job:
+    def __init__(self, name: str, fn: Callable[[], Optional[bool]], interval: float, priority: int = 10,
+                 jitter: float = 0.1, min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 run_now: bool = False):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.priority = priority
+        self.jitter = jitter
+        self.min_interval = min_interval if min_interval is not None else interval / 4
+        self.max_interval = max_interval if max_interval is not None else interval * 4
+        self.run_now = run_now
+        self.current = interval
+        self.failures = 0
+        self.errors = 0
+        self.runs = 0
+        self.running = False
+        self.last_run: Optional[float] = None
+
+
+class AdaptiveScheduler:
+    def __init__(self, max_workers: int = 4, log: Optional[Callable[[str, str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
+        self.log = log or (lambda message, level="INFO": None)
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sched")
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self.jobs: Dict[str, Job] = {}
+
+    def _jittered(self, job: Job, interval: float) -> float:
+        return max(0.0, interval * (1 + self.rng.uniform(-job.jitter, job.jitter)))
+
+    def _push(self, job: Job, due: float):
+        heapq.heappush(self._heap, (due, job.priority, next(self._seq), job))
+
+    def add(self, job: Job):
+        """Enregistre une tâche ; première échéance immédiate (run_now) ou tirée dans l'intervalle"""
+        with self._lock:
+            self.jobs[job.name] = job
+            first = 0.0 if job.run_now else self.rng.uniform(0, job.interval)
+            self._push(job, self.clock() + first)
+        self._wake.set()
+
+    def next_interval(self, job: Job, outcome: Optional[bool], error: bool) -> float:
+        """Intervalle avant la prochaine exécution selon le dernier résultat"""
+        if error:
+            job.errors += 1
+            job.current = min(job.max_interval, max(job.current, job.interval) * 2)
+        elif outcome is False:
+            job.failures += 1
+            job.current = max(job.min_interval, min(job.current, job.interval) / 2)
+        else:
+            job.failures = job.errors = 0
+            job.current = job.interval
+        return job.current
+
+    def _due_jobs(self, now: float) -> List[Job]:
+        # Appelé verrou pris : tâches dues, par priorité puis par ancienneté de l'échéance
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        due.sort(key=lambda entry: (entry[1], entry[0]))
+        return [entry[3] for entry in due]
+
+    def _run_job(self, job: Job):
+        outcome, error = None, False
+        started = self.clock()
+        try:
+            outcome = job.fn()
+        except Exception as e:
+            error = True
+            self.log(f"Tâche planifiée {job.name} en erreur: {e}", "ERROR")
+        finally:
+            job.runs += 1
+            job.last_run = started
+            with self._lock:
+                interval = self.next_interval(job, outcome, error)
+                job.running = False
+                if not self._stopped:
+                    self._push(job, self.clock() + self._jittered(job, interval))
+            self._wake.set()
+        if interval != job.interval:
+            self.log(f"Tâche {job.name}: prochaine exécution dans {interval:.0f} s "
+                     f"({'erreur' if error else 'problème détecté'})", "INFO")
+
+    def run_pending(self) -> float:
+        """Lance les tâches dues ; renvoie le délai jusqu'à la prochaine échéance"""
+        with self._lock:
+            for job in self._due_jobs(self.clock()):
+                if job.running:
+                    continue  # déjà en cours : reprogrammée à la fin de l'exécution
+                job.running = True
+                self._pool.submit(self._run_job, job)
+            if not self._heap:
+                return 3600.0
+            return max(0.0, self._heap[0][0] - self.clock())
+
+    def run_forever(self):
+        """Boucle principale : dort jusqu'à la prochaine échéance ou un réveil"""
+        while not self._stopped:
+            delay = self.run_pending()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def stop(self, wait: bool = True):
+        self._stopped = True
+        self._wake.set()
+        self._pool.shutdown(wait=wait)
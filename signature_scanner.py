@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Détection de code malveillant par base de signatures
+
+Les signatures sont lues dans un fichier JSON (liste de
+{id, pattern, description, severity[, literal]}) et compilées une seule fois
+en un automate combiné :
+
+· préfiltre Aho-Corasick sur un littéral obligatoire de chaque signature
+  (champ `literal`, sinon extrait du motif) : un seul passage sur le texte,
+  dont le coût ne dépend pas du nombre de signatures ;
+· confirmation par l'expression régulière de la signature, uniquement autour
+  des occurrences du littéral ; les fenêtres de confirmation d'une même
+  signature qui se chevauchent sont fusionnées, pour qu'un littéral
+  fréquent ne fasse pas relire le même texte à la regex (chaque caractère
+  est relu au plus une fois par signature) ;
+· les rares signatures sans littéral exploitable sont regroupées dans une
+  seule alternance, elle aussi parcourue une seule fois.
+
+La recherche est insensible à la casse (ASCII). Le module `ahocorasick`
+(pyahocorasick) est utilisé s'il est installé, sinon un automate en Python pur.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+MIN_LITERAL = 3
+CONTEXT_BEFORE = 256   # la confirmation peut commencer jusqu'à N caractères avant le littéral
+CONTEXT_AFTER = 2048   # ... et doit se terminer au plus N caractères après
+MAX_SAMPLES = 3
+
+# Minuscules ASCII uniquement : les positions du texte d'origine sont conservées
+_ASCII_LOWER = {c: c + 32 for c in range(ord('A'), ord('Z') + 1)}
+
+DEFAULT_SIGNATURES = [
+    {"id": "php-eval", "pattern": r"eval\s*\(", "description": "eval() potentiellement dangereux", "severity": "high"},
+    {"id": "php-base64-decode", "pattern": r"base64_decode\s*\(", "description": "Décodage base64 suspect",
+     "severity": "medium"},
+    {"id": "php-exec", "pattern": r"exec\s*\(", "description": "Appel exec()", "severity": "high"},
+]
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """Plus longue suite de caractères littéraux présente dans toute correspondance.
+
+    Heuristique prudente : seuls les caractères hors groupe sont retenus, et
+    un motif contenant une alternative au premier niveau n'a pas de littéral.
+    """
+    runs, run = [], ""
+    depth, i = 0, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            if depth == 0 and not nxt.isalnum():
+                run += nxt
+            else:
+                runs.append(run)
+                run = ""
+            i += {'x': 4, 'u': 6, 'U': 10}.get(nxt, 2)
+            continue
+        if c == '[':
+            # classe de caractères : on la saute entièrement
+            runs.append(run)
+            run = ""
+            i += 1
+            if i < len(pattern) and pattern[i] == '^':
+                i += 1
+            if i < len(pattern) and pattern[i] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+            continue
+        if c in '?*{':
+            # le caractère précédent devient optionnel
+            runs.append(run[:-1])
+            run = ""
+            if c == '{':
+                i = pattern.find('}', i) if '}' in pattern[i:] else len(pattern)
+        elif c == '+':
+            runs.append(run)
+            run = ""
+        elif c == '(':
+            depth += 1
+            runs.append(run)
+            run = ""
+        elif c == ')':
+            depth -= 1
+        elif c == '|':
+            if depth == 0:
+                return None
+        elif c in '.^$':
+            runs.append(run)
+            run = ""
+        elif depth == 0:
+            run += c
+        i += 1
+    runs.append(run)
+    best = max(runs, key=len)
+    return best.translate(_ASCII_LOWER) if len(best) >= MIN_LITERAL else None
+
+
+def _scoped(pattern: str) -> str:
+    # Dans l'alternance combinée, un drapeau global "(?s)..." devient local "(?s:...)"
+    flags = re.match(r"\(\?([imsx]+)\)", pattern)
+    return f"(?{flags.group(1)}:{pattern[flags.end():]})" if flags else pattern
+
+
+class _Automaton:
+    """Aho-Corasick en Python pur (mêmes entrées/sorties que pyahocorasick)"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List] = [[]]
+
+    def add_word(self, word: str, value):
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(value)
+
+    def make_automaton(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, object]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for value in out[state]:
+                    yield pos, value
+
+
+class Signature:
+    __slots__ = ("id", "pattern", "description", "severity", "literal", "regex")
+
+    def __init__(self, entry: Dict):
+        self.id = entry["id"]
+        self.pattern = entry["pattern"]
+        self.description = entry.get("description", self.id)
+        self.severity = entry.get("severity", "medium")
+        literal = entry.get("literal") or required_literal(self.pattern)
+        self.literal = literal.translate(_ASCII_LOWER) if literal else None
+        self.regex = re.compile(self.pattern, re.IGNORECASE)
+
+
+class SignatureScanner:
+    def __init__(self, signatures: List[Dict]):
+        self.signatures = [Signature(entry) for entry in signatures]
+        self._by_literal: Dict[str, List[Signature]] = {}
+        unanchored: List[Signature] = []
+        for sig in self.signatures:
+            if sig.literal:
+                self._by_literal.setdefault(sig.literal, []).append(sig)
+            else:
+                unanchored.append(sig)
+
+        self._automaton = None
+        if self._by_literal:
+            self._automaton = ahocorasick.Automaton() if ahocorasick is not None else _Automaton()
+            for literal in self._by_literal:
+                self._automaton.add_word(literal, literal)
+            self._automaton.make_automaton()
+
+        # Signatures sans littéral : une seule alternance, groupes nommés _s0, _s1...
+        self._unanchored = {f"_s{i}": sig for i, sig in enumerate(unanchored)}
+        self._combined = None
+        if unanchored:
+            self._combined = re.compile(
+                "|".join(f"(?P<{name}>{_scoped(sig.pattern)})" for name, sig in self._unanchored.items()),
+                re.IGNORECASE)
+
+    @classmethod
+    def from_file(cls, path: Optional[Path]) -> "SignatureScanner":
+        """Charge la base JSON ; signatures par défaut si le fichier est absent"""
+        if path is None or not Path(path).exists():
+            return cls(DEFAULT_SIGNATURES)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["signatures"] if isinstance(data, dict) else data)
+
+    def scan(self, text: str) -> List[Dict]:
+        """Signatures présentes dans `text` : [{id, description, severity, count, matches}]"""
+        found: Dict[str, Dict] = {}
+
+        def record(sig: Signature, match):
+            hit = found.setdefault(sig.id, {"id": sig.id, "pattern": sig.pattern, "description": sig.description,
+                                            "severity": sig.severity, "count": 0, "matches": []})
+            hit["count"] += 1
+            if len(hit["matches"]) < MAX_SAMPLES:
+                sample = match.group(0)
+                hit["matches"].append(sample[:50] + '...' if len(sample) > 50 else sample)
+
+        if self._automaton is not None:
+            lowered = text.translate(_ASCII_LOWER)
+            # Fenêtres [début, fin[ autour des occurrences, fusionnées par signature
+            # (les occurrences d'un même littéral arrivent dans l'ordre du texte)
+            windows: Dict[Signature, List[List[int]]] = {}
+            for end, literal in self._automaton.iter(lowered):
+                start = end - len(literal) + 1
+                lo, hi = max(0, start - CONTEXT_BEFORE), min(len(text), end + 1 + CONTEXT_AFTER)
+                for sig in self._by_literal[literal]:
+                    spans = windows.setdefault(sig, [])
+                    if spans and lo <= spans[-1][1]:
+                        spans[-1][1] = hi
+                    else:
+                        spans.append([lo, hi])
+            for sig, spans in windows.items():
+                for lo, hi in spans:
+                    for match in sig.regex.finditer(text, lo, hi):
+                        record(sig, match)
+
+        if self._combined is not None:
+            for match in self._combined.finditer(text):
+                record(self._unanchored[match.lastgroup], match)
+
+        return list(found.values())
+
+    def scan_all(self, bodies: Dict[str, str]) -> List[Dict]:
+        """Analyse plusieurs contenus ({nom: texte}) ; chaque résultat porte son `endpoint`"""
+        results = []
+        for name, text in bodies.items():
+            for hit in self.scan(text):
+                hit["endpoint"] = name
+                results.append(hit)
+        return results
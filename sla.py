@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Disponibilité, latences et MTTR calculés sur les mesures structurées (NumPy)
+
+Remplace le comptage de mots-clés dans les logs (« accessible » est contenu
+dans « inaccessible ») par des calculs vectorisés sur les enregistrements
+de timeseries.py, pour une fenêtre quelconque et par site :
+
+· disponibilité pondérée par le temps : chaque mesure vaut jusqu'à la
+  suivante (au plus `max_gap` secondes), ce qui neutralise l'accélération
+  des sondes pendant une panne (planificateur adaptatif) ;
+· p50 / p95 / p99 du temps de réponse des mesures réussies ;
+· pannes (passage ok -> ko), durée d'indisponibilité et MTTR (moyenne des
+  durées ko -> premier ok suivant ; une panne non résolue n'y entre pas).
+
+Les segments bruts sont lus directement en tableaux structurés
+(numpy.frombuffer), sans boucle Python par mesure.
+
+Les mesures brutes ne sont conservées que TIMESERIES_RAW_DAYS jours : pour
+la partie de la fenêtre qui les précède, `site_sla` complète disponibilité,
+indisponibilité et nombre de mesures avec les agrégats horaires puis
+journaliers (chaque agrégat pèse la durée de son pas, au prorata de ses
+succès). Percentiles, pannes et MTTR ne sont calculés que sur les mesures
+brutes : `detailed_from` indique depuis quand, `covered_from` la première
+donnée de la fenêtre.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from timeseries import TimeSeriesStore
+
+RAW_DTYPE = np.dtype([("ts", "<u4"), ("site", "<u2"), ("check", "u1"), ("ok", "u1"),
+                      ("status", "<u2"), ("value", "<f4")])
+
+ROLLUP_DTYPE = np.dtype([("ts", "<u4"), ("site", "<u2"), ("check", "u1"), ("pad", "u1"), ("count", "<u4"),
+                         ("ok", "<u4"), ("n_value", "<u4"), ("sum", "<f4"), ("min", "<f4"), ("max", "<f4")])
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_records(store: TimeSeriesStore, start: float, end: float, check: str = "availability",
+                 resolution: str = "raw") -> np.ndarray:
+    """Enregistrements de `check` sur [start, end[ en tableau structuré (RAW_DTYPE ou ROLLUP_DTYPE)"""
+    dtype = RAW_DTYPE if resolution == "raw" else ROLLUP_DTYPE
+    check_id = store.series_id("checks", check)
+    if check_id is None:
+        return np.empty(0, dtype)
+    chunks = []
+    for path in store.segments(resolution, start, end):
+        data = path.read_bytes()
+        chunks.append(np.frombuffer(data, dtype, count=len(data) // dtype.itemsize))
+    if not chunks:
+        return np.empty(0, dtype)
+    records = np.concatenate(chunks)
+    return records[(records["check"] == check_id) & (records["ts"] >= start) & (records["ts"] < end)]
+
+
+def load_raw(store: TimeSeriesStore, start: float, end: float, check: str = "availability") -> np.ndarray:
+    """Mesures brutes de `check` sur [start, end[ en tableau structuré (RAW_DTYPE)"""
+    return load_records(store, start, end, check)
+
+
+def availability_stats(ts: np.ndarray, site: np.ndarray, ok: np.ndarray, latency: np.ndarray,
+                       end: float, max_gap: Optional[float] = None) -> Dict[int, Dict]:
+    """Statistiques par site (identifiant) des mesures de disponibilité.
+
+    `end` borne la durée de la dernière mesure de chaque site ; `max_gap`
+    (défaut : 2 × l'écart médian entre mesures) évite qu'une interruption
+    de la surveillance compte comme disponibilité ou comme panne.
+    Renvoie {site: {samples, uptime, downtime, duration, p50, p95, p99,
+    outages, open_outages, mttr}} (uptime en %, durées en secondes ;
+    `duration` : temps couvert par les mesures).
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    if ts.size == 0:
+        return {}
+    site = np.asarray(site)
+    ok = np.asarray(ok).astype(bool, copy=False)
+    latency = np.asarray(latency, dtype=np.float32)
+
+    # Regroupement par site ; les mesures sont déjà chronologiques (ajout seul),
+    # un tri stable sur l'identifiant suffit alors
+    order = np.argsort(site, kind="stable") if np.all(ts[1:] >= ts[:-1]) else np.lexsort((ts, site))
+    ts, site, ok, latency = ts[order], site[order], ok[order], latency[order]
+    n = ts.size
+    new_site = np.empty(n, dtype=bool)
+    new_site[0] = True
+    new_site[1:] = site[1:] != site[:-1]
+    starts = np.flatnonzero(new_site)
+    ends = np.append(starts[1:], n)
+
+    # Durée de validité de chaque mesure
+    following = np.empty(n, dtype=np.int64)
+    following[:-1] = ts[1:]
+    following[ends - 1] = int(end)
+    duration = following - ts
+    np.clip(duration, 0, None, out=duration)
+    if max_gap is None:
+        gaps = duration[::max(1, n // 100_000)]  # échantillon : la médiane n'a pas besoin de tout
+        gaps = gaps[gaps > 0]
+        max_gap = 2 * int(np.median(gaps)) if gaps.size else 0
+    np.minimum(duration, int(max_gap), out=duration)
+    total = np.add.reduceat(duration, starts)
+    up = np.add.reduceat(np.where(ok, duration, 0), starts)
+
+    # Pannes : début = premier ko après un ok (ou en début de série),
+    # fin = premier ok suivant du même site
+    down = ~ok
+    prev_down = np.empty(n, dtype=bool)
+    prev_down[0] = False
+    prev_down[1:] = down[:-1]
+    prev_down[starts] = False
+    outage_start = np.flatnonzero(down & ~prev_down)
+    recovery = np.flatnonzero(ok & prev_down)
+    if recovery.size:
+        nearest = recovery[np.minimum(np.searchsorted(recovery, outage_start), recovery.size - 1)]
+        resolved = (nearest > outage_start) & (site[nearest] == site[outage_start])
+    else:
+        nearest = outage_start
+        resolved = np.zeros(outage_start.size, dtype=bool)
+    groups = starts.size
+    outage_group = np.searchsorted(starts, outage_start, side="right") - 1
+    outages = np.bincount(outage_group, minlength=groups)
+    repaired = np.bincount(outage_group[resolved], minlength=groups)
+    repair_time = np.bincount(outage_group[resolved],
+                              weights=ts[nearest[resolved]] - ts[outage_start[resolved]], minlength=groups)
+
+    stats = {}
+    measured = ok & np.isfinite(latency)
+    for g, (a, b) in enumerate(zip(starts, ends)):
+        values = latency[a:b][measured[a:b]]
+        percentiles = np.percentile(values, PERCENTILES) if values.size else [None] * len(PERCENTILES)
+        stats[int(site[a])] = {
+            "samples": int(b - a),
+            "uptime": float(100 * up[g] / total[g]) if total[g] else None,
+            "downtime": float(total[g] - up[g]),
+            "duration": float(total[g]),
+            **{f"p{p}": (float(v) if v is not None else None) for p, v in zip(PERCENTILES, percentiles)},
+            "outages": int(outages[g]),
+            "open_outages": int(outages[g] - repaired[g]),
+            "mttr": float(repair_time[g] / repaired[g]) if repaired[g] else None,
+        }
+    return stats
+
+
+def first_by_site(site: np.ndarray, ts: np.ndarray) -> Dict[int, float]:
+    """Premier horodatage de chaque site"""
+    sites, index = np.unique(site, return_inverse=True)
+    first = np.full(sites.size, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, index, ts.astype(np.int64))
+    return dict(zip(sites.tolist(), first.astype(float).tolist()))
+
+
+def merge_rollups(stats: Dict[int, Dict], rollups: np.ndarray, step: int):
+    """Ajoute aux statistiques par site la disponibilité d'agrégats (horaires ou journaliers) plus anciens"""
+    if rollups.size == 0:
+        return
+    sites, index = np.unique(rollups["site"], return_inverse=True)
+    count = rollups["count"].astype(np.float64)
+    samples = np.bincount(index, weights=count, minlength=sites.size)
+    up = np.bincount(index, weights=step * rollups["ok"] / np.maximum(count, 1), minlength=sites.size)
+    total = np.bincount(index, weights=np.where(count > 0, step, 0), minlength=sites.size)
+    first = first_by_site(rollups["site"], rollups["ts"])
+    for i, site_id in enumerate(sites.tolist()):
+        s = stats.setdefault(site_id, {"samples": 0, "uptime": None, "downtime": 0.0, "duration": 0.0,
+                                       **{f"p{p}": None for p in PERCENTILES},
+                                       "outages": 0, "open_outages": 0, "mttr": None})
+        site_up = (s["duration"] - s["downtime"]) + up[i]
+        s["samples"] += int(samples[i])
+        s["duration"] += float(total[i])
+        s["downtime"] = float(s["duration"] - site_up)
+        s["uptime"] = float(100 * site_up / s["duration"]) if s["duration"] else None
+        s["covered_from"] = min(s.get("covered_from", first[site_id]), first[site_id])
+
+
+def site_sla(store: TimeSeriesStore, start: float, end: float, max_gap: Optional[float] = None) -> Dict[str, Dict]:
+    """Statistiques de disponibilité par URL de site sur [start, end[.
+
+    Mesures brutes là où elles sont conservées, agrégats horaires puis
+    journaliers avant ; chaque site indique `covered_from` (première donnée)
+    et `detailed_from` (début des mesures brutes : percentiles, pannes, MTTR).
+    """
+    raw_from = max(start, store.first_ts("raw") or end)
+    records = load_raw(store, raw_from, end)
+    stats = availability_stats(records["ts"], records["site"], records["ok"], records["value"], end, max_gap)
+    for site_id, first in first_by_site(records["site"], records["ts"]).items():
+        stats[site_id]["covered_from"] = first
+    if raw_from > start:
+        hour_from = max(start, min(store.first_ts("hour") or raw_from, raw_from))
+        merge_rollups(stats, load_records(store, hour_from, raw_from, resolution="hour"), 3600)
+        merge_rollups(stats, load_records(store, start, hour_from, resolution="day"), 86400)
+    for values in stats.values():
+        values["detailed_from"] = float(raw_from)
+    return {store.site_name(site_id): values for site_id, values in stats.items()}
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Catalogue des sauvegardes (SQLite) : snapshots de monitor.py et packs de backup_script.py
+
+Une ligne par contenu sauvegardé, indexée par (site, endpoint, date) :
+hash sha256, taille et emplacement (manifeste de snapshot_store, ou pack +
+offset / longueur / codec). Les questions courantes deviennent des
+recherches indexées au lieu de parcours de répertoires :
+
+· `manifest_at(site, T)` / `as_of(site, T)` : état sauvegardé à la date T
+  (snapshot complet le plus récent <= T, et dernière version de chaque
+  endpoint des packs) ;
+· `history(site, endpoint)` : versions successives d'un fichier / endpoint ;
+· `restore_packs(site, T, dossier)` : pages et collections REST telles
+  qu'elles étaient à la date T.
+
+Synchronisation incrémentale (`sync`) : un manifeste déjà catalogué n'est
+pas relu, un pack dont la taille et la date de modification n'ont pas
+changé non plus ; seules les nouvelles entrées d'un pack sont ajoutées.
+Les manifestes supprimés (rétention) disparaissent du catalogue.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from urllib.parse import urlsplit
+
+from backup_pack import BackupPack
+from snapshot_store import SnapshotStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    location TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    site TEXT,
+    ts REAL,
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    location TEXT NOT NULL,
+    offset INTEGER,
+    length INTEGER,
+    codec TEXT,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS endpoints (
+    site TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    PRIMARY KEY (site, kind, endpoint)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_site_endpoint_ts ON entries (site, endpoint, ts);
+CREATE INDEX IF NOT EXISTS idx_entries_location ON entries (location);
+CREATE INDEX IF NOT EXISTS idx_sources_site_ts ON sources (kind, site, ts);
+"""
+
+COLUMNS = "site, endpoint, ts, timestamp, hash, size, kind, location, offset, length, codec, meta"
+PACK_FIELDS = {"type", "timestamp", "hash", "size", "codec", "length", "offset"}
+
+When = Union[None, str, float, datetime]
+
+
+def site_key(url: Optional[str]) -> str:
+    """Origine (schéma://hôte) d'une URL : même clé pour un site et ses endpoints"""
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower() if parts.netloc else url
+
+
+def _epoch(when: When) -> float:
+    """Date ISO (naïve = heure locale), datetime ou epoch -> epoch ; None = maintenant"""
+    if when is None:
+        return datetime.now().timestamp()
+    if isinstance(when, datetime):
+        return when.timestamp()
+    if isinstance(when, str):
+        return datetime.fromisoformat(when.replace('Z', '+00:00')).timestamp()
+    return float(when)
+
+
+class SnapshotCatalog:
+    def __init__(self, root: Path, db_file: Optional[Path] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_file = Path(db_file) if db_file else self.root / "catalog.db"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _location(self, path: Path) -> str:
+        # Emplacements relatifs à la racine : le dossier de sauvegarde peut être déplacé
+        try:
+            return Path(path).relative_to(self.root).as_posix()
+        except ValueError:
+            return str(path)
+
+    def path(self, location: str) -> Path:
+        return self.root / location
+
+    def _insert(self, rows: List[tuple]):
+        self._conn.executemany(f"INSERT INTO entries ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._conn.executemany("INSERT OR IGNORE INTO endpoints VALUES (?, ?, ?)",
+                               {(row[0], row[1], row[6]) for row in rows})
+
+    def _forget(self, location: str):
+        self._conn.execute("DELETE FROM entries WHERE location = ?", (location,))
+        self._conn.execute("DELETE FROM sources WHERE location = ?", (location,))
+
+    # --- Synchronisation ---
+    def sync_snapshots(self, store: SnapshotStore, site: str) -> int:
+        """Catalogue les nouveaux manifestes de `store` ; renvoie le nombre de lignes ajoutées"""
+        added = 0
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT location FROM sources WHERE kind = 'snapshot'")}
+            on_disk = {self._location(m): m for m in store.list_snapshots()}
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for location in known - set(on_disk):
+                    self._forget(location)  # manifeste supprimé par la rétention
+                for location, manifest_path in on_disk.items():
+                    if location in known:
+                        continue
+                    manifest = store.load_manifest(manifest_path)
+                    key = site_key(manifest.get("site") or site)
+                    created = manifest["created"]
+                    ts = _epoch(created)
+                    store_root = self._location(store.root)
+                    self._insert([(key, name, ts, created, info["hash"], info["size"], "snapshot", location,
+                                   None, None, None, json.dumps({"store": store_root}))
+                                  for name, info in manifest["files"].items()])
+                    st = manifest_path.stat()
+                    self._conn.execute("INSERT INTO sources VALUES (?, 'snapshot', ?, ?, ?, ?, ?)",
+                                       (location, key, ts, len(manifest["files"]), st.st_size, st.st_mtime_ns))
+                    added += len(manifest["files"])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def sync_packs(self, packs_dir: Path, site: Optional[str] = None) -> int:
+        """Catalogue les nouvelles entrées des packs de `packs_dir` ; renvoie le nombre de lignes ajoutées"""
+        added = 0
+        with self._lock:
+            known = {row["location"]: row for row in self._conn.execute("SELECT * FROM sources WHERE kind = 'pack'")}
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for pack_file in sorted(Path(packs_dir).glob("backup_*.pack")):
+                    location, st = self._location(pack_file), pack_file.stat()
+                    row = known.get(location)
+                    if row is not None and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns:
+                        continue
+                    entries = BackupPack(pack_file).entries()
+                    start = row["entries"] if row is not None else 0
+                    if start > len(entries):  # pack réécrit : tout recataloguer
+                        self._forget(location)
+                        start = 0
+                    self._insert([(site_key(e.get("url") or site), e["type"], _epoch(e["timestamp"]), e["timestamp"],
+                                   e["hash"], e["size"], "pack", location, e["offset"], e["length"], e["codec"],
+                                   json.dumps({k: v for k, v in e.items() if k not in PACK_FIELDS},
+                                              ensure_ascii=False))
+                                  for e in entries[start:]])
+                    self._conn.execute("INSERT OR REPLACE INTO sources VALUES (?, 'pack', NULL, NULL, ?, ?, ?)",
+                                       (location, len(entries), st.st_size, st.st_mtime_ns))
+                    added += len(entries) - start
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def sync(self, store: Optional[SnapshotStore] = None, packs_dir: Optional[Path] = None,
+             site: Optional[str] = None) -> int:
+        """Synchronise snapshots et packs ; renvoie le nombre de lignes ajoutées"""
+        added = 0
+        if store is not None:
+            added += self.sync_snapshots(store, site)
+        if packs_dir is not None and Path(packs_dir).exists():
+            added += self.sync_packs(packs_dir, site)
+        return added
+
+    # --- Recherches ---
+    def _rows(self, sql: str, params: tuple) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            entry = dict(row)
+            entry["meta"] = json.loads(entry["meta"]) if entry["meta"] else {}
+            result.append(entry)
+        return result
+
+    def manifest_at(self, site: str, at: When = None) -> Optional[Path]:
+        """Manifeste du dernier snapshot de `site` pris au plus tard à la date `at`"""
+        with self._lock:
+            row = self._conn.execute("SELECT location FROM sources WHERE kind = 'snapshot' AND site = ? AND ts <= ? "
+                                     "ORDER BY ts DESC LIMIT 1", (site_key(site), _epoch(at))).fetchone()
+        return self.path(row[0]) if row else None
+
+    def as_of(self, site: str, at: When = None) -> List[Dict]:
+        """Contenus sauvegardés à la date `at` : fichiers du snapshot et dernière entrée de chaque endpoint des packs"""
+        key, ts = site_key(site), _epoch(at)
+        manifest = self.manifest_at(site, at)
+        rows = []
+        if manifest is not None:
+            rows += self._rows(f"SELECT {COLUMNS} FROM entries WHERE location = ? ORDER BY endpoint",
+                               (self._location(manifest),))
+        # Une recherche indexée par endpoint : dernière entrée <= at
+        rows += self._rows(
+            f"SELECT {', '.join('e.' + c for c in COLUMNS.split(', '))} FROM endpoints p JOIN entries e ON e.id = "
+            f"(SELECT id FROM entries WHERE site = p.site AND endpoint = p.endpoint AND kind = 'pack' AND ts <= ? "
+            f"ORDER BY ts DESC LIMIT 1) WHERE p.site = ? AND p.kind = 'pack' ORDER BY p.endpoint", (ts, key))
+        return rows
+
+    def history(self, site: str, endpoint: str, start: When = 0.0, end: When = None,
+                changed_only: bool = False) -> List[Dict]:
+        """Versions successives d'un fichier (snapshots) ou endpoint (packs), des plus anciennes aux plus récentes.
+
+        `changed_only` : seules les lignes dont le contenu diffère de la précédente.
+        """
+        rows = self._rows(f"SELECT {COLUMNS} FROM entries WHERE site = ? AND endpoint = ? AND ts >= ? AND ts <= ? "
+                          f"ORDER BY ts", (site_key(site), endpoint, _epoch(start), _epoch(end)))
+        if changed_only:
+            rows = [row for i, row in enumerate(rows) if i == 0 or row["hash"] != rows[i - 1]["hash"]]
+        return rows
+
+    def endpoints(self, site: str) -> List[str]:
+        """Fichiers et endpoints déjà catalogués pour `site`"""
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT endpoint FROM endpoints WHERE site = ? "
+                                                     "ORDER BY endpoint", (site_key(site),))]
+
+    def read(self, entry: Dict) -> bytes:
+        """Contenu d'une ligne du catalogue (hash vérifié)"""
+        if entry["kind"] == "pack":
+            return BackupPack(self.path(entry["location"])).read(dict(entry, type=entry["endpoint"]))
+        store = SnapshotStore(self.path(entry["meta"].get("store", ".")))
+        data = store.object_path(entry["hash"]).read_bytes()
+        if hashlib.sha256(data).hexdigest() != entry["hash"]:
+            raise ValueError(f"Hash invalide pour {entry['endpoint']} @ {entry['timestamp']}")
+        return data
+
+    # --- Restauration ---
+    def restore_packs(self, site: str, at: When, target_dir: Path) -> Dict[str, List]:
+        """Écrit les contenus des packs tels qu'à la date `at` dans `target_dir`.
+
+        Pages et flux : dernière version de chaque type (<type>.<extension>) ;
+        collections REST (rest_*) : objets fusionnés de toutes les sauvegardes
+        <= `at`, dernière version de chaque objet (<type>.json).
+        """
+        target_dir = Path(target_dir)
+        report: Dict[str, List] = {"restored": [], "errors": []}
+        for entry in self.as_of(site, at):
+            if entry["kind"] != "pack":
+                continue
+            name = entry["endpoint"]
+            try:
+                if name.startswith("rest_"):
+                    objects = {}
+                    for version in self.history(site, name, end=at):
+                        for item in json.loads(self.read(version).decode('utf-8-sig')):
+                            objects[item["id"]] = item
+                    filename = f"{name}.json"
+                    data = json.dumps([objects[k] for k in sorted(objects)], ensure_ascii=False).encode('utf-8')
+                else:
+                    filename = f"{name}.{entry['meta'].get('extension', 'html')}"
+                    data = self.read(entry)
+                target_dir.mkdir(parents=True, exist_ok=True)
+                tmp = target_dir / (filename + ".tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, target_dir / filename)
+                report["restored"].append(filename)
+            except (OSError, ValueError) as e:
+                report["errors"].append((name, str(e)))
+        return report
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Snapshots dédupliqués par contenu (stockage adressé par sha256)
+
+Organisation sous la racine de sauvegarde :
+· objects/ab/abcdef...  : contenu brut, nommé par le sha256 de ses octets
+· snapshots/snapshot_<horodatage>.json : manifeste {fichier: hash, taille, mtime}
+
+Un fichier inchangé depuis le snapshot précédent (même taille et même mtime)
+réutilise son hash sans être relu ni copié ; un fichier modifié est haché
+pendant sa copie, en une seule passe sur ses octets, et n'est stocké que si
+son contenu n'existe pas déjà.
+
+Les bases SQLite (en-tête « SQLite format 3 ») sont copiées par l'API de
+sauvegarde de sqlite3 (Connection.backup) : copie cohérente même pendant
+une écriture, journal WAL inclus. Elles sont donc relues à chaque snapshot
+(leur fichier principal ne change pas tant que le WAL n'est pas reporté) ;
+les fichiers -wal, -shm et -journal ne sont pas sauvegardés.
+
+Un objet est écrit avant le manifeste qui le référence : snapshot() et
+prune() passent par un verrou sur la racine (store.lock, fcntl ; partagé
+pour les snapshots, exclusif pour le nettoyage), pour qu'un nettoyage
+lancé par un autre processus (--backup planifié à côté du démon) ne
+supprime pas les objets d'un snapshot en cours.
+
+La restauration suit le même principe, en parallèle sur un pool de threads :
+fichier de destination déjà conforme au manifeste -> ignoré ; sinon copie
+par blocs hachée au passage vers un fichier temporaire, remplacé
+atomiquement une fois le hash vérifié.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : ne pas lancer sauvegarde et nettoyage en même temps
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+SQLITE_HEADER = b"SQLite format 3\x00"
+SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+
+
+def hash_file(path: Path) -> Tuple[str, int]:
+    """sha256 et taille d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def is_sqlite(path: Path) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+
+class SnapshotStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.snapshots_dir = self.root / "snapshots"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with open(self.root / "store.lock", 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def put_file(self, path: Path) -> Tuple[str, int, bool]:
+        """Copie `path` dans le magasin en le hachant au passage.
+
+        Renvoie (hash, taille, nouvel_objet). Si le contenu existe déjà, la
+        copie temporaire est simplement supprimée.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.objects_dir, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, 'wb') as out, open(path, 'rb') as src:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            hexdigest = digest.hexdigest()
+            target = self.object_path(hexdigest)
+            if target.exists():
+                os.unlink(tmp_name)
+                return hexdigest, size, False
+            target.parent.mkdir(exist_ok=True)
+            os.replace(tmp_name, target)
+            return hexdigest, size, True
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def put_sqlite(self, path: Path) -> Tuple[str, int, bool]:
+        """Comme put_file, à partir d'une copie cohérente de la base SQLite `path`"""
+        fd, tmp_name = tempfile.mkstemp(dir=self.objects_dir, prefix=".tmp_", suffix=".db")
+        os.close(fd)
+        try:
+            source = sqlite3.connect(path, timeout=30)
+            try:
+                copy = sqlite3.connect(tmp_name)
+                try:
+                    source.backup(copy)
+                finally:
+                    copy.close()
+            finally:
+                source.close()
+            return self.put_file(Path(tmp_name))
+        finally:
+            os.unlink(tmp_name)
+
+    def list_snapshots(self) -> List[Path]:
+        """Manifestes du plus ancien au plus récent"""
+        return sorted(self.snapshots_dir.glob("snapshot_*.json"))
+
+    def load_manifest(self, manifest: Path) -> Dict:
+        with open(manifest, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def latest(self) -> Optional[Path]:
+        snapshots = self.list_snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def snapshot(self, source_dir: Path, site: Optional[str] = None) -> Tuple[Path, Dict]:
+        """Crée un snapshot de `source_dir` (récursif) et renvoie (manifeste, statistiques).
+
+        `site` (URL du site sauvegardé) est noté dans le manifeste pour le catalogue.
+        """
+        with self._locked(exclusive=False):
+            return self._snapshot(Path(source_dir), site)
+
+    def _snapshot(self, source_dir: Path, site: Optional[str]) -> Tuple[Path, Dict]:
+        previous = {}
+        latest = self.latest()
+        if latest is not None:
+            previous = self.load_manifest(latest).get("files", {})
+
+        files: Dict[str, Dict] = {}
+        stats = {"files": 0, "reused": 0, "stored": 0, "bytes_stored": 0, "errors": []}
+        for path in self._iter_files(source_dir):
+            name = path.relative_to(source_dir).as_posix()
+            try:
+                st = path.stat()
+                prev = previous.get(name)
+                if is_sqlite(path):
+                    digest, size, new = self.put_sqlite(path)
+                elif (prev and prev["size"] == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns
+                        and self.object_path(prev["hash"]).exists()):
+                    digest, size, new = prev["hash"], prev["size"], False
+                else:
+                    digest, size, new = self.put_file(path)
+                if new:
+                    stats["stored"] += 1
+                    stats["bytes_stored"] += size
+                else:
+                    stats["reused"] += 1
+                files[name] = {
+                    "hash": digest,
+                    "size": size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "timestamp": datetime.fromtimestamp(st.st_mtime).isoformat(),
+                }
+                stats["files"] += 1
+            except (OSError, sqlite3.Error) as e:
+                stats["errors"].append((name, str(e)))
+
+        created = datetime.now()
+        manifest = self.snapshots_dir / f"snapshot_{created.strftime('%Y%m%d_%H%M%S_%f')}.json"
+        tmp = manifest.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            data = {"created": created.isoformat(), "source": str(source_dir), "files": files}
+            if site:
+                data["site"] = site
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, manifest)
+        return manifest, stats
+
+    def _iter_files(self, source_dir: Path) -> Iterator[Path]:
+        root = self.root.resolve()
+        for path in sorted(source_dir.rglob("*")):
+            if not path.is_file() or path.suffix == ".tmp" or path.name.endswith(SQLITE_SIDECARS):
+                continue
+            resolved = path.resolve()
+            if resolved == root or root in resolved.parents:
+                continue
+            yield path
+
+    def prune(self, max_age_days: int) -> Tuple[int, int]:
+        """Supprime les manifestes trop anciens puis les objets non référencés.
+
+        Le snapshot le plus récent est toujours conservé. Renvoie
+        (manifestes supprimés, objets supprimés).
+        """
+        with self._locked(exclusive=True):
+            return self._prune(max_age_days)
+
+    def _prune(self, max_age_days: int) -> Tuple[int, int]:
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        snapshots = self.list_snapshots()
+        removed = 0
+        for manifest in snapshots[:-1]:
+            if datetime.fromtimestamp(manifest.stat().st_mtime) < cutoff:
+                manifest.unlink()
+                removed += 1
+
+        referenced = set()
+        for manifest in self.list_snapshots():
+            referenced.update(info["hash"] for info in self.load_manifest(manifest)["files"].values())
+        orphans = 0
+        for obj in self.objects_dir.glob("??/*"):
+            if obj.name not in referenced:
+                obj.unlink()
+                orphans += 1
+        return removed, orphans
+
+    def restore_file(self, name: str, info: Dict, target_dir: Path) -> str:
+        """Restaure un fichier du manifeste ; renvoie "restored", "skipped" ou "missing".
+
+        Lève ValueError si le contenu copié ne correspond pas au hash attendu
+        (la destination existante n'est alors pas modifiée).
+        """
+        source = self.object_path(info["hash"])
+        if not source.exists():
+            return "missing"
+        dest = Path(target_dir) / name
+        if dest.exists() and dest.stat().st_size == info["size"] and hash_file(dest)[0] == info["hash"]:
+            return "skipped"
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            if digest.hexdigest() != info["hash"]:
+                raise ValueError(f"Hash mismatch: {name}")
+            if "mtime_ns" in info:
+                os.utime(tmp_name, ns=(info["mtime_ns"], info["mtime_ns"]))
+            os.replace(tmp_name, dest)
+            return "restored"
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def restore(self, manifest: Path, target_dir: Path, workers: int = 8) -> Dict[str, List]:
+        """Restaure tout un snapshot en parallèle ; renvoie {statut: [noms]}"""
+        files = self.load_manifest(manifest)["files"]
+        report: Dict[str, List] = {"restored": [], "skipped": [], "missing": [], "errors": []}
+
+        def run(item):
+            name, info = item
+            try:
+                return name, self.restore_file(name, info, target_dir), None
+            except Exception as e:
+                return name, "errors", str(e)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="restore") as pool:
+            for name, status, error in pool.map(run, files.items()):
+                report[status].append((name, error) if error else name)
+        return report
@@ -0,0 +1,154 @@
+# test_alert_queue.py
+import json
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from alert_queue import AlertQueue, SMTPSettings, fcntl
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Serveur SMTP minimal (sans TLS ni authentification) pour les tests"""
+    connections = 0
+    messages = []
+    fail_data = []  # codes renvoyés aux prochains DATA (ex. 451, 550)
+
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        type(self).connections += 1
+        self.reply("220 localhost test")
+        while True:
+            line = self.rfile.readline().decode(errors="replace").strip()
+            if not line:
+                return
+            verb = line.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                data = []
+                while True:
+                    chunk = self.rfile.readline().decode(errors="replace")
+                    if chunk in (".\r\n", ""):
+                        break
+                    data.append(chunk)
+                if self.fail_data:
+                    code = self.fail_data.pop(0)
+                    self.reply(f"{code} refusé")
+                else:
+                    type(self).messages.append("".join(data))
+                    self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class TestAlertQueue(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings = SMTPSettings("127.0.0.1", cls.server.server_address[1], sender="monitor@test",
+                                    recipient="admin@test", starttls=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _SMTPHandler.connections = 0
+        _SMTPHandler.messages = []
+        _SMTPHandler.fail_data = []
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = Path(self.tmp.name) / "outbox"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _queue(self, **kwargs):
+        params = dict(batch_seconds=0.2, backoff_seconds=0.1)
+        params.update(kwargs)
+        return AlertQueue(self.spool, self.settings, **params)
+
+    def test_batch_on_one_connection(self):
+        queue = self._queue()
+        start = time.monotonic()
+        for i in range(5):
+            queue.enqueue(f"Incident {i}", "détails")
+        self.assertLess(time.monotonic() - start, 0.5)  # enqueue ne bloque pas sur SMTP
+        self.assertTrue(queue.flush(10))
+        queue.close()
+        self.assertEqual(len(_SMTPHandler.messages), 5)
+        self.assertEqual(_SMTPHandler.connections, 1)
+        self.assertEqual(list(self.spool.glob("*.json")), [])
+
+    def test_overflow_goes_to_digest(self):
+        queue = self._queue(max_batch=3)
+        for i in range(6):
+            queue.enqueue(f"Incident {i}", f"corps {i}")
+        self.assertTrue(queue.flush(10))
+        queue.close()
+        self.assertEqual(len(_SMTPHandler.messages), 3)
+        self.assertIn("4_alertes_regroup", _SMTPHandler.messages[-1])  # sujet encodé (RFC 2047)
+
+    def test_spool_survives_restart(self):
+        # Message laissé dans le spool par un processus interrompu
+        self.spool.mkdir(parents=True)
+        (self.spool / "1_000001.json").write_text(json.dumps(
+            {"subject": "Avant crash", "body": "corps", "html": False, "kind": "general",
+             "created": time.time(), "attempts": 0, "next_attempt": 0}), encoding='utf-8')
+
+        queue = self._queue()
+        self.assertEqual(queue.pending(), 1)
+        queue.start()
+        self.assertTrue(queue.flush(10))
+        queue.close()
+        self.assertEqual(len(_SMTPHandler.messages), 1)
+
+    @unittest.skipIf(fcntl is None, "verrous fcntl indisponibles")
+    def test_processes_claim_each_message_once(self):
+        # Un message à la racine du spool et un autre laissé par un processus terminé
+        self.spool.mkdir(parents=True)
+        message = {"subject": "Spool", "body": "corps", "html": False, "kind": "general",
+                   "created": time.time(), "attempts": 0, "next_attempt": 0}
+        (self.spool / "1_000001.json").write_text(json.dumps(message), encoding='utf-8')
+        dead = self.spool / "inflight" / "999999_dead"
+        dead.mkdir(parents=True)
+        (dead / ".lock").touch()
+        (dead / "2_000001.json").write_text(json.dumps(dict(message, subject="Orphelin")), encoding='utf-8')
+
+        first, second = self._queue(), self._queue()  # deux processus (démon et --once)
+        self.assertEqual((first.pending(), second.pending()), (2, 0))
+        self.assertFalse(dead.exists())
+        third = self._queue()
+        self.assertEqual(third.pending(), 0)  # dossier de `first` verrouillé : rien à reprendre
+        for queue in (first, second, third):
+            queue.start()
+            self.assertTrue(queue.flush(10))
+            queue.close()
+        self.assertEqual(len(_SMTPHandler.messages), 2)
+        self.assertEqual(list((self.spool / "inflight").iterdir()), [])
+
+    def test_retry_then_permanent_failure(self):
+        _SMTPHandler.fail_data = [451, 550]
+        queue = self._queue()
+        queue.enqueue("Temporaire", "corps")
+        deadline = time.monotonic() + 10
+        while queue.pending() and time.monotonic() < deadline:
+            queue.flush(1)
+        self.assertEqual(len(_SMTPHandler.messages), 0)  # 451 puis 550 : rejeté définitivement
+        self.assertEqual(len(list((self.spool / "failed").glob("*.json"))), 1)
+        queue.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# test_backup_pack.py
+import tempfile
+import unittest
+from pathlib import Path
+
+from backup_pack import BackupPack, import_legacy
+
+LEGACY_DIR = Path(__file__).parent / "backups_old"
+
+
+class TestBackupPack(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "backup_202508.pack"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_random_access(self):
+        pack = BackupPack(self.path)
+        for i in range(5):
+            pack.append(f"<html>{i}</html>".encode() * 100, "homepage", f"2025-08-2{i}T10:00:00")
+        pack.append(b"<rss/>", "rss", "2025-08-21T10:00:00")
+
+        reopened = BackupPack(self.path)
+        self.assertEqual(len(reopened.entries()), 6)
+        entry = reopened.find("homepage", at="2025-08-22T23:00:00")
+        self.assertEqual(reopened.read(entry), b"<html>2</html>" * 100)
+
+    def test_index_rebuilt_after_interrupted_append(self):
+        pack = BackupPack(self.path)
+        pack.append(b"a" * 1000, "homepage", "2025-08-20T10:00:00")
+        pack.append(b"b" * 1000, "rss", "2025-08-20T10:00:00")
+        # Crash simulé : trailer et index perdus
+        data = self.path.read_bytes()
+        self.path.write_bytes(data[:pack._index_offset + 3])
+
+        recovered = BackupPack(self.path)
+        self.assertEqual([e["type"] for e in recovered.entries()], ["homepage", "rss"])
+        recovered.append(b"c", "comments", "2025-08-21T10:00:00")
+        self.assertEqual(BackupPack(self.path).read(BackupPack(self.path).find("rss")), b"b" * 1000)
+
+    def test_import_legacy_is_idempotent(self):
+        packs_dir = Path(self.tmp.name) / "packs"
+        first = import_legacy(LEGACY_DIR, packs_dir)
+        self.assertEqual(len(first["imported"]), 24)
+        self.assertIn("homepage_modified.html", first["skipped"])
+        self.assertEqual(import_legacy(LEGACY_DIR, packs_dir)["imported"], [])
+
+        pack = BackupPack(packs_dir / "backup_202508.pack")
+        entry = pack.find("homepage", at="2025-08-20T10:20:00")
+        self.assertTrue(pack.read(entry).startswith(b"<!doctype html>"))
+
+
+if __name__ == '__main__':
+    unittest.main()
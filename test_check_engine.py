@@ -0,0 +1,81 @@
+# test_check_engine.py
+import threading
+import time
+import unittest
+
+from check_engine import CheckEngine, in_time
+
+
+class TestCheckEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = CheckEngine(max_workers=4, deadline=2.0)
+
+    def tearDown(self):
+        self.engine.shutdown()
+
+    def test_wall_time_tracks_slowest_check(self):
+        tasks = {f"t{i}": (lambda i=i: (time.sleep(0.3), {'n': i})[1]) for i in range(4)}
+        start = time.monotonic()
+        results = self.engine.run(tasks)
+        elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual([r['n'] for r in results.values()], [0, 1, 2, 3])
+
+    def test_straggler_recorded_as_timeout(self):
+        tasks = {'fast': lambda: {'ok': True}, 'slow': lambda: (time.sleep(1.5), {'ok': True})[1]}
+        results = self.engine.run(tasks, defaults={'slow': {'ok': False, 'error': None}}, deadline=0.3)
+        self.assertTrue(results['fast']['ok'])
+        self.assertFalse(results['slow']['ok'])
+        self.assertTrue(results['slow']['timed_out'])
+        self.assertIn('timeout', results['slow']['error'])
+
+    def test_straggler_cannot_record_after_deadline(self):
+        recorded = []
+
+        def check(delay):
+            time.sleep(delay)
+            with in_time() as ok:
+                recorded.append((delay, ok))
+            return {'ok': True}
+
+        self.engine.run({'fast': lambda: check(0), 'slow': lambda: check(0.5)}, deadline=0.2)
+        time.sleep(0.5)
+        self.assertEqual(sorted(recorded), [(0, True), (0.5, False)])
+        with in_time() as ok:
+            self.assertTrue(ok)
+
+    def test_busy_host_does_not_hold_pool_threads(self):
+        engine = CheckEngine(max_workers=4, deadline=0.7, per_host=1)
+        active, peak = {}, {}
+        lock = threading.Lock()
+
+        def task(host):
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.2)
+            with lock:
+                active[host] -= 1
+            return {'ok': True}
+
+        # Six tâches lentes sur a, soumises avant les deux de b
+        names = [f"a{i}" for i in range(6)] + [f"b{i}" for i in range(2)]
+        tasks = {name: (lambda host=name[0]: task(host)) for name in names}
+        try:
+            results = engine.run(tasks, {name: {'ok': False} for name in names},
+                                 hosts={name: name[0] for name in names})
+        finally:
+            engine.shutdown()
+        self.assertEqual(peak, {'a': 1, 'b': 1})
+        self.assertTrue(all(results[f"b{i}"]['ok'] for i in range(2)))
+        self.assertTrue(results['a5']['timed_out'])
+
+    def test_exception_uses_default_result(self):
+        def boom():
+            raise RuntimeError("échec")
+        results = self.engine.run({'boom': boom}, defaults={'boom': {'valid': False, 'error': None}})
+        self.assertEqual(results['boom'], {'valid': False, 'error': 'échec'})
+
+
+if __name__ == '__main__':
+    unittest.main()
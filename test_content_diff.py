@@ -0,0 +1,69 @@
+# test_content_diff.py
+import unittest
+
+from content_diff import DiffEngine
+
+
+PAGE = """<html><head>
+<link rel='stylesheet' href='https://s1.wp.com/_static/??-eJx9j+1/Ab==?cssminify=yes' />
+<script>var nonce = "{nonce}"; _stq.push(['extra', {{'crypt':'{crypt}'}}]);</script>
+<script src="/wp-includes/js/jquery.min.js?ver={ver}"></script>
+</head><body><h1>Accueil</h1><p>{body}</p>
+<!-- generated in 0.{ms} seconds -->
+<p>Publié le {date}</p></body></html>"""
+
+
+def _page(body="Bienvenue", nonce="a1b2c3d4e5", crypt="UE40eW5", ver="6.4.1", ms="123", date="2025-08-21T22:31:15+00:00"):
+    return PAGE.format(body=body, nonce=nonce, crypt=crypt, ver=ver, ms=ms, date=date)
+
+
+class TestDiffEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = DiffEngine()
+
+    def test_volatile_tokens_are_ignored(self):
+        old = _page()
+        new = _page(nonce="ffee998877", crypt="ZXlKMG", ver="6.4.2", ms="987",
+                    date="2025-08-22T08:00:00+00:00").replace("s1.wp.com/_static/??-eJx9j+1/Ab==",
+                                                               "s2.wp.com/_static/??-eJyLjo3Vr+/q==")
+        self.assertEqual(self.engine.fingerprint(old), self.engine.fingerprint(new))
+        self.assertFalse(self.engine.diff(old, new)["changed"])
+
+    def test_real_edit_is_reported(self):
+        result = self.engine.diff(_page(), _page(body="Site piraté"))
+        self.assertTrue(result["changed"])
+        self.assertTrue(result["exact"])
+        self.assertEqual((result["added"], result["removed"]), (1, 1))
+        self.assertIn("+Site piraté</p>", result["patch"])
+
+    def test_fallback_beyond_budget(self):
+        engine = DiffEngine(max_cells=1)
+        old = "\n".join(f"<li>{i}</li>" for i in range(50))
+        new = "\n".join(f"<li>{i}</li>" for i in range(50) if i != 10) + "\n<li>x</li>"
+        result = engine.diff(old, "<p>début</p>\n" + new)
+        self.assertFalse(result["exact"])
+        self.assertEqual(result["removed"], 1)
+        self.assertEqual(result["added"], 3)  # "<p>", "début</p>", "x</li>"
+
+    def test_fallback_patch_matches_counts(self):
+        engine = DiffEngine(max_cells=1)
+        old = "début\n" + "article\n" * 3 + "fin"
+        new = "DÉBUT\n" + "article\n" * 3 + "spam\n" * 12 + "fin"
+        result = engine.diff(old, new)
+        self.assertFalse(result["exact"])
+        self.assertEqual((result["added"], result["removed"]), (13, 1))
+        added = [line for line in result["patch"].splitlines() if line.startswith("+")]
+        self.assertEqual(added, ["+DÉBUT"] + ["+spam"] * 12)
+
+    def test_patch_is_bounded(self):
+        engine = DiffEngine(max_patch_bytes=300)
+        old = "\n".join(f"<p>ligne {i}</p>" for i in range(500))
+        new = "\n".join(f"<p>modifiée {i}</p>" for i in range(500))
+        result = engine.diff(old, new)
+        self.assertEqual(result["added"], 500)
+        self.assertLessEqual(len(result["patch"]), 400)
+        self.assertIn("lignes omises", result["patch"])
+
+
+if __name__ == '__main__':
+    unittest.main()
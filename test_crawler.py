@@ -0,0 +1,122 @@
+# test_crawler.py
+import hashlib
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from crawler import CrawlIndex, Crawler, extract_assets, parse_sitemap
+
+PAGES = 30
+
+
+def _site(base: str) -> dict:
+    files = {
+        "/sitemap.xml": f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        f'<sitemap><loc>{base}/sitemap-1.xml</loc></sitemap></sitemapindex>',
+        "/sitemap-1.xml": '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                          + "".join(f"<url><loc>{base}/post-{i}/</loc></url>" for i in range(PAGES))
+                          + '<url><loc>https://ailleurs.example/x/</loc></url></urlset>',
+        "/feed/": f'<rss><channel><item><link>{base}/post-0/</link></item></channel></rss>',
+        "/": '<html><script src="/app.js"></script></html>',
+        "/app.js": "console.log('ok');",
+        "/style.css": "body{}",
+    }
+    for i in range(PAGES):
+        files[f"/post-{i}/"] = (f'<html><link rel="stylesheet" href="/style.css?ver=1">'
+                                f'<script src="/app.js"></script><script src="https://cdn.example/x.js"></script>'
+                                f'<p>Article {i}</p></html>')
+    return files
+
+
+class _Handler(BaseHTTPRequestHandler):
+    files = {}
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        path = self.path.split('?')[0]
+        body = self.files.get(path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        etag = '"' + hashlib.md5(data).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCrawler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        _Handler.files = _site(self.base)
+        _Handler.hits = 0
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = CrawlIndex(Path(self.tmp.name) / "crawl_index.db")
+        self.inspected = []
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def _crawl(self):
+        fingerprint = lambda text: hashlib.sha256(text.encode('utf-8')).hexdigest()
+        inspect = lambda url, kind, text: self.inspected.append(url)
+        return Crawler(self.base, self.index, fingerprint, inspect, workers=4, per_host=2).run()
+
+    def test_parse_helpers(self):
+        pages, children = parse_sitemap(_Handler.files["/sitemap-1.xml"].encode())
+        self.assertEqual((len(pages), children), (PAGES + 1, []))
+        assets = extract_assets(_Handler.files["/post-1/"], self.base + "/post-1/")
+        self.assertEqual(assets, [self.base + "/style.css?ver=1", self.base + "/app.js"])
+
+    def test_full_then_incremental_crawl(self):
+        first = self._crawl()
+        self.assertEqual(first["pages"], PAGES + 1)        # articles + accueil, hôte tiers exclu
+        self.assertEqual(first["assets"], 2)               # app.js et style.css, une seule fois
+        self.assertEqual(len(first["new"]), PAGES + 3)
+        self.assertEqual(first["errors"], [])
+
+        self.inspected.clear()
+        _Handler.files["/app.js"] = "eval(atob('ZG9jdW1lbnQ='));"
+        second = self._crawl()
+        self.assertEqual(second["not_modified"], PAGES + 2)
+        self.assertEqual([r["url"] for r in second["changed"]], [self.base + "/app.js"])
+        self.assertEqual(self.inspected, [self.base + "/app.js"])
+
+    def test_assets_checked_when_sitemap_exceeds_max_urls(self):
+        crawler = Crawler(self.base, self.index, lambda t: t, workers=4, per_host=2, max_urls=10)
+        report = crawler.run()
+        self.assertEqual(report["pages"], 10)
+        self.assertEqual(report["assets"], 2)
+        self.assertEqual(report["pending"], PAGES + 1 - 10)
+
+    def test_deadline_leaves_pending_urls(self):
+        crawler = Crawler(self.base, self.index, lambda t: t, workers=1, per_host=1, deadline=0)
+        report = crawler.run()
+        self.assertGreater(report["pending"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
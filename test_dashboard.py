@@ -0,0 +1,65 @@
+# test_dashboard.py
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dashboard import Dashboard, availability_section, incident_sections, uptime_history_section
+from incident_store import IncidentStore
+from timeseries import TimeSeriesStore
+
+
+class TestDashboard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.series = TimeSeriesStore(self.dir / "timeseries")
+        now = time.time()
+        self.series.append_many([(f"https://site{s}.example", "availability", i % 50 != 0, 0.3, 200,
+                                  now - 86400 + i * 300) for s in range(50) for i in range(288)])
+        self.stores = [IncidentStore(self.dir / f"incidents{s}.db") for s in range(50)]
+        self.dashboard = Dashboard(self.dir / "logs.html", self.dir / "dashboard_cache.json")
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.tmp.cleanup()
+
+    def _sections(self):
+        sections = [availability_section(self.series), uptime_history_section(self.series)]
+        for s, store in enumerate(self.stores):
+            sections += incident_sections(f"https://site{s}.example", store)
+        return sections
+
+    def _incident(self, store, typ="site_unavailable"):
+        store.append({"timestamp": datetime.now(timezone.utc).isoformat(), "type": typ,
+                      "severity": "high", "details": {"status_code": 503}})
+
+    def test_only_changed_sections_are_rendered(self):
+        self._incident(self.stores[3])
+        first = self.dashboard.build(self._sections())
+        self.assertEqual(len(first["rendered"]), 102)
+        page = (self.dir / "logs.html").read_text(encoding="utf-8")
+        self.assertIn("https://site7.example", page)
+        self.assertIn("site_unavailable", page)
+        self.assertIn("p95", page)
+
+        second = self.dashboard.build(self._sections())
+        self.assertEqual(second["rendered"], [])
+        self.assertLess(second["elapsed"], 1.0)
+
+        self._incident(self.stores[3], "ssl_warning")
+        third = self.dashboard.build(self._sections())
+        self.assertEqual(third["rendered"], ["incidents-https---site3-example", "recent-https---site3-example"])
+        self.assertIn("ssl_warning", (self.dir / "logs.html").read_text(encoding="utf-8"))
+
+    def test_new_measurements_refresh_availability(self):
+        self.dashboard.build(self._sections())
+        self.series.append("https://site0.example", "availability", False, None, 503)
+        result = self.dashboard.build(self._sections())
+        self.assertEqual(result["rendered"], ["availability"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# test_fetch_layer.py
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from fetch_layer import CycleFetcher
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b"<html>page</html>"
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCycleFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        _Handler.hits = 0
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fetcher = CycleFetcher(Path(self.tmp.name) / "validators.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_single_fetch_per_cycle(self):
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(lambda _: self.fetcher.get(self.url), range(3)))
+        self.assertEqual(_Handler.hits, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_conditional_get_after_commit(self):
+        self.assertEqual(self.fetcher.get(self.url).status_code, 200)
+        self.fetcher.commit(self.url)
+
+        fetcher = CycleFetcher(Path(self.tmp.name) / "validators.json")
+        resp = fetcher.get(self.url)
+        self.assertTrue(resp.not_modified)
+        self.assertTrue(resp.ok)
+        self.assertEqual(fetcher.get(self.url, conditional=False).status_code, 200)
+
+    def test_uncommitted_validators_not_sent(self):
+        self.fetcher.get(self.url)
+        self.fetcher.new_cycle()
+        self.assertEqual(self.fetcher.get(self.url).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
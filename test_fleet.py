@@ -0,0 +1,49 @@
+# test_fleet.py
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fleet import load_inventory, site_slug, host_of, HostLimiter
+
+
+class TestFleet(unittest.TestCase):
+    def test_load_inventory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            inventory = Path(tmp) / "sites.txt"
+            inventory.write_text("# flotte\nhttps://a.example.com/\n\nhttps://b.example.com/blog  # blog\n"
+                                 "https://a.example.com\n", encoding='utf-8')
+            self.assertEqual(load_inventory(inventory),
+                             ["https://a.example.com", "https://b.example.com/blog"])
+
+    def test_site_slug(self):
+        self.assertEqual(site_slug("https://B.example.com:8443/blog/"), "b.example.com_8443_blog")
+        self.assertEqual(host_of("https://B.example.com:8443/blog"), "b.example.com:8443")
+
+    def test_host_limiter(self):
+        limiter = HostLimiter(per_host=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def task():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {}
+
+        def limited(_):
+            with limiter.slot("a.example.com"):
+                return task()
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(limited, range(6)))
+        self.assertEqual(peak[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
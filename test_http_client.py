@@ -0,0 +1,64 @@
+# test_http_client.py
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_client import HTTPClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    peers = set()
+    agents = []
+
+    def do_GET(self):
+        type(self).peers.add(self.client_address)
+        type(self).agents.append(self.headers.get('User-Agent'))
+        if self.path == '/slow':
+            time.sleep(0.5)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        _Handler.peers = set()
+        _Handler.agents = []
+        self.client = HTTPClient(read_timeout=0.2, user_agent="WPMonitor-test")
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_connection_reused_across_paths(self):
+        for path in ('/', '/feed/', '/comments/feed/'):
+            self.assertEqual(self.client.get(self.base + path).text, "ok")
+        self.assertEqual(len(_Handler.peers), 1)
+        self.assertEqual(_Handler.agents, ["WPMonitor-test"] * 3)
+
+    def test_read_timeout(self):
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.client.get(self.base + '/slow')
+        self.assertEqual(self.client.get(self.base + '/slow', timeout=(1, 2)).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
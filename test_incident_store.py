@@ -0,0 +1,88 @@
+# test_incident_store.py
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from incident_store import IncidentStore
+
+
+class TestIncidentStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_since_cursor(self):
+        store = IncidentStore(self.dir / "incidents.db")
+        first = store.append({"timestamp": "2025-08-20T10:00:00+00:00", "type": "ssl_warning",
+                              "severity": "medium", "details": {"days_left": 12}})
+        store.append({"timestamp": "2025-08-20T11:00:00+00:00", "type": "site_unavailable",
+                      "severity": "high", "details": {"status_code": 503}})
+        new = store.since(first)
+        self.assertEqual([inc["type"] for inc in new], ["site_unavailable"])
+        self.assertEqual(new[0]["details"], {"status_code": 503})
+        self.assertEqual(store.cursor(), first + 1)
+        store.close()
+
+    def test_migration_from_json_is_one_shot(self):
+        legacy = self.dir / "incident_history.json"
+        legacy.write_text(json.dumps([{"timestamp": "2025-08-20T10:00:00+00:00", "type": "content_changed",
+                                       "severity": "medium", "details": json.dumps({"endpoint": "rss"})}]),
+                          encoding='utf-8')
+        store = IncidentStore(self.dir / "incidents.db", legacy_json=legacy)
+        self.assertEqual(store.all()[0]["details"], {"endpoint": "rss"})
+        self.assertFalse(legacy.exists())
+        self.assertEqual(store.migrate_from_json(legacy), 0)
+        self.assertEqual(store.count(), 1)
+        store.close()
+
+    def test_window_counts_match_scan(self):
+        store = IncidentStore(self.dir / "incidents.db")
+        base = datetime(2025, 8, 1, tzinfo=timezone.utc)
+        for i in range(200):
+            ts = base + timedelta(hours=7 * i)
+            store.append({"timestamp": ts.isoformat(), "type": ["ssl_warning", "content_changed"][i % 2],
+                          "severity": ["medium", "high"][i % 3 == 0], "details": {}})
+        start, end = base + timedelta(days=5, hours=13), base + timedelta(days=40, hours=2)
+        expected = {}
+        for inc in store.all():
+            ts = datetime.fromisoformat(inc["timestamp"])
+            if start <= ts < end:
+                key = (inc["type"], inc["severity"])
+                expected[key] = expected.get(key, 0) + 1
+        self.assertEqual(store.counts(start, end), expected)
+        window = store.query(start=start, end=end, types=["ssl_warning"], severities=["high"])
+        self.assertEqual(len(window), expected[("ssl_warning", "high")])
+        self.assertEqual([inc["id"] for inc in store.tail(3)], [198, 199, 200])
+        store.close()
+
+    def test_episode_suppresses_repeats_within_cooldown(self):
+        store = IncidentStore(self.dir / "incidents.db")
+        base = datetime(2025, 8, 20, 10, tzinfo=timezone.utc)
+
+        def record(hours, severity="medium", fp="ssl:exemple.com"):
+            return store.record({"timestamp": (base + timedelta(hours=hours)).isoformat(), "type": "ssl_warning",
+                                 "severity": severity, "details": {"days_left": 20 - hours}}, fp, cooldown=6 * 3600)
+
+        first_id, new = record(0)
+        self.assertTrue(new)
+        self.assertEqual([record(h)[1] for h in (3, 6, 9)], [False, False, False])  # délai compté depuis le dernier
+        self.assertEqual(store.count(), 1)
+        self.assertEqual(store.open_episodes()[0]["count"], 4)
+
+        self.assertTrue(record(10, severity="high")[1])   # sévérité en hausse : nouvel épisode
+        self.assertTrue(record(30, severity="high")[1])   # délai de carence écoulé
+        self.assertTrue(store.resolve("ssl:exemple.com"))
+        self.assertTrue(record(31, severity="high")[1])   # épisode clos
+        self.assertEqual(store.count(), 4)
+        self.assertEqual(sum(store.counts(base).values()), 7)  # répétitions comptées
+        self.assertEqual(len(store.repeated_since((base + timedelta(hours=1)).timestamp())), 0)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# test_log_reader.py
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from log_reader import LogReader
+
+
+def _line(ts: datetime, msg: str) -> bytes:
+    return f"[{ts.strftime('%Y-%m-%d %H:%M:%S')},000] [INFO] {msg}\n".encode('utf-8')
+
+
+class TestLogReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.log = self.dir / "monitor.log"
+        self.reader = LogReader(self.log, self.dir / "log_index.json")
+        self.base = datetime(2025, 8, 1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_window_across_rotated_files(self):
+        rotated = self.dir / "monitor.log.1"
+        rotated.write_bytes(b"".join(_line(self.base + timedelta(hours=h), f"old {h}") for h in range(48)))
+        self.log.write_bytes(b"".join(_line(self.base + timedelta(hours=h), f"new {h}") for h in range(48, 60))
+                             + "\nété suite\n".encode('utf-8') + b"\xff\xfe brut\n")
+        lines = self.reader.read_since(self.base + timedelta(hours=46, minutes=30))
+        self.assertEqual(lines[0], "[2025-08-02 23:00:00,000] [INFO] old 47")
+        self.assertEqual(len([l for l in lines if "[INFO]" in l]), 13)
+        self.assertIn("été suite", lines)
+        self.assertIn("�� brut", lines)
+
+    def test_incremental_checkpoint(self):
+        self.log.write_bytes(b"".join(_line(self.base + timedelta(hours=h), f"l{h}") for h in range(10)))
+        self.assertEqual(len(self.reader.read_since(self.base)), 10)
+        with open(self.log, 'ab') as f:
+            f.write(_line(self.base + timedelta(hours=11), "l11"))
+        # Rotation : le fichier renommé garde son index
+        self.log.rename(self.dir / "monitor.log.1")
+        self.log.write_bytes(_line(self.base + timedelta(hours=12), "l12"))
+        lines = self.reader.read_since(self.base + timedelta(hours=9))
+        self.assertEqual([l.rsplit(' ', 1)[1] for l in lines], ["l9", "l11", "l12"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# test_metrics.py
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import metrics
+from http_client import HTTPClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(0.1)  # « temps WordPress » avant les en-têtes
+        body = b"x" * 1000
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPhaseMetrics(unittest.TestCase):
+    def _serve(self, context=None):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        if context:
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        return server.server_port
+
+    def test_phases_and_connection_reuse(self):
+        registry = metrics.MetricsRegistry()
+        client = HTTPClient(registry=registry)
+        self.addCleanup(client.close)
+        base = f"http://127.0.0.1:{self._serve()}"
+
+        first = client.get(base + "/feed/").phases
+        second = client.get(base + "/feed/").phases
+        self.assertGreater(first["connect"], 0)
+        self.assertEqual(first["tls"], 0)
+        self.assertEqual(second["connect"], 0)  # keep-alive
+        for phases in (first, second):
+            self.assertGreaterEqual(phases["ttfb"], 0.09)
+            self.assertGreaterEqual(phases["total"], phases["ttfb"] + phases["download"])
+
+        text = registry.render()
+        labels = f'site="{base}",endpoint="/feed/",phase="ttfb"'
+        self.assertIn(f'wpmonitor_http_phase_seconds_count{{{labels}}} 2', text)
+        self.assertIn(f'wpmonitor_http_phase_seconds_bucket{{{labels},le="0.05"}} 0', text)
+        self.assertIn(f'wpmonitor_http_phase_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f'wpmonitor_http_requests_total{{site="{base}",endpoint="/feed/",status="200"}} 2', text)
+
+    @unittest.skipUnless(shutil.which("openssl"), "openssl requis pour générer un certificat de test")
+    def test_tls_phase(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cert, key = Path(tmp.name) / "cert.pem", Path(tmp.name) / "key.pem"
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+                        "-keyout", str(key), "-out", str(cert)], check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        port = self._serve(context)
+
+        client = HTTPClient(registry=metrics.MetricsRegistry())
+        self.addCleanup(client.close)
+        phases = client.get(f"https://localhost:{port}/", verify=str(cert)).phases
+        self.assertGreater(phases["tls"], 0)
+        self.assertGreaterEqual(phases["dns"], 0)
+
+    def test_standalone_exposition(self):
+        registry = metrics.MetricsRegistry()
+        registry.observe("https://a.example", "/", {"total": 0.2}, "200")
+        server = metrics.serve(0, host="127.0.0.1", metrics=registry)
+        self.addCleanup(server.shutdown)
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as resp:
+            self.assertEqual(resp.headers["Content-Type"], metrics.CONTENT_TYPE)
+            self.assertIn('le="0.25"} 1', resp.read().decode())
+
+
+if __name__ == "__main__":
+    unittest.main()
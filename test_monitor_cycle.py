@@ -0,0 +1,65 @@
+# test_monitor_cycle.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+CYCLES = """
+import json, monitor
+sent = []
+monitor.send_alert = lambda subject, body, incident_type="general", html=False: sent.append(subject) or True
+monitor.run_all()
+monitor.run_all()
+store = monitor.incident_manager.store
+print(json.dumps({"sent": sent, "rows": store.count(), "counts": sum(store.counts(0).values()),
+                  "ongoing": store.open_episodes()[0]["count"]}))
+"""
+
+
+class TestCycleNotifications(unittest.TestCase):
+    def setUp(self):
+        class Down(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Down)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.env = dict(os.environ, PYTHONPATH=str(ROOT), MONITOR_DIR=str(self.dir / "m"),
+                        BACKUP_DIR=str(self.dir / "b"), RESTORE_DIR=str(self.dir / "r"),
+                        SITE_URL=f"http://127.0.0.1:{self.server.server_address[1]}",
+                        SMTP_USER="", SMTP_PASS="", ALERT_EMAIL="", INCIDENT_COOLDOWN_HOURS="24")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_repeated_outage_is_not_reported_as_ok(self):
+        out = subprocess.run([sys.executable, "-c", CYCLES], env=self.env, cwd=self.dir,
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.splitlines()[-1])
+        # Premier cycle : incident notifié ; second cycle (délai de carence) : ni email ni « Site OK »
+        self.assertEqual(len(result["sent"]), 2)
+        self.assertTrue(all("Site OK" not in subject for subject in result["sent"]))
+        self.assertTrue(result["sent"][-1].startswith("[ALERTE WP]"))
+        self.assertEqual(result["rows"], 1)
+        self.assertEqual(result["counts"], 2)
+        self.assertEqual(result["ongoing"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# test_rest_backup.py
+import json
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from http_client import HTTPClient
+from rest_backup import RestBackup, load_collection
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class FakeWordPress:
+    """API REST WordPress minimale : pagination, tri, filtres de date et _fields"""
+
+    def __init__(self):
+        self.data = {"posts": [], "pages": [], "comments": [], "media": []}
+        self.requests = []
+        self.fail_pages = set()
+        wp = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                collection = parts.path.rsplit('/', 1)[-1]
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                wp.requests.append((collection, query))
+                page, per_page = int(query.get("page", 1)), int(query.get("per_page", 10))
+                if (collection, page) in wp.fail_pages:
+                    wp.fail_pages.discard((collection, page))
+                    return self._send(500, b'{"code": "internal_server_error"}')
+                items = list(wp.data[collection])
+                for param, field in (("modified_after", "modified"), ("after", "date")):
+                    if param in query:
+                        items = [i for i in items if i[field] > query[param]]
+                items.sort(key=lambda i: i[query.get("orderby", "date")], reverse=query.get("order") == "desc")
+                total, total_pages = len(items), -(-len(items) // per_page)
+                if page > max(total_pages, 1):
+                    return self._send(400, b'{"code": "rest_post_invalid_page_number"}')
+                items = items[(page - 1) * per_page:page * per_page]
+                if "_fields" in query:
+                    items = [{k: i[k] for k in query["_fields"].split(",")} for i in items]
+                self._send(200, json.dumps(items).encode(),
+                           {"X-WP-Total": str(total), "X-WP-TotalPages": str(total_pages)})
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def add(self, collection: str, count: int, when: datetime):
+        start = len(self.data[collection]) + 1
+        for i in range(start, start + count):
+            stamp = (when + timedelta(minutes=i)).isoformat()
+            self.data[collection].append({"id": i, "date": stamp, "modified": stamp, "title": f"v1-{i}"})
+
+    def pages_requested(self, collection: str):
+        return sorted(int(q.get("page", 1)) for c, q in self.requests if c == collection and "_fields" not in q)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestRestBackup(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.wp = FakeWordPress()
+        self.wp.add("posts", 250, T0)
+        self.wp.add("comments", 30, T0)
+        self.client = HTTPClient()
+        self.messages = []
+
+    def tearDown(self):
+        self.client.close()
+        self.wp.close()
+        self.tmp.cleanup()
+
+    def _backup(self, **kwargs) -> RestBackup:
+        return RestBackup(self.wp.url, self.dir / "packs", self.dir / "rest_state.json", workers=4,
+                          client=self.client, log=self.messages.append, **kwargs)
+
+    def test_full_then_incremental(self):
+        report = self._backup().run()
+        self.assertEqual(report["posts"], {"objects": 250, "pages": 3, "complete": True,
+                                           "cursor": self.wp.data["posts"][-1]["modified"]})
+        self.assertEqual(report["comments"]["objects"], 30)
+        self.assertEqual(report["media"], {"objects": 0, "pages": 1, "complete": True, "cursor": None})
+        self.assertEqual(self.wp.pages_requested("posts"), [1, 2, 3])
+        before = datetime.now().isoformat()
+
+        # Deux articles modifiés et un ajouté le lendemain : seuls eux (et le dernier
+        # article, dans la marge d'une minute sous le curseur) sont transférés
+        later = (T0 + timedelta(days=1)).isoformat()
+        for post in self.wp.data["posts"][9:11]:
+            post.update(modified=later, title=f"v2-{post['id']}")
+        self.wp.add("posts", 1, T0 + timedelta(days=1))
+        self.wp.requests.clear()
+        report = self._backup().run(["posts"])
+        self.assertEqual(report["posts"]["objects"], 4)
+        self.assertEqual(self.wp.pages_requested("posts"), [1])
+        query = [q for c, q in self.wp.requests if "_fields" not in q][0]
+        self.assertEqual(query["modified_after"], (T0 + timedelta(minutes=249)).isoformat())
+
+        posts = load_collection(self.dir / "packs", "posts")
+        self.assertEqual(len(posts), 251)
+        self.assertEqual(posts[10]["title"], "v2-10")
+        self.assertEqual(load_collection(self.dir / "packs", "posts", at=before)[10]["title"], "v1-10")
+
+    def test_interrupted_backup_resumes_missing_pages(self):
+        self.wp.fail_pages.add(("posts", 3))
+        report = self._backup(per_page=50).run(["posts"])
+        self.assertFalse(report["posts"]["complete"])
+        self.assertIsNone(report["posts"]["cursor"])
+        done = set(json.loads((self.dir / "rest_state.json").read_text())["posts"]["pending"]["done"])
+        self.assertIn(1, done)
+        self.assertNotIn(3, done)
+
+        self.wp.requests.clear()
+        report = self._backup(per_page=50).run(["posts"])
+        self.assertTrue(report["posts"]["complete"])
+        self.assertEqual(report["posts"]["objects"], 250)
+        self.assertEqual(set(self.wp.pages_requested("posts")), set(range(1, 6)) - done)
+        self.assertEqual(sorted(load_collection(self.dir / "packs", "posts")), list(range(1, 251)))
+
+
+if __name__ == '__main__':
+    unittest.main()
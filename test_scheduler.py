@@ -0,0 +1,67 @@
+# test_scheduler.py
+import random
+import threading
+import time
+import unittest
+
+from scheduler import AdaptiveScheduler, Job
+
+
+class TestAdaptiveScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = AdaptiveScheduler(max_workers=1, rng=random.Random(1))
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_failures_accelerate_and_errors_back_off(self):
+        job = Job("avail", lambda: True, interval=300, min_interval=60, max_interval=1200)
+        s = self.scheduler
+        self.assertEqual(s.next_interval(job, False, False), 150)
+        self.assertEqual(s.next_interval(job, False, False), 75)
+        self.assertEqual(s.next_interval(job, False, False), 60)
+        self.assertEqual(s.next_interval(job, True, False), 300)
+        self.assertEqual(s.next_interval(job, None, True), 600)
+        self.assertEqual(s.next_interval(job, None, True), 1200)
+        self.assertEqual(s.next_interval(job, None, True), 1200)
+        self.assertEqual(s.next_interval(job, None, False), 300)
+
+    def test_jitter_bounds_and_spread(self):
+        job = Job("x", lambda: True, interval=100, jitter=0.2)
+        values = [self.scheduler._jittered(job, 100) for _ in range(200)]
+        self.assertTrue(all(80 <= v <= 120 for v in values))
+        self.assertGreater(max(values) - min(values), 20)
+
+    def test_priority_order_among_due_jobs(self):
+        order = []
+        for name, priority in (("cycle", 5), ("crawl", 9), ("avail", 0)):
+            self.scheduler.add(Job(name, lambda name=name: order.append(name), 3600,
+                                   priority=priority, run_now=True))
+        self.scheduler.run_pending()
+        deadline = time.monotonic() + 5
+        while len(order) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(order, ["avail", "cycle", "crawl"])
+
+    def test_sleeps_until_next_due_and_reschedules(self):
+        runs = []
+        done = threading.Event()
+
+        def job():
+            runs.append(time.monotonic())
+            if len(runs) == 3:
+                done.set()
+            return len(runs) > 1  # premier passage en échec : revérification accélérée
+
+        self.scheduler.add(Job("fast", job, interval=0.2, jitter=0, min_interval=0.05, run_now=True))
+        loop = threading.Thread(target=self.scheduler.run_forever, daemon=True)
+        loop.start()
+        self.assertTrue(done.wait(5))
+        self.assertGreaterEqual(runs[1] - runs[0], 0.09)
+        self.assertLess(runs[1] - runs[0], 0.18)  # 0.1 s après l'échec au lieu de 0.2 s
+        self.assertGreaterEqual(runs[2] - runs[1], 0.19)
+        self.assertEqual(self.scheduler.jobs["fast"].current, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# test_signature_scanner.py
+import json
+import re
+import unittest
+from pathlib import Path
+
+from signature_scanner import SignatureScanner, _Automaton, required_literal
+
+SIGNATURES_FILE = Path(__file__).parent / "signatures.json"
+
+
+class TestSignatureScanner(unittest.TestCase):
+    def setUp(self):
+        self.scanner = SignatureScanner.from_file(SIGNATURES_FILE)
+
+    def test_required_literal(self):
+        self.assertEqual(required_literal(r"eval\s*\("), "eval")
+        self.assertEqual(required_literal(r"String\.fromCharCode\(\d+"), "string.fromcharcode(")
+        self.assertEqual(required_literal(r"ab(cd)?efgh{2,3}"), "efg")
+        self.assertIsNone(required_literal(r"viagra|cialis"))
+
+    def test_explicit_literals_appear_in_pattern(self):
+        with open(SIGNATURES_FILE, 'r', encoding='utf-8') as f:
+            entries = json.load(f)["signatures"]
+        self.assertEqual(len({e["id"] for e in entries}), len(entries))
+        for entry in entries:
+            if "literal" in entry:
+                unescaped = re.sub(r"\\(.)", r"\1", entry["pattern"]).lower()
+                self.assertIn(entry["literal"].lower(), unescaped, entry["id"])
+
+    def test_pure_python_automaton(self):
+        automaton = _Automaton()
+        for word in ("he", "she", "his", "hers"):
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        self.assertEqual(sorted(automaton.iter("ushers")), [(3, "he"), (3, "she"), (5, "hers")])
+
+    def test_scan_all_bodies_in_one_pass(self):
+        bodies = {
+            "homepage": "<html><script>EVAL( base64_decode('aGk=') )</script></html>",
+            "rss": "<item><title>Buy cheap VIAGRA now</title></item>",
+            "comments": "<p>Rien à signaler</p>",
+        }
+        hits = {(h["endpoint"], h["id"]) for h in self.scanner.scan_all(bodies)}
+        self.assertIn(("homepage", "php-eval-base64"), hits)
+        self.assertIn(("homepage", "php-eval"), hits)
+        self.assertIn(("rss", "spam-pharma"), hits)        # alternance combinée
+        self.assertIn(("rss", "spam-pharma-buy"), hits)    # préfiltre + confirmation
+        self.assertFalse([h for h in hits if h[0] == "comments"])
+
+    def test_counts_and_samples(self):
+        text = " ".join(f"eval ({i})" for i in range(10))
+        hit = next(h for h in self.scanner.scan(text) if h["id"] == "php-eval")
+        self.assertEqual(hit["count"], 10)
+        self.assertEqual(len(hit["matches"]), 3)
+
+    def test_literal_without_confirmation(self):
+        # Le littéral seul ne suffit pas : la regex doit confirmer
+        self.assertFalse(self.scanner.scan("evaluation du site, exécution"))
+
+    def test_js_heavy_page_reads_each_window_once(self):
+        # Page réaliste : JavaScript minifié riche en littéraux fréquents ($_, \\x, <div, <script...)
+        chunk = ('<div class="wp-block-group" style="margin-top:10px"><script>(function($){"use strict";'
+                 'var t=function(e,n){return e&&n?window.location.href:document.location.hash};'
+                 '$.fn.slider=function(o){return this.each(function(){var s=$(this),i="\\x3cdiv\\x3e";'
+                 'if(location.search){s.data("q",location.search)}})};$_data=function(k){return k};'
+                 '})(jQuery);</script></div>\n<p>Un article de blog ordinaire.</p>\n')
+        page = chunk * 500
+        self.assertEqual(self.scanner.scan(page), [])
+
+        scanned = {}
+
+        class Counting:
+            def __init__(self, sig):
+                self.sig, self.regex = sig, sig.regex
+
+            def finditer(self, text, pos, endpos):
+                scanned[self.sig.id] = scanned.get(self.sig.id, 0) + endpos - pos
+                return self.regex.finditer(text, pos, endpos)
+
+        for sig in self.scanner.signatures:
+            if sig.literal:
+                sig.regex = Counting(sig)
+        infected = page[:len(page) // 2] + "<script>window.location=atob('aHR0cHM6Ly9leA==')</script>" \
+            + page[len(page) // 2:]
+        hits = {h["id"]: h["count"] for h in self.scanner.scan(infected)}
+        self.assertEqual(hits, {"js-location-atob": 1})
+        self.assertTrue(scanned)
+        self.assertLessEqual(max(scanned.values()), len(infected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# test_sla.py
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from sla import availability_stats, site_sla
+from timeseries import TimeSeriesStore
+
+T0 = 1_772_323_200  # 2026-03-01 00:00 UTC
+
+
+class TestAvailabilityStats(unittest.TestCase):
+    def test_uptime_percentiles_and_mttr(self):
+        # Site 0 : panne de 15 min (3 mesures) ; site 1 : en panne à la fin de la fenêtre
+        ts, site, ok, latency = [], [], [], []
+        for i in range(12):
+            for s in (0, 1):
+                up = not (s == 0 and 4 <= i < 7) and not (s == 1 and i >= 10)
+                ts.append(T0 + i * 300)
+                site.append(s)
+                ok.append(up)
+                latency.append(0.1 * (i + 1) if up else np.nan)
+        stats = availability_stats(np.array(ts), np.array(site), np.array(ok), np.array(latency),
+                                   end=T0 + 12 * 300)
+
+        a, b = stats[0], stats[1]
+        self.assertEqual(a["samples"], 12)
+        self.assertEqual(a["outages"], 1)
+        self.assertEqual(a["open_outages"], 0)
+        self.assertEqual(a["mttr"], 900)
+        self.assertEqual(a["downtime"], 900)
+        self.assertAlmostEqual(a["uptime"], 75.0)
+        self.assertAlmostEqual(a["p50"], np.percentile([0.1 * (i + 1) for i in range(12) if not 4 <= i < 7], 50),
+                               places=5)
+        self.assertEqual(b["outages"], 1)
+        self.assertEqual(b["open_outages"], 1)
+        self.assertIsNone(b["mttr"])
+        self.assertAlmostEqual(b["uptime"], 100 * 10 / 12)
+
+    def test_accelerated_probes_do_not_skew_uptime(self):
+        # 1 h disponible (mesures toutes les 10 min), puis 10 min de panne sondée chaque minute
+        ts = [T0 + i * 600 for i in range(6)] + [T0 + 3600 + i * 60 for i in range(10)] + [T0 + 4200]
+        ok = [True] * 6 + [False] * 10 + [True]
+        stats = availability_stats(np.array(ts), np.zeros(len(ts), dtype=np.uint16), np.array(ok),
+                                   np.full(len(ts), 0.2), end=T0 + 4800, max_gap=600)
+        self.assertAlmostEqual(stats[0]["uptime"], 100 * 4200 / 4800)
+        self.assertEqual(stats[0]["mttr"], 600)
+
+    def test_site_sla_reads_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TimeSeriesStore(Path(tmp))
+            store.append_many([("https://a.example", "availability", i != 3, 0.2, 200, T0 + i * 300)
+                               for i in range(10)] +
+                              [("https://a.example", "ssl", True, 50, 0, T0)])
+            sla = site_sla(store, T0, T0 + 3000)
+        self.assertEqual(list(sla), ["https://a.example"])
+        self.assertEqual(sla["https://a.example"]["samples"], 10)
+        self.assertEqual(sla["https://a.example"]["mttr"], 300)
+        self.assertAlmostEqual(sla["https://a.example"]["uptime"], 90.0)
+
+    def test_window_beyond_raw_retention_uses_rollups(self):
+        # 30 jours, une mesure toutes les 10 min, une heure de panne par jour ;
+        # mesures brutes gardées 2 jours, agrégats horaires 5 jours
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TimeSeriesStore(Path(tmp), raw_days=2, hourly_days=5, daily_days=400)
+            store.append_many([("https://a.example", "availability", (i // 6) % 24 != 3, 0.2, 200, T0 + i * 600)
+                               for i in range(30 * 144)])
+            store.maintain(T0 + 30 * 86400)
+            sla = site_sla(store, T0, T0 + 30 * 86400)["https://a.example"]
+        self.assertEqual(sla["samples"], 30 * 144)
+        self.assertAlmostEqual(sla["uptime"], 100 * 23 / 24, places=3)
+        self.assertAlmostEqual(sla["downtime"], 30 * 3600, delta=600)
+        self.assertEqual(sla["covered_from"], T0)
+        self.assertEqual(sla["detailed_from"], T0 + 28 * 86400)
+        self.assertEqual(sla["outages"], 2)  # pannes des jours détaillés seulement
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# test_snapshot_catalog.py
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from backup_pack import BackupPack
+from snapshot_catalog import SnapshotCatalog, site_key
+from snapshot_store import SnapshotStore
+
+SITE = "https://example.wordpress.com"
+
+
+class TestSnapshotCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "backups"
+        self.src = Path(self.tmp.name) / "src"
+        self.src.mkdir()
+        self.store = SnapshotStore(self.root)
+        self.pack = BackupPack(self.root / "packs" / "backup_202601.pack")
+        self.catalog = SnapshotCatalog(self.root)
+
+    def tearDown(self):
+        self.catalog.close()
+        self.tmp.cleanup()
+
+    def _snapshot(self, content: str) -> Path:
+        (self.src / "report.txt").write_text(content)
+        (self.src / "static.txt").write_text("inchangé")
+        manifest, _ = self.store.snapshot(self.src, site=SITE)
+        return manifest
+
+    def test_incremental_sync_and_point_in_time(self):
+        first = self._snapshot("v1")
+        time.sleep(0.01)
+        middle = datetime.now()
+        time.sleep(0.01)
+        second = self._snapshot("v2")
+        self.pack.append(b"<html>v1</html>", "homepage", "2026-01-01T10:00:00", url=SITE, extension="html")
+        self.pack.append(b"<html>v2</html>", "homepage", "2026-01-02T10:00:00", url=SITE, extension="html")
+        self.assertEqual(self.catalog.sync(self.store, self.root / "packs", SITE), 6)
+        self.assertEqual(self.catalog.sync(self.store, self.root / "packs", SITE), 0)
+        self.pack.append(b"<html>v3</html>", "homepage", "2026-01-03T10:00:00", url=SITE + "/", extension="html")
+        self.assertEqual(self.catalog.sync_packs(self.root / "packs"), 1)
+
+        self.assertEqual(self.catalog.manifest_at(SITE, middle), first)
+        self.assertEqual(self.catalog.manifest_at(SITE), second)
+        self.assertIsNone(self.catalog.manifest_at(SITE, "2000-01-01"))
+        state = {row["endpoint"]: row for row in self.catalog.as_of(SITE, middle)}
+        self.assertEqual(self.catalog.read(state["report.txt"]), b"v1")
+        state = {row["endpoint"]: row for row in self.catalog.as_of(SITE, "2026-01-02T12:00:00")}
+        self.assertEqual(self.catalog.read(state["homepage"]), b"<html>v2</html>")
+
+        history = self.catalog.history(SITE, "static.txt")
+        self.assertEqual(len(history), 2)
+        self.assertEqual(len(self.catalog.history(SITE, "static.txt", changed_only=True)), 1)
+        self.assertEqual([self.catalog.read(r) for r in self.catalog.history(SITE, "homepage")],
+                         [b"<html>v1</html>", b"<html>v2</html>", b"<html>v3</html>"])
+        self.assertEqual(site_key("HTTPS://Example.wordpress.com/wp-json/wp/v2/posts?page=2"), SITE)
+
+        # Rétention : le manifeste supprimé disparaît du catalogue
+        os.utime(first, (0, 0))
+        self.store.prune(1)
+        self.catalog.sync_snapshots(self.store, SITE)
+        self.assertIsNone(self.catalog.manifest_at(SITE, middle))
+        self.assertEqual(len(self.catalog.history(SITE, "static.txt")), 1)
+
+    def test_restore_packs_at_date(self):
+        api = SITE + "/wp-json/wp/v2/posts"
+        self.pack.append(b"<html>v1</html>", "homepage", "2026-01-01T10:00:00", url=SITE, extension="html")
+        self.pack.append(json.dumps([{"id": 1, "title": "a1"}, {"id": 2, "title": "b1"}]).encode(),
+                         "rest_posts", "2026-01-01T10:00:00", url=api, extension="json")
+        self.pack.append(json.dumps([{"id": 2, "title": "b2"}]).encode(),
+                         "rest_posts", "2026-01-02T10:00:00", url=api, extension="json")
+        self.pack.append(b"<html>v2</html>", "homepage", "2026-01-03T10:00:00", url=SITE, extension="html")
+        self.catalog.sync_packs(self.root / "packs", SITE)
+
+        target = Path(self.tmp.name) / "restored"
+        report = self.catalog.restore_packs(SITE, "2026-01-02T12:00:00", target)
+        self.assertEqual(sorted(report["restored"]), ["homepage.html", "rest_posts.json"])
+        self.assertEqual(report["errors"], [])
+        self.assertEqual((target / "homepage.html").read_bytes(), b"<html>v1</html>")
+        posts = json.loads((target / "rest_posts.json").read_text())
+        self.assertEqual(posts, [{"id": 1, "title": "a1"}, {"id": 2, "title": "b2"}])
+
+        self.catalog.restore_packs(SITE, None, target)
+        self.assertEqual((target / "homepage.html").read_bytes(), b"<html>v2</html>")
+        self.assertEqual(self.catalog.restore_packs("https://autre.example", None, target / "x")["restored"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# test_snapshot_store.py
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from snapshot_store import SnapshotStore
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = Path(self.tmp.name) / "monitor_data"
+        self.src.mkdir()
+        (self.src / "homepage_content.txt").write_text("<html>v1</html>", encoding='utf-8')
+        (self.src / "incidents.db").write_bytes(b"\x00\xffSQLite")
+        (self.src / "sites" / "a.example.com").mkdir(parents=True)
+        (self.src / "sites" / "a.example.com" / "rss.ref").write_text("abc", encoding='utf-8')
+        self.store = SnapshotStore(Path(self.tmp.name) / "backups")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unchanged_files_cost_nothing(self):
+        manifest, stats = self.store.snapshot(self.src)
+        self.assertEqual((stats["files"], stats["stored"]), (3, 3))
+        files = self.store.load_manifest(manifest)["files"]
+        self.assertEqual(files["incidents.db"]["hash"], hashlib.sha256(b"\x00\xffSQLite").hexdigest())
+        self.assertIn("sites/a.example.com/rss.ref", files)
+
+        _, stats = self.store.snapshot(self.src)
+        self.assertEqual((stats["reused"], stats["stored"], stats["bytes_stored"]), (3, 0, 0))
+        self.assertEqual(len(list(self.store.objects_dir.glob("??/*"))), 3)
+
+    def test_changed_file_stored_once_and_pruned(self):
+        self.store.snapshot(self.src)
+        (self.src / "homepage_content.txt").write_text("<html>v2</html>", encoding='utf-8')
+        _, stats = self.store.snapshot(self.src)
+        self.assertEqual((stats["stored"], stats["reused"]), (1, 2))
+        self.assertEqual(self.store.prune(max_age_days=-1), (1, 1))
+        self.assertEqual(len(self.store.list_snapshots()), 1)
+
+    def test_restore_skips_matching_and_detects_corruption(self):
+        manifest, _ = self.store.snapshot(self.src)
+        target = Path(self.tmp.name) / "restored"
+        report = self.store.restore(manifest, target, workers=4)
+        self.assertEqual(len(report["restored"]), 3)
+        self.assertEqual((target / "incidents.db").read_bytes(), b"\x00\xffSQLite")
+
+        (target / "homepage_content.txt").write_text("<html>altéré</html>", encoding='utf-8')
+        report = self.store.restore(manifest, target, workers=4)
+        self.assertEqual((len(report["skipped"]), report["restored"]), (2, ["homepage_content.txt"]))
+
+        info = self.store.load_manifest(manifest)["files"]["sites/a.example.com/rss.ref"]
+        self.store.object_path(info["hash"]).write_bytes(b"corrompu")
+        (target / "sites/a.example.com/rss.ref").unlink()
+        report = self.store.restore(manifest, target)
+        self.assertEqual(report["errors"][0][0], "sites/a.example.com/rss.ref")
+        self.assertEqual(list((target / "sites/a.example.com").iterdir()), [])
+
+    def test_live_sqlite_database_copied_consistently(self):
+        db = self.src / "sites" / "a.example.com" / "crawl_index.db"
+        conn = sqlite3.connect(db)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE t (v TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(str(i),) for i in range(100)])
+        conn.commit()  # lignes encore dans le WAL : le fichier .db seul ne les contient pas
+        self.assertTrue(db.with_name("crawl_index.db-wal").exists())
+
+        manifest, stats = self.store.snapshot(self.src)
+        conn.close()
+        self.assertEqual(stats["errors"], [])
+        files = self.store.load_manifest(manifest)["files"]
+        self.assertNotIn("sites/a.example.com/crawl_index.db-wal", files)
+        target = Path(self.tmp.name) / "restored"
+        self.store.restore(manifest, target)
+        restored = sqlite3.connect(target / "sites" / "a.example.com" / "crawl_index.db")
+        self.assertEqual(restored.execute("SELECT COUNT(*) FROM t").fetchone()[0], 100)
+        restored.close()
+
+    def test_prune_waits_for_snapshot_in_progress(self):
+        self.store.snapshot(self.src)
+        (self.src / "homepage_content.txt").write_text("<html>v2</html>", encoding='utf-8')
+        stored, release = threading.Event(), threading.Event()
+        put_file = self.store.put_file
+
+        def slow_put_file(path):
+            result = put_file(path)
+            stored.set()
+            release.wait(5)  # objet écrit, manifeste pas encore
+            return result
+
+        self.store.put_file = slow_put_file
+        manifests = []
+        snapshot = threading.Thread(target=lambda: manifests.append(self.store.snapshot(self.src)[0]))
+        snapshot.start()
+        self.assertTrue(stored.wait(5))
+        other = SnapshotStore(self.store.root)  # nettoyage d'un autre processus
+        prune = threading.Thread(target=other.prune, args=(-1,))
+        prune.start()
+        prune.join(0.3)
+        self.assertTrue(prune.is_alive())
+        release.set()
+        snapshot.join()
+        prune.join()
+
+        report = self.store.restore(manifests[0], Path(self.tmp.name) / "restored")
+        self.assertEqual((len(report["restored"]), report["missing"]), (3, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# test_startup.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+HEAVY = ["requests", "urllib3", "numpy", "smtplib", "sqlite3", "dotenv", "logging.handlers"]
+
+
+class TestLazyStartup(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.env = dict(os.environ, PYTHONPATH=str(ROOT), MONITOR_DIR=str(self.dir / "m"),
+                        BACKUP_DIR=str(self.dir / "b"), RESTORE_DIR=str(self.dir / "r"),
+                        SMTP_USER="", SMTP_PASS="", ALERT_EMAIL="")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _loaded(self, code: str) -> list:
+        code += f"\nimport sys, json; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+        out = subprocess.run([sys.executable, "-c", code], env=self.env, cwd=self.dir,
+                             capture_output=True, text=True, check=True).stdout
+        return json.loads(out.splitlines()[-1])
+
+    def test_import_has_no_side_effects(self):
+        self.assertEqual(self._loaded("import monitor"), [])
+        self.assertEqual(sorted(p.name for p in self.dir.iterdir()), [])
+
+    def test_modes_load_only_what_they_use(self):
+        # Lire la configuration charge .env.local, sans rien importer d'autre
+        self.assertEqual(self._loaded("import monitor; monitor.config.SITE_URL"), ["dotenv"])
+        loaded = self._loaded("import monitor; monitor.generate_report()")
+        self.assertNotIn("requests", loaded)
+        self.assertNotIn("smtplib", loaded)
+        self.assertEqual(sorted(p.name for p in self.dir.iterdir()), ["m"])
+
+
+if __name__ == "__main__":
+    unittest.main()
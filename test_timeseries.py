@@ -0,0 +1,107 @@
+# test_timeseries.py
+import math
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from timeseries import RAW, ROLLUP, ROLLUP_GRACE, TimeSeriesStore
+
+T0 = datetime(2026, 3, 1, tzinfo=timezone.utc).timestamp()
+
+
+class TestTimeSeriesStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.store = TimeSeriesStore(self.root, raw_days=2, hourly_days=5, daily_days=400)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _cycles(self, hours: int, step: int = 600):
+        records = []
+        for i in range(hours * 3600 // step):
+            ts = T0 + i * step
+            up = i % 6 != 0  # une panne par heure
+            records.append(("https://a.example", "availability", up, 0.25 if up else None, 200 if up else 503, ts))
+            records.append(("https://b.example", "ssl", True, 40, 0, ts))
+        self.store.append_many(records)
+
+    def test_fixed_width_append_and_query(self):
+        self._cycles(2)
+        raw = self.store.query(T0, T0 + 7200, site="https://a.example", check="availability")
+        self.assertEqual(len(raw["ts"]), 12)
+        self.assertEqual(raw["ok"].tolist().count(0), 2)
+        self.assertEqual(raw["status"][0], 503)
+        self.assertTrue(math.isnan(raw["value"][0]))
+        self.assertAlmostEqual(raw["value"][1], 0.25)
+        self.assertEqual((self.root / "raw" / "20260301.bin").stat().st_size, 24 * RAW.size)
+        self.assertEqual(len(self.store.query(site="https://unknown.example")["ts"]), 0)
+
+    def test_hourly_and_daily_rollups(self):
+        self._cycles(48)
+        self.store.rollup(now=T0 + 48 * 3600 + ROLLUP_GRACE)
+        hourly = self.store.query(T0, T0 + 3600, check="availability", resolution="hour")
+        self.assertEqual(hourly["count"].tolist(), [6])
+        self.assertEqual(hourly["ok"].tolist(), [5])
+        self.assertEqual(hourly["n_value"].tolist(), [5])
+        self.assertAlmostEqual(hourly["sum"][0], 1.25, places=5)
+        daily = self.store.query(T0, T0 + 2 * 86400, site="https://a.example", resolution="day")
+        self.assertEqual(daily["count"].tolist(), [144, 144])
+        self.assertEqual(daily["ok"].tolist(), [120, 120])
+        self.assertAlmostEqual(daily["max"][0], 0.25, places=5)
+
+        # Un second passage n'agrège rien de nouveau
+        self.store.rollup(now=T0 + 48 * 3600 + ROLLUP_GRACE + 60)
+        self.assertEqual(len(self.store.query(T0, T0 + 3600, check="availability", resolution="hour")["ts"]), 1)
+
+    def test_late_records_still_rolled_up(self):
+        # Mesure de 10:59 écrite à 11:05, après un passage d'un autre processus à 11:01
+        self.store.append("https://a.example", "availability", True, 0.2, 200, T0 + 10 * 3600)
+        self.store.rollup(now=T0 + 11 * 3600 + 60)
+        self.store.append("https://a.example", "availability", False, None, 503, T0 + 11 * 3600 - 60)
+        self.store.rollup(now=T0 + 11 * 3600 + ROLLUP_GRACE)
+        hourly = self.store.query(T0 + 10 * 3600, T0 + 11 * 3600, resolution="hour")
+        self.assertEqual((hourly["count"].tolist(), hourly["ok"].tolist()), ([2], [1]))
+
+    def test_retention_keeps_rollups(self):
+        self._cycles(72)
+        self.store.maintain(T0 + 10 * 86400)
+        self.assertEqual(len(self.store.query(resolution="raw")["ts"]), 0)
+        self.assertEqual(len(self.store.query(resolution="hour")["ts"]), 144)  # segment du mois encore conservé
+        self.store.maintain(T0 + 40 * 86400)
+        self.assertEqual(len(self.store.query(resolution="hour")["ts"]), 0)
+        self.assertEqual(self.store.query(check="ssl", resolution="day")["count"].tolist(), [144, 144, 144])
+
+    def test_year_of_fleet_rollups_size(self):
+        # Une année de flotte (20 sites, 4 vérifications) : seuls les agrégats journaliers restent,
+        # un par site, vérification et jour quel que soit le rythme des cycles
+        store = TimeSeriesStore(self.root / "fleet", raw_days=1, hourly_days=1, daily_days=400)
+        checks = ("availability", "integrity", "patterns", "ssl")
+        for day in range(365):
+            store.append_many((f"https://site{n}.example", check, True, 0.3, 200, T0 + day * 86400 + hour * 3600)
+                              for hour in (0, 12) for n in range(20) for check in checks)
+        store.maintain(T0 + 368 * 86400)
+        daily = sum(p.stat().st_size for p in (store.root / "day").glob("*.bin"))
+        self.assertEqual(daily, 20 * 4 * 365 * ROLLUP.size)
+        self.assertLess(store.size_bytes(), 1024 * 1024)
+
+    def test_processes_share_series_ids(self):
+        # Deux processus (démon, --once) ouvrent le même dossier avant tout ajout
+        other = TimeSeriesStore(self.root, raw_days=2, hourly_days=5, daily_days=400)
+        self.store.append("https://a.example", "availability", True, 0.2, 200, T0)
+        other.append("https://b.example", "ssl", True, 40, 0, T0 + 1)
+        self.assertEqual(other.series_id("sites", "https://a.example"), 0)
+        self.assertEqual(self.store.series_id("sites", "https://b.example"), 1)
+        self.assertEqual(len(self.store.query(site="https://b.example")["ts"]), 1)
+        self.assertEqual(self.store.site_name(1), "https://b.example")
+
+        # Les agrégats d'une heure ne sont calculés qu'une fois, quel que soit le processus
+        self.store.rollup(now=T0 + 7200 + ROLLUP_GRACE)
+        other.rollup(now=T0 + 7200 + ROLLUP_GRACE)
+        self.assertEqual(self.store.query(resolution="hour")["count"].tolist(), [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+# test_tls_checker.py
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import unittest
+import urllib.request
+from pathlib import Path
+
+from metrics import MetricsRegistry, serve
+from tls_checker import TLSChecker, tls_endpoint
+
+
+@unittest.skipUnless(shutil.which("openssl"), "openssl requis pour générer un certificat de test")
+class TestTLSChecker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        d = Path(cls.tmp.name)
+        cls.cert, cls.key = d / "cert.pem", d / "key.pem"
+        cls.renewed, renewed_key = d / "renewed.pem", d / "renewed_key.pem"
+        for cert, key in ((cls.cert, cls.key), (cls.renewed, renewed_key)):
+            subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "90",
+                            "-subj", "/CN=localhost/O=Test CA", "-addext", "subjectAltName=DNS:localhost",
+                            "-keyout", str(key), "-out", str(cert)], check=True, capture_output=True)
+        cls.server_ctx = []
+        for cert, key in ((cls.cert, cls.key), (cls.renewed, renewed_key)):
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ctx.load_cert_chain(cert, key)
+            cls.server_ctx.append(ctx)
+        cls.listener = socket.create_server(("127.0.0.1", 0))
+        cls.port = cls.listener.getsockname()[1]
+
+        def serve():
+            while True:
+                try:
+                    conn, _ = cls.listener.accept()
+                except OSError:
+                    return
+                try:
+                    with cls.server_ctx[0].wrap_socket(conn, server_side=True):
+                        pass
+                except (ssl.SSLError, OSError):
+                    pass
+
+        threading.Thread(target=serve, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.listener.close()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.cache = Path(self.tmp.name) / "tls_cache.json"
+        self.cache.unlink(missing_ok=True)
+        self.context = ssl.create_default_context(cafile=str(self.cert))
+        self.context.load_verify_locations(cafile=str(self.renewed))
+
+    def test_endpoint_from_url(self):
+        self.assertEqual(tls_endpoint("https://Exemple.com:8443/blog"), ("exemple.com", 8443))
+        self.assertEqual(tls_endpoint("https://exemple.com"), ("exemple.com", 443))
+        self.assertIsNone(tls_endpoint("http://exemple.com"))
+
+    def test_handshake_then_cache(self):
+        checker = TLSChecker(self.cache, context=self.context)
+        first = checker.check("localhost", self.port)
+        self.assertIsNone(first["error"])
+        self.assertTrue(first["valid"])
+        self.assertIn(first["days_left"], (88, 89))
+        self.assertFalse(first["cached"])
+        self.assertGreaterEqual(first["handshake_ms"], 0)
+
+        # Nouveau vérificateur, même cache disque : pas de poignée de main
+        second = TLSChecker(self.cache, context=self.context).check("localhost", self.port)
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["fingerprint"], first["fingerprint"])
+
+    def test_handshake_latency_on_metrics_endpoint(self):
+        registry = MetricsRegistry()
+        checker = TLSChecker(self.cache, context=self.context, registry=registry)
+        checker.check("localhost", self.port)
+        checker.check("localhost", self.port)  # depuis le cache : pas de nouvelle mesure
+        checker.check("localhost", 1)
+        server = serve(0, "127.0.0.1", registry)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as resp:
+                exposed = resp.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        site = f"https://localhost:{self.port}"
+        for phase in ("dns", "connect", "tls"):
+            self.assertIn(f'wpmonitor_http_phase_seconds_count{{site="{site}",endpoint="tls",phase="{phase}"}} 1',
+                          exposed)
+        self.assertIn('wpmonitor_http_requests_total{site="https://localhost:1",endpoint="tls",status="error"} 1',
+                      exposed)
+
+    def test_near_expiry_is_rechecked(self):
+        checker = TLSChecker(self.cache, near_expiry_days=120, context=self.context)
+        checker.check("localhost", self.port)
+        self.assertFalse(checker.check("localhost", self.port)["cached"])
+
+    def test_check_many_dedupes_and_reports_errors(self):
+        checker = TLSChecker(self.cache, context=self.context)
+        results = checker.check_many([("localhost", self.port), ("localhost", self.port), ("localhost", 1)])
+        self.assertEqual(len(results), 2)
+        self.assertIsNone(results[("localhost", self.port)]["error"])
+        self.assertFalse(results[("localhost", 1)]["valid"])
+        self.assertIsNotNone(results[("localhost", 1)]["error"])
+
+    def test_rotation_seen_after_fleet_warmup(self):
+        # Mode flotte : check_many() préchauffe, puis chaque site appelle check()
+        checker = TLSChecker(self.cache, recheck_hours=0, context=self.context)
+        checker.check("localhost", self.port)
+        self.server_ctx.reverse()
+        try:
+            warm = checker.check_many([("localhost", self.port)])[("localhost", self.port)]
+            self.assertTrue(warm["rotated"])
+            site = TLSChecker(self.cache, recheck_hours=24, context=self.context).check("localhost", self.port)
+        finally:
+            self.server_ctx.reverse()
+        self.assertTrue(site["rotated"])
+        self.assertFalse(site["cached"])
+        self.assertGreaterEqual(site["handshake_ms"], 0)
+        self.assertNotEqual(site["fingerprint"], site["previous_fingerprint"])
+        again = TLSChecker(self.cache, recheck_hours=24, context=self.context).check("localhost", self.port)
+        self.assertFalse(again["rotated"])
+        self.assertTrue(again["cached"])
+
+
+if __name__ == '__main__':
+    unittest.main()
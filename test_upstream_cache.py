@@ -0,0 +1,135 @@
+# test_upstream_cache.py
+import base64
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from upstream_cache import UpstreamCache, UpstreamResponse
+
+POSTS = b'\xef\xbb\xbf[{"id": 1, "title": {"rendered": "Bonjour \\u00e0 tous"}}]\n'
+
+
+def response(body: bytes = b'{}') -> UpstreamResponse:
+    return UpstreamResponse(200, 'OK', 'application/json', body)
+
+
+class TestUpstreamCache(unittest.TestCase):
+    def test_ttl_and_eviction(self):
+        now = [0.0]
+        cache = UpstreamCache(ttl=30, max_entries=2, max_body=10, clock=lambda: now[0])
+        a, b, c = (cache.key("https://s.example", "/e", user, "pw") for user in ("a", "b", "c"))
+        self.assertNotIn("pw", "".join(a))
+        self.assertEqual(cache.get_or_fetch(a, lambda: response(b'1')), (response(b'1'), False))
+        self.assertEqual(cache.get_or_fetch(a, lambda: response(b'2')), (response(b'1'), True))
+        cache.get_or_fetch(b, lambda: response())
+        cache.get_or_fetch(a, lambda: response(b'2'))  # a lu récemment : b évincé en premier
+        cache.get_or_fetch(c, lambda: response())
+        self.assertTrue(cache.get_or_fetch(a, lambda: response(b'2'))[1])
+        self.assertFalse(cache.get_or_fetch(b, lambda: response())[1])
+        cache.get_or_fetch(c, lambda: response(b'x' * 11))  # trop gros pour le cache
+        now[0] = 31
+        self.assertEqual(cache.get_or_fetch(a, lambda: response(b'2')), (response(b'2'), False))
+
+    def test_concurrent_requests_share_one_fetch(self):
+        cache = UpstreamCache()
+        key = cache.key("https://s.example", "/e", "u", "pw")
+        calls, release = [], threading.Event()
+
+        def slow_fetch():
+            calls.append(1)
+            release.wait(5)
+            return response()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch(key, slow_fetch)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(hit for _, hit in results), [False] + [True] * 7)
+
+        def failing():
+            raise OSError("connexion refusée")
+        other = cache.key("https://s.example", "/e", "u", "autre")
+        with self.assertRaises(OSError):
+            cache.get_or_fetch(other, failing)
+        self.assertFalse(cache.get_or_fetch(other, response)[1])  # erreur non mise en cache
+
+
+class TestAuthEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        hits = self.hits
+
+        class WordPress(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(self.path)
+                # Comme une extension de sécurité : la session ouverte par le cookie suffit
+                logged_in = 'wp_session=ok' in (self.headers.get('Cookie') or '')
+                if (self.headers.get('Authorization') != 'Basic ' + base64.b64encode(b'admin:secret').decode()
+                        and not logged_in):
+                    self.send_response(401, 'Unauthorized')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Set-Cookie', 'wp_session=ok; Path=/')
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(POSTS)))
+                self.end_headers()
+                self.wfile.write(POSTS)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), WordPress)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.site = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        import app
+        app.upstream_cache.clear()
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _post(self, password: str):
+        return self.client.post('/test-wordpress-auth', json={'siteUrl': self.site, 'username': 'admin',
+                                                              'appPassword': password})
+
+    def test_upstream_cookies_not_replayed_across_callers(self):
+        self.assertTrue(self._post('secret').get_json()['success'])
+        denied = self._post('wrong').get_json()
+        self.assertFalse(denied['success'])
+        self.assertIn('401', denied['message'])
+        import app
+        self.assertEqual(len(app.proxy_client().session.cookies), 0)
+
+    def test_passthrough_and_cache(self):
+        first, second = self._post('secret'), self._post('secret')
+        self.assertEqual((first.headers['X-Cache'], second.headers['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertTrue(first.get_data().endswith(POSTS[3:].strip() + b'}'))
+        data = json.loads(first.get_data())
+        self.assertTrue(data['success'])
+        self.assertEqual(data['data'][0]['title']['rendered'], 'Bonjour à tous')
+
+        denied = self._post('wrong').get_json()
+        self.assertFalse(denied['success'])
+        self.assertIn('401', denied['message'])
+        self.assertEqual(self.hits, ['/wp-json/wp/v2/posts'] * 2)
+
+        import metrics
+        exposed = metrics.registry.render()
+        self.assertNotIn(self.site, exposed)
+        self.assertIn('site="auth-proxy",endpoint="test-wordpress-auth"', exposed)
+
+
+if __name__ == '__main__':
+    unittest.main()
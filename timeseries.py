@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Séries temporelles des résultats de vérification (fichiers binaires en ajout seul)
+
+· Un enregistrement de largeur fixe par vérification et par cycle
+  (horodatage, site, vérification, ok, code HTTP, valeur) : 14 octets,
+  écrits en ajout seul dans un segment par jour.
+· Agrégats horaires (segment par mois) et journaliers (segment par an) :
+  nombre de mesures, nombre de succès, somme / min / max de la valeur.
+  Calculés une seule fois, `rollup_grace` secondes après la fin de chaque
+  heure / journée : une mesure horodatée au début de sa vérification et
+  écrite à la fin du cycle (ou par un autre processus) arrive encore à
+  temps pour son agrégat.
+· Rétention par segment : les segments bruts, horaires et journaliers
+  plus anciens que leur durée de conservation sont supprimés (une fois
+  agrégés).
+· `query()` renvoie des colonnes `array.array` (exploitables telles quelles
+  ou via numpy.frombuffer) au lieu de lignes de log à analyser.
+· Plusieurs processus (démon, --once en cron) peuvent écrire dans le même
+  dossier : ajouts, agrégats et rétention se font sous un verrou de fichier
+  (series.lock, fcntl), après relecture de series.json ; un identifiant
+  de site ou de vérification n'est donc attribué qu'une fois.
+
+Valeur selon la vérification : temps de réponse (s) pour la disponibilité,
+jours restants pour SSL, nombre de patterns ou de changements sinon ;
+NaN si absente.
+"""
+
+import json
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : un seul processus écrivain par dossier
+    fcntl = None
+
+# ts, site, check, ok, status, value
+RAW = struct.Struct("<IHBBHf")
+RAW_COLUMNS = (("ts", "I"), ("site", "H"), ("check", "B"), ("ok", "B"), ("status", "H"), ("value", "f"))
+# ts, site, check, (pad), count, ok, n_value, sum, min, max
+ROLLUP = struct.Struct("<IHBxIIIfff")
+ROLLUP_COLUMNS = (("ts", "I"), ("site", "H"), ("check", "B"), ("count", "I"), ("ok", "I"),
+                  ("n_value", "I"), ("sum", "f"), ("min", "f"), ("max", "f"))
+
+RESOLUTIONS = {
+    # résolution : (format, colonnes, secondes par pas, format du nom de segment)
+    "raw": (RAW, RAW_COLUMNS, None, "%Y%m%d"),
+    "hour": (ROLLUP, ROLLUP_COLUMNS, 3600, "%Y%m"),
+    "day": (ROLLUP, ROLLUP_COLUMNS, 86400, "%Y"),
+}
+
+ROLLUP_GRACE = 900  # secondes : au-delà de l'échéance d'un cycle flotte (600 s par défaut)
+
+Record = Tuple[str, str, bool, Optional[float], int, Optional[float]]  # site, check, ok, value, status, ts
+
+
+def _segment_name(ts: float, fmt: str) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(fmt) + ".bin"
+
+
+def _segment_start(name: str, fmt: str) -> float:
+    return datetime.strptime(name[:-4], fmt).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _segment_end(start: float, fmt: str) -> float:
+    """Début du segment suivant (jour, mois ou année)"""
+    span_days = {"%Y%m%d": 1, "%Y%m": 32, "%Y": 366}[fmt]
+    return _segment_start(_segment_name(start + span_days * 86400, fmt), fmt)
+
+
+class TimeSeriesStore:
+    def __init__(self, root: Path, raw_days: int = 14, hourly_days: int = 90, daily_days: int = 1825,
+                 rollup_grace: int = ROLLUP_GRACE):
+        self.root = Path(root)
+        for resolution in RESOLUTIONS:
+            (self.root / resolution).mkdir(parents=True, exist_ok=True)
+        self.retention = {"raw": raw_days * 86400, "hour": hourly_days * 86400, "day": daily_days * 86400}
+        self.rollup_grace = rollup_grace
+        self._lock = threading.Lock()
+        self._meta_file = self.root / "series.json"
+        self._lock_file = self.root / "series.lock"
+        self._meta = self._load_meta()
+
+    # --- Dictionnaires site / vérification -> identifiant ---
+    def _load_meta(self) -> Dict:
+        try:
+            with open(self._meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {"sites": [], "checks": [], "rolled": {}}
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Verrou du processus puis du dossier (autres processus) ; series.json relu"""
+        with self._lock, open(self._lock_file, 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._meta = self._load_meta()
+            yield
+
+    def _write_meta(self):
+        # Appelé sous _exclusive() ; écriture atomique
+        tmp = self._meta_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f, indent=2)
+        os.replace(tmp, self._meta_file)
+
+    def series_id(self, kind: str, name: str) -> Optional[int]:
+        """Identifiant d'un site (kind="sites") ou d'une vérification (kind="checks"), None si inconnu"""
+        with self._lock:
+            return self._id(kind, name, create=False)
+
+    def _id(self, kind: str, name: str, create: bool = True) -> Optional[int]:
+        # Verrou pris (sous _exclusive() si create) ; un nom inconnu a pu être
+        # ajouté par un autre processus : series.json relu avant de conclure
+        names = self._meta[kind]
+        if name not in names and not create:
+            self._meta = self._load_meta()
+            names = self._meta[kind]
+        if name in names:
+            return names.index(name)
+        if not create:
+            return None
+        names.append(name)
+        self._write_meta()
+        return len(names) - 1
+
+    def _name(self, kind: str, series: int) -> str:
+        with self._lock:
+            if series >= len(self._meta[kind]):
+                self._meta = self._load_meta()
+            return self._meta[kind][series]
+
+    def site_name(self, site_id: int) -> str:
+        return self._name("sites", site_id)
+
+    def check_name(self, check_id: int) -> str:
+        return self._name("checks", check_id)
+
+    # --- Écriture ---
+    def append_many(self, records: Iterable[Record]):
+        """Ajoute des mesures (site, check, ok, value, status, ts) ; ts par défaut : maintenant"""
+        now = time.time()
+        segments: Dict[str, bytearray] = {}
+        with self._exclusive():
+            for site, check, ok, value, status, ts in records:
+                ts = int(ts if ts is not None else now)
+                packed = RAW.pack(ts, self._id("sites", site), self._id("checks", check), 1 if ok else 0,
+                                  status or 0, math.nan if value is None else value)
+                segments.setdefault(_segment_name(ts, "%Y%m%d"), bytearray()).extend(packed)
+            for name, data in segments.items():
+                with open(self.root / "raw" / name, 'ab') as f:
+                    f.write(data)
+
+    def append(self, site: str, check: str, ok: bool, value: Optional[float] = None, status: int = 0,
+               ts: Optional[float] = None):
+        self.append_many([(site, check, ok, value, status, ts)])
+
+    # --- Lecture ---
+    def segments(self, resolution: str, start: float, end: float) -> List[Path]:
+        """Fichiers de segment de `resolution` couvrant [start, end["""
+        fmt = RESOLUTIONS[resolution][3]
+        first, last = _segment_name(max(start, 0), fmt), _segment_name(end, fmt)
+        return [p for p in sorted((self.root / resolution).glob("*.bin")) if first <= p.name <= last]
+
+    def first_ts(self, resolution: str) -> Optional[float]:
+        """Début du plus ancien segment conservé de `resolution`, None si aucun"""
+        fmt = RESOLUTIONS[resolution][3]
+        oldest = min((p.name for p in (self.root / resolution).glob("*.bin")), default=None)
+        return _segment_start(oldest, fmt) if oldest else None
+
+    def _read(self, resolution: str, start: float, end: float) -> Iterable[tuple]:
+        fmt = RESOLUTIONS[resolution][0]
+        for path in self.segments(resolution, start, end):
+            data = path.read_bytes()
+            usable = len(data) - len(data) % fmt.size  # enregistrement final incomplet ignoré
+            for row in fmt.iter_unpack(memoryview(data)[:usable]):
+                if start <= row[0] < end:
+                    yield row
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None, site: Optional[str] = None,
+              check: Optional[str] = None, resolution: str = "raw") -> Dict[str, array]:
+        """Colonnes des mesures de [start, end[ (epoch s), éventuellement filtrées par site / vérification.
+
+        resolution : "raw" (ts, site, check, ok, status, value) ou "hour" / "day"
+        (ts, site, check, count, ok, n_value, sum, min, max).
+        """
+        _, columns, _, _ = RESOLUTIONS[resolution]
+        result = {name: array(code) for name, code in columns}
+        with self._lock:
+            site_id = self._id("sites", site, create=False) if site is not None else None
+            check_id = self._id("checks", check, create=False) if check is not None else None
+        if (site is not None and site_id is None) or (check is not None and check_id is None):
+            return result
+        appenders = [result[name].append for name, _ in columns]
+        for row in self._read(resolution, start or 0, end if end is not None else time.time() + 1):
+            if (site_id is None or row[1] == site_id) and (check_id is None or row[2] == check_id):
+                for append, value in zip(appenders, row):
+                    append(value)
+        return result
+
+    # --- Agrégats et rétention ---
+    def _aggregate(self, source: str, target: str, start: float, end: float):
+        step = RESOLUTIONS[target][2]
+        buckets: Dict[Tuple[int, int, int], list] = {}
+        for row in self._read(source, start, end):
+            key = (int(row[0] // step * step), row[1], row[2])
+            agg = buckets.setdefault(key, [0, 0, 0, 0.0, math.inf, -math.inf])
+            if source == "raw":
+                value = row[5]
+                agg[0] += 1
+                agg[1] += row[3]
+                if not math.isnan(value):
+                    agg[2] += 1
+                    agg[3] += value
+                    agg[4] = min(agg[4], value)
+                    agg[5] = max(agg[5], value)
+            else:
+                agg[0] += row[3]
+                agg[1] += row[4]
+                if row[5]:
+                    agg[2] += row[5]
+                    agg[3] += row[6]
+                    agg[4] = min(agg[4], row[7])
+                    agg[5] = max(agg[5], row[8])
+
+        segments: Dict[str, bytearray] = {}
+        for (ts, site_id, check_id), (count, ok, n_value, total, low, high) in sorted(buckets.items()):
+            if not n_value:
+                low = high = math.nan
+            segments.setdefault(_segment_name(ts, RESOLUTIONS[target][3]), bytearray()).extend(
+                ROLLUP.pack(ts, site_id, check_id, count, ok, n_value, total, low, high))
+        for name, data in segments.items():
+            with open(self.root / target / name, 'ab') as f:
+                f.write(data)
+
+    def rollup(self, now: Optional[float] = None):
+        """Agrège les heures puis les journées terminées depuis le dernier passage.
+
+        Une période n'est agrégée que `rollup_grace` secondes après sa fin :
+        le repère `rolled` ne dépasse jamais une période qui peut encore
+        recevoir des mesures en retard (elles ne seraient jamais agrégées,
+        et leur segment brut serait supprimé par la rétention).
+        """
+        now = now if now is not None else time.time()
+        with self._exclusive():
+            for source, target in (("raw", "hour"), ("hour", "day")):
+                step = RESOLUTIONS[target][2]
+                until = int((now - self.rollup_grace) // step * step)
+                rolled = self._meta["rolled"].get(target)
+                if rolled is None:
+                    existing = self.segments(source, 0, now)
+                    if not existing:
+                        continue
+                    rolled = int(_segment_start(existing[0].name, RESOLUTIONS[source][3]))
+                if rolled >= until:
+                    continue
+                self._aggregate(source, target, rolled, until)
+                self._meta["rolled"][target] = until
+                self._write_meta()
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Supprime les segments hors rétention déjà agrégés ; renvoie le nombre de fichiers supprimés"""
+        now = now if now is not None else time.time()
+        removed = 0
+        with self._exclusive():
+            rolled = self._meta["rolled"]
+            for resolution, (_, _, _, fmt) in RESOLUTIONS.items():
+                nxt = {"raw": "hour", "hour": "day"}.get(resolution)
+                for path in sorted((self.root / resolution).glob("*.bin")):
+                    following = _segment_end(_segment_start(path.name, fmt), fmt)
+                    if following > now - self.retention[resolution]:
+                        break
+                    if nxt is not None and rolled.get(nxt, 0) < following:
+                        break  # pas encore agrégé
+                    path.unlink()
+                    removed += 1
+        return removed
+
+    def maintain(self, now: Optional[float] = None):
+        self.rollup(now)
+        self.prune(now)
+
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.root.rglob("*.bin"))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Vérification des certificats TLS, avec cache et en parallèle
+
+· Hôte et port extraits de l'URL (urlsplit) : https://exemple.com:8443/ -> exemple.com, 8443
+· Résultat mis en cache sur disque (expiration, empreinte de la chaîne,
+  émetteur) : pas de nouvelle poignée de main avant `recheck_hours`, ni
+  tant que l'expiration est lointaine ; un certificat proche de
+  l'expiration (ou en erreur) est revérifié à chaque cycle.
+· Chaque poignée de main mesure résolution DNS, connexion TCP et négociation
+  TLS (ms), aussi envoyées aux histogrammes de metrics.py (endpoint "tls",
+  phases dns/connect/tls/total) ; un changement d'empreinte (renouvellement)
+  est signalé.
+· `check_many()` vérifie de nombreux hôtes/ports en parallèle, chaque
+  couple (hôte, port) une seule fois (préchauffage : le résultat d'une
+  nouvelle poignée de main reste « à signaler » dans le cache jusqu'à la
+  vérification suivante, qui voit latences et renouvellement).
+"""
+
+import hashlib
+import json
+import os
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import metrics
+
+ERROR_RETRY_SECONDS = 60  # une erreur n'est pas retentée dans la même passe (ex. préchauffage flotte)
+
+
+def tls_endpoint(url: str) -> Optional[Tuple[str, int]]:
+    """(hôte, port) TLS d'une URL https, None pour une URL http"""
+    parts = urlsplit(url)
+    if parts.scheme != 'https' or not parts.hostname:
+        return None
+    return parts.hostname, parts.port or 443
+
+
+class TLSChecker:
+    def __init__(self, cache_file: Path, recheck_hours: float = 24, near_expiry_days: int = 30,
+                 timeout: float = 8, workers: int = 16, context: Optional[ssl.SSLContext] = None,
+                 registry: Optional[metrics.MetricsRegistry] = None):
+        self.cache_file = Path(cache_file)
+        self.recheck_seconds = recheck_hours * 3600
+        self.near_expiry_days = near_expiry_days
+        self.timeout = timeout
+        self.workers = workers
+        self._context = context or ssl.create_default_context()
+        self.metrics = registry or metrics.registry
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._cache = self._load_cache()
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def _write_cache(self):
+        # Appelé verrou pris ; écriture atomique
+        tmp = self.cache_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._cache, f, indent=2)
+        os.replace(tmp, self.cache_file)
+
+    def _fresh(self, entry: Optional[Dict], now: float) -> bool:
+        if not entry:
+            return False
+        if entry.get("error"):
+            return now - entry["checked_at"] < ERROR_RETRY_SECONDS
+        days_left = (entry["not_after"] - now) / 86400
+        return now - entry["checked_at"] < self.recheck_seconds and days_left > self.near_expiry_days
+
+    def handshake(self, host: str, port: int) -> Dict:
+        """Poignée de main TLS complète ; renvoie expiration, empreinte et latences"""
+        # Même étiquette de site que les requêtes HTTP du client partagé
+        site = f"https://{host}" if port == 443 else f"https://{host}:{port}"
+        t0 = time.perf_counter()
+        try:
+            family, socktype, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+            t1 = time.perf_counter()
+            sock = socket.socket(family, socktype, proto)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(address)
+                t2 = time.perf_counter()
+                with self._context.wrap_socket(sock, server_hostname=host) as tls:
+                    t3 = time.perf_counter()
+                    cert = tls.getpeercert()
+                    chain = getattr(tls, 'get_verified_chain', None)  # Python 3.13+
+                    ders = [c if isinstance(c, bytes) else c.public_bytes(ssl.Encoding.DER) for c in chain()] \
+                        if chain else [tls.getpeercert(binary_form=True)]
+            finally:
+                sock.close()
+        except Exception:
+            self.metrics.observe(site, "tls", {"total": time.perf_counter() - t0}, "error")
+            raise
+        self.metrics.observe(site, "tls", {"dns": t1 - t0, "connect": t2 - t1, "tls": t3 - t2, "total": t3 - t0},
+                             "ok")
+
+        issuer = dict(item for rdn in cert.get('issuer', ()) for item in rdn)
+        return {
+            "not_after": ssl.cert_time_to_seconds(cert['notAfter']),
+            "fingerprint": hashlib.sha256(b"".join(ders)).hexdigest(),
+            "issuer": issuer.get('organizationName') or issuer.get('commonName'),
+            "dns_ms": round((t1 - t0) * 1000, 1),
+            "connect_ms": round((t2 - t1) * 1000, 1),
+            "handshake_ms": round((t3 - t2) * 1000, 1),
+            "error": None,
+        }
+
+    def check(self, host: str, port: int = 443, force: bool = False, persist: bool = True,
+              peek: bool = False) -> Dict:
+        """État du certificat de host:port (depuis le cache s'il est encore frais).
+
+        Renvoie {host, port, valid, days_left, not_after, fingerprint, issuer,
+        cached, rotated, dns_ms, connect_ms, handshake_ms, error}. `cached` est
+        faux (et `rotated` renseigné) pour la première lecture qui suit une
+        poignée de main ; `peek=True` ne consomme pas cette lecture.
+        """
+        key = f"{host}:{port}"
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            now = time.time()
+            previous = self._cache.get(key)
+            if not force and self._fresh(previous, now):
+                entry = previous
+            else:
+                try:
+                    entry = self.handshake(host, port)
+                except (OSError, ssl.SSLError, ValueError, KeyError) as e:
+                    entry = {"not_after": None, "fingerprint": None, "issuer": None, "error": str(e)}
+                entry["checked_at"] = now
+                entry["pending"] = True
+                if previous and previous.get("fingerprint") and entry["fingerprint"] \
+                        and previous["fingerprint"] != entry["fingerprint"]:
+                    entry["previous_fingerprint"] = previous["fingerprint"]
+                elif previous and previous.get("pending") and "previous_fingerprint" in previous \
+                        and previous["fingerprint"] == entry["fingerprint"]:
+                    entry["previous_fingerprint"] = previous["previous_fingerprint"]  # pas encore signalé
+            fresh = entry.get("pending", False)
+            if fresh and not peek:
+                entry = {k: v for k, v in entry.items() if k != "pending"}
+            if entry is not previous:
+                with self._lock:
+                    self._cache[key] = entry
+                    if persist:
+                        self._write_cache()
+
+        result = dict(entry, host=host, port=port, cached=not fresh,
+                      rotated=fresh and "previous_fingerprint" in entry, valid=False, days_left=None)
+        result.pop("pending", None)
+        if entry.get("not_after") is not None:
+            result["days_left"] = int((entry["not_after"] - now) // 86400)
+            result["valid"] = entry["not_after"] > now
+        return result
+
+    def check_many(self, endpoints: Iterable[Tuple[str, int]], force: bool = False) -> Dict[Tuple[str, int], Dict]:
+        """Vérifie plusieurs (hôte, port) en parallèle ; cache écrit une seule fois à la fin.
+
+        Préchauffage : les résultats restent à signaler au prochain `check()`.
+        """
+        unique = list(dict.fromkeys(endpoints))
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(unique))),
+                                thread_name_prefix="tls") as pool:
+            results = list(pool.map(lambda ep: self.check(ep[0], ep[1], force, persist=False, peek=True),
+                                    unique))
+        with self._lock:
+            self._write_cache()
+        return dict(zip(unique, results))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Cache à durée de vie courte des réponses WordPress (outil d'authentification)
+
+· Clé : site, endpoint et empreinte HMAC des identifiants (clé aléatoire
+  propre au processus : les mots de passe d'application ne sont ni gardés
+  en clair ni retrouvables à partir de la clé).
+· Réponses brutes (statut, raison, type, corps en octets) gardées `ttl`
+  secondes, au plus `max_entries` (les moins récemment lues sont évincées)
+  et seulement si le corps fait moins de `max_body` octets.
+· Requêtes identiques simultanées regroupées : une seule part vers
+  WordPress, les autres attendent son résultat (ou son exception) au lieu
+  d'occuper chacune une connexion.
+· Les erreurs de connexion ne sont pas mises en cache.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Tuple
+
+
+class UpstreamResponse(NamedTuple):
+    status: int
+    reason: str
+    content_type: str
+    body: bytes
+
+
+class _Pending:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class UpstreamCache:
+    def __init__(self, ttl: float = 30, max_entries: int = 256, max_body: int = 1024 * 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_body = max_body
+        self.clock = clock
+        self._secret = os.urandom(32)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, UpstreamResponse]]" = OrderedDict()
+        self._pending: Dict[Tuple, _Pending] = {}
+
+    def key(self, site_url: str, endpoint: str, username: str, password: str) -> Tuple[str, str, str]:
+        credentials = hmac.new(self._secret, f"{username}\0{password}".encode('utf-8'), hashlib.sha256)
+        return (site_url, endpoint, credentials.hexdigest())
+
+    def get_or_fetch(self, key: Tuple, fetch: Callable[[], UpstreamResponse]) -> Tuple[UpstreamResponse, bool]:
+        """Réponse en cache ou obtenue par `fetch()` ; renvoie (réponse, trouvée en cache)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    return entry[1], True
+                del self._entries[key]
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._pending[key] = _Pending()
+
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value, True
+
+        try:
+            pending.value = fetch()
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+                if pending.error is None and self.ttl > 0 and len(pending.value.body) <= self.max_body:
+                    self._entries[key] = (self.clock() + self.ttl, pending.value)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            pending.done.set()
+        return pending.value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def from_env(cls) -> "UpstreamCache":
+        return cls(ttl=float(os.environ.get("AUTH_CACHE_TTL", "30")),
+                   max_entries=int(os.environ.get("AUTH_CACHE_SIZE", "256")))